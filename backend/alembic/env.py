@@ -0,0 +1,52 @@
+"""
+Alembic environment: migrates settings.DATABASE_URL (or the sqlalchemy.url
+set by app.migrations) on SQLite and PostgreSQL
+"""
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine, pool
+from app.config import settings
+from app.database import Base
+from app import models  # noqa: F401  (registers every table for autogenerate)
+
+config = context.config
+if config.config_file_name and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def _options(dialect_name: str) -> dict:
+    return {
+        "target_metadata": target_metadata,
+        # SQLite cannot ALTER most things in place: alter/drop ops copy the table instead
+        "render_as_batch": dialect_name == "sqlite",
+        # Each revision commits on its own, so a failure never undoes earlier ones
+        "transaction_per_migration": True,
+        "compare_type": True,
+        # Maintained by migrations, not models (FTS5 virtual table / tsvector table)
+        "include_name": lambda name, type_, parent_names: not (type_ == "table" and name.startswith("application_search")),
+    }
+
+
+def run_migrations_offline():
+    url = config.get_main_option("sqlalchemy.url") or settings.DATABASE_URL
+    context.configure(url=url, literal_binds=True, **_options(url.split(":", 1)[0].split("+", 1)[0]))
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    url = config.get_main_option("sqlalchemy.url") or settings.DATABASE_URL
+    engine = create_engine(url, poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        context.configure(connection=connection, **_options(connection.dialect.name))
+        with context.begin_transaction():
+            context.run_migrations()
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
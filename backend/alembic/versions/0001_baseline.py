@@ -0,0 +1,256 @@
+"""Baseline schema
+
+Creates the schema on an empty database. Databases created before migrations
+existed (create_all plus the old migrate_add_*.py scripts) are adopted: missing
+tables, columns and indexes are added and existing ones are left alone.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migrations import create_index_online, run_in_batches
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of app/models.py at this revision
+metadata = sa.MetaData()
+user_role = sa.Enum("JOB_SEEKER", "EMPLOYER", "INDIVIDUAL", name="userrole")
+job_status = sa.Enum("ACTIVE", "CLOSED", "DRAFT", name="jobstatus")
+application_status = sa.Enum("PENDING", "REVIEWED", "ACCEPTED", "REJECTED", name="applicationstatus")
+
+
+def _timestamps():
+    return [
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    ]
+
+
+sa.Table(
+    "users", metadata,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("telegram_id", sa.Integer, nullable=False, unique=True, index=True),
+    sa.Column("username", sa.String),
+    sa.Column("first_name", sa.String),
+    sa.Column("last_name", sa.String),
+    sa.Column("photo_url", sa.String),
+    sa.Column("avatar_url", sa.String, index=True),
+    sa.Column("avatar_source_url", sa.String),
+    sa.Column("profile_picture_url", sa.String, index=True),
+    sa.Column("phone", sa.String),
+    sa.Column("email", sa.String),
+    sa.Column("language_code", sa.String),
+    sa.Column("is_premium", sa.Boolean),
+    sa.Column("role", user_role, nullable=False),
+    *_timestamps(),
+)
+sa.Table(
+    "companies", metadata,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("name", sa.String, nullable=False),
+    sa.Column("description", sa.Text),
+    sa.Column("logo_url", sa.String, index=True),
+    sa.Column("website", sa.String),
+    sa.Column("owner_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False, index=True),
+    *_timestamps(),
+)
+sa.Table(
+    "job_seeker_profiles", metadata,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False, index=True),
+    sa.Column("bio", sa.Text),
+    sa.Column("skills", sa.Text),
+    sa.Column("experience_years", sa.Integer),
+    sa.Column("cv_url", sa.String, index=True),
+    sa.Column("phone", sa.String),
+    sa.Column("email", sa.String),
+    sa.Column("location", sa.String),
+    *_timestamps(),
+)
+sa.Table(
+    "jobs", metadata,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("title", sa.String, nullable=False),
+    sa.Column("description", sa.Text, nullable=False),
+    sa.Column("requirements", sa.Text),
+    sa.Column("salary_min", sa.Float),
+    sa.Column("salary_max", sa.Float),
+    sa.Column("currency", sa.String),
+    sa.Column("location", sa.String),
+    sa.Column("is_remote", sa.Boolean),
+    sa.Column("tags", sa.String),
+    sa.Column("status", job_status),
+    sa.Column("poster_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+    sa.Column("company_id", sa.Integer, sa.ForeignKey("companies.id")),
+    *_timestamps(),
+    sa.Index("ix_jobs_status_created", "status", "created_at"),
+    sa.Index("ix_jobs_poster_created", "poster_id", "created_at"),
+)
+sa.Table(
+    "applications", metadata,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("job_id", sa.Integer, sa.ForeignKey("jobs.id"), nullable=False),
+    sa.Column("applicant_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False, index=True),
+    sa.Column("cover_letter", sa.Text),
+    sa.Column("resume_url", sa.String, index=True),
+    sa.Column("status", application_status),
+    sa.Column("notes", sa.Text),
+    *_timestamps(),
+)
+sa.Table(
+    "application_analyses", metadata,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("application_id", sa.Integer, sa.ForeignKey("applications.id"), nullable=False, unique=True),
+    sa.Column("job_id", sa.Integer, sa.ForeignKey("jobs.id"), nullable=False),
+    sa.Column("overall_score", sa.Integer, nullable=False),
+    sa.Column("cover_letter_score", sa.Integer, nullable=False),
+    sa.Column("completeness_score", sa.Integer, nullable=False),
+    sa.Column("relevance_score", sa.Integer, nullable=False),
+    sa.Column("resume_score", sa.Integer, nullable=False),
+    sa.Column("ai_summary", sa.Text),
+    sa.Column("strengths", sa.Text),
+    sa.Column("concerns", sa.Text),
+    sa.Column("recommendation", sa.String, nullable=False),
+    sa.Column("model_version", sa.String, nullable=False),
+    sa.Column("input_fingerprint", sa.String, nullable=False),
+    *_timestamps(),
+    sa.Index("ix_application_analyses_job_score", "job_id", "overall_score"),
+    sa.Index("ix_application_analyses_job_recommendation_score", "job_id", "recommendation", "overall_score"),
+)
+sa.Table(
+    "application_skills", metadata,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("application_id", sa.Integer, sa.ForeignKey("applications.id"), nullable=False),
+    sa.Column("job_id", sa.Integer, sa.ForeignKey("jobs.id"), nullable=False),
+    sa.Column("skill", sa.String, nullable=False),
+    sa.Column("source", sa.String, nullable=False),
+    sa.UniqueConstraint("application_id", "skill", name="uq_application_skills_application_skill"),
+    sa.Index("ix_application_skills_job_skill", "job_id", "skill", "application_id"),
+)
+sa.Table(
+    "document_extractions", metadata,
+    sa.Column("content_hash", sa.String(64), primary_key=True),
+    sa.Column("text", sa.Text, nullable=False),
+    sa.Column("skills", sa.Text),
+    sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+)
+sa.Table(
+    "job_notification_milestones", metadata,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("job_id", sa.Integer, sa.ForeignKey("jobs.id"), nullable=False),
+    sa.Column("milestone", sa.Integer, nullable=False),
+    sa.Column("notified_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    sa.Index("uq_job_notification_milestones_job_milestone", "job_id", "milestone", unique=True),
+)
+sa.Table(
+    "notifications", metadata,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+    sa.Column("title", sa.String, nullable=False),
+    sa.Column("message", sa.Text, nullable=False),
+    sa.Column("type", sa.String, nullable=False),
+    sa.Column("data", sa.Text),
+    sa.Column("is_read", sa.Boolean),
+    sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    sa.Index("ix_notifications_user_read", "user_id", "is_read"),
+)
+sa.Table(
+    "refresh_tokens", metadata,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False, index=True),
+    sa.Column("token_hash", sa.String(64), nullable=False, unique=True),
+    sa.Column("family_id", sa.String(32), nullable=False, index=True),
+    sa.Column("expires_at", sa.DateTime, nullable=False),
+    sa.Column("rotated_at", sa.DateTime),
+    sa.Column("revoked_at", sa.DateTime),
+    sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+)
+
+SEARCH_SCHEMA = {
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS application_search USING fts5(
+            cover_letter,
+            resume_text,
+            scope,
+            job_id UNINDEXED,
+            poster_id UNINDEXED,
+            tokenize = 'porter unicode61'
+        )
+        """,
+    ],
+    "postgresql": [
+        """
+        CREATE TABLE IF NOT EXISTS application_search (
+            application_id INTEGER PRIMARY KEY REFERENCES applications(id) ON DELETE CASCADE,
+            job_id INTEGER NOT NULL,
+            poster_id INTEGER NOT NULL,
+            cover_letter TEXT,
+            resume_text TEXT,
+            document tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(cover_letter, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(resume_text, '')), 'B')
+            ) STORED
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_application_search_document ON application_search USING GIN (document)",
+        "CREATE INDEX IF NOT EXISTS ix_application_search_poster ON application_search (poster_id, job_id)",
+    ],
+}
+
+
+def _adopt_table(inspector, table: sa.Table):
+    """Add the columns and indexes an older database lacks (all added columns are nullable)"""
+    columns = {column["name"] for column in inspector.get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in columns:
+            op.add_column(table.name, sa.Column(column.name, column.type, nullable=True))
+
+    if table.name == "job_notification_milestones":
+        # Rows only record that a notification went out: keep the first of each
+        run_in_batches("""
+            DELETE FROM job_notification_milestones WHERE id IN (
+                SELECT id FROM job_notification_milestones m WHERE id > (
+                    SELECT MIN(id) FROM job_notification_milestones earliest
+                    WHERE earliest.job_id = m.job_id AND earliest.milestone = m.milestone
+                ) LIMIT :batch_size
+            )
+        """)
+
+    for index in sorted(table.indexes, key=lambda index: index.name):
+        create_index_online(index.name, table.name, [column.name for column in index.columns], unique=index.unique)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing = set(inspector.get_table_names())
+    for table in metadata.sorted_tables:
+        if table.name in existing:
+            _adopt_table(inspector, table)
+        else:
+            table.create(bind)
+
+    for statement in SEARCH_SCHEMA.get(bind.dialect.name, []):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TABLE IF EXISTS application_search")
+    bind = op.get_bind()
+    metadata.drop_all(bind)
+    if bind.dialect.name == "postgresql":
+        for enum in (user_role, job_status, application_status):
+            enum.drop(bind, checkfirst=True)
@@ -0,0 +1,46 @@
+"""Track which applications are in the skill and search indexes
+
+Indexing runs in the background after an application is submitted and could
+be lost (queue full, restart). applications.indexed_at lets the scoring
+worker find and retry those. Applications that already have a search
+document are marked as indexed.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-20 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migrations import create_index_online, run_in_batches
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("applications", sa.Column("indexed_at", sa.DateTime(timezone=True), nullable=True))
+    create_index_online("ix_applications_indexed_at", "applications", ["indexed_at"])
+
+    document_id = "application_id" if op.get_bind().dialect.name == "postgresql" else "rowid"
+    run_in_batches(f"""
+        UPDATE applications SET indexed_at = CURRENT_TIMESTAMP WHERE id IN (
+            SELECT id FROM applications
+            WHERE indexed_at IS NULL AND id IN (SELECT {document_id} FROM application_search)
+            LIMIT :batch_size
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_applications_indexed_at", table_name="applications")
+    with op.batch_alter_table("applications") as batch_op:
+        batch_op.drop_column("indexed_at")
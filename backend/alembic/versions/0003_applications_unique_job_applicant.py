@@ -0,0 +1,46 @@
+"""One application per applicant and job
+
+Older databases may hold several applications for the same (job_id,
+applicant_id): create_application only checked before inserting. They carry
+analyses and employer notes, so this revision doesn't pick which one
+survives: it stops with the count, and dedupe_applications.py reports them
+and merges each group into one application. The revisions before this one
+are applied and committed either way.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-21 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migrations import create_index_online
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT COUNT(*) FROM (SELECT job_id, applicant_id FROM applications "
+        "GROUP BY job_id, applicant_id HAVING COUNT(*) > 1) AS duplicates"
+    )).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{duplicates} (job_id, applicant_id) pairs have several applications; "
+            f"list them with `python dedupe_applications.py`, merge them with --merge, "
+            f"then rerun `alembic upgrade head`"
+        )
+    create_index_online("uq_applications_job_applicant", "applications", ["job_id", "applicant_id"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("uq_applications_job_applicant", table_name="applications")
@@ -2,175 +2,245 @@
 AI-powered applicant ranking service using Google Gemini
 """
 import logging
+import hashlib
 import json
-import io
-import tempfile
-import os
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
 from typing import List, Dict, Optional
 from pathlib import Path
-import google.generativeai as genai
 from app.config import settings
 from app.models import Application
-from app.storage import gcp_storage
-
-# Document processing imports
-try:
-    from PyPDF2 import PdfReader
-    from docx import Document
-    from PIL import Image
-    from pdf2image import convert_from_path
-    import pytesseract
-    DOCUMENT_PROCESSING_AVAILABLE = True
-except ImportError as e:
-    logger = logging.getLogger(__name__)
-    logger.warning(f"Document processing libraries not available: {e}")
-    DOCUMENT_PROCESSING_AVAILABLE = False
+from app.crud import get_document_extraction, save_document_extraction
+from app.database import SessionLocal
+from app.storage import file_storage, content_hash, content_hash_from_path
+from app.metrics import RankingTrace, metrics
+from app.llm_backends import ModelBackend, ReplayMissError, create_backend
+from app.extraction import DOCUMENT_PROCESSING_AVAILABLE, ExtractionError, extraction_pool
 
 logger = logging.getLogger(__name__)
 
+# Part of every analysis fingerprint: bump when a prompt change makes stored scores incomparable
+PROMPT_VERSION = "absolute-v1"
+
+
+def _stage(trace: Optional[RankingTrace], name: str):
+    """Time a stage on the trace if one is being recorded"""
+    return trace.stage(name) if trace else nullcontext()
+
 
 class ResumeExtractor:
     """Extract text content from various resume formats"""
     
+    # Extracted text keyed by blob path; blobs are content-addressed and never rewritten.
+    # Behind it, document_extractions shares results by content hash across processes.
+    _cache: "OrderedDict[str, str]" = OrderedDict()
+    _cache_lock = threading.Lock()
+    
+    @staticmethod
+    def extract_text_from_pdf(file_content: bytes, trace: Optional[RankingTrace] = None) -> str:
+        """Extract text from PDF file (OCR for scanned pages) in a sandboxed worker"""
+        return ResumeExtractor._extract_sandboxed(file_content, "pdf", trace)
+    
     @staticmethod
-    def extract_text_from_pdf(file_content: bytes) -> str:
-        """Extract text from PDF file"""
+    def extract_text_from_docx(file_content: bytes, trace: Optional[RankingTrace] = None) -> str:
+        """Extract text from DOCX file in a sandboxed worker"""
+        return ResumeExtractor._extract_sandboxed(file_content, "docx", trace)
+    
+    @staticmethod
+    def _extract_sandboxed(file_content: bytes, kind: str, trace: Optional[RankingTrace]) -> str:
         try:
-            pdf_file = io.BytesIO(file_content)
-            reader = PdfReader(pdf_file)
-            text = ""
-            
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-            
-            # If no text extracted, try OCR
-            if not text.strip():
-                logger.info("No text in PDF, attempting OCR")
-                text = ResumeExtractor.extract_text_with_ocr(file_content)
-            
-            return text.strip()
-        except Exception as e:
-            logger.error(f"Failed to extract text from PDF: {e}")
-            return ""
+            return extraction_pool.extract(file_content, kind, trace)
+        except ExtractionError as e:
+            # Oversized or hostile documents: not the same as "no resume", let the caller say so
+            logger.error(f"Failed to extract text from {kind.upper()} ({e.kind}): {e}")
+            metrics.inc("resume_extractions_total", outcome="unreadable")
+            if trace:
+                trace.resume_unreadable(e.kind)
+            raise
     
     @staticmethod
-    def extract_text_with_ocr(file_content: bytes) -> str:
-        """Extract text from PDF using OCR"""
+    def _stored_text(document_hash: str) -> Optional[str]:
+        """Previously extracted text of a document, by content hash"""
+        db = SessionLocal()
         try:
-            # Save to temporary file for pdf2image
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp_file:
-                tmp_file.write(file_content)
-                tmp_path = tmp_file.name
-            
-            try:
-                # Convert PDF to images
-                images = convert_from_path(tmp_path)
-                text = ""
-                
-                for i, image in enumerate(images):
-                    logger.info(f"Performing OCR on page {i+1}")
-                    page_text = pytesseract.image_to_string(image)
-                    text += page_text + "\n"
-                
-                return text.strip()
-            finally:
-                # Clean up temp file
-                if os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
-                    
+            extraction = get_document_extraction(db, document_hash)
+            return extraction.text if extraction else None
         except Exception as e:
-            logger.error(f"OCR extraction failed: {e}")
-            return ""
+            logger.error(f"Failed to read stored extraction {document_hash}: {e}")
+            return None
+        finally:
+            db.close()
     
     @staticmethod
-    def extract_text_from_docx(file_content: bytes) -> str:
-        """Extract text from DOCX file"""
+    def _store_text(document_hash: str, text: str):
+        db = SessionLocal()
         try:
-            docx_file = io.BytesIO(file_content)
-            doc = Document(docx_file)
-            text = ""
-            
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            
-            # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        text += cell.text + " "
-                    text += "\n"
-            
-            return text.strip()
+            save_document_extraction(db, document_hash, text)
+            db.commit()
         except Exception as e:
-            logger.error(f"Failed to extract text from DOCX: {e}")
-            return ""
+            # Most likely a concurrent extraction of the same document stored it first
+            db.rollback()
+            logger.warning(f"Failed to store extraction {document_hash}: {e}")
+        finally:
+            db.close()
+    
+    @staticmethod
+    def extract_resume_content(resume_blob_path: str, trace: Optional[RankingTrace] = None) -> Optional[str]:
+        """Download and extract text from resume (once per distinct document), None if unavailable"""
+        try:
+            return ResumeExtractor.read_resume(resume_blob_path, trace)
+        except ExtractionError:
+            return None
     
     @staticmethod
-    def extract_resume_content(resume_blob_path: str) -> Optional[str]:
-        """Download and extract text from resume"""
+    def read_resume(resume_blob_path: str, trace: Optional[RankingTrace] = None) -> Optional[str]:
+        """
+        Like extract_resume_content, but raises ExtractionError when the document
+        exists and could not be parsed (timeout, memory or CPU limit, crash, ...)
+        """
+        with ResumeExtractor._cache_lock:
+            cached = ResumeExtractor._cache.get(resume_blob_path)
+            if cached is not None:
+                ResumeExtractor._cache.move_to_end(resume_blob_path)
+        if cached is not None:
+            if trace:
+                trace.cache_hit()
+            return cached
+        
+        document_hash = content_hash_from_path(resume_blob_path)
+        if document_hash:
+            text = ResumeExtractor._stored_text(document_hash)
+            if text is not None:
+                metrics.inc("resume_extractions_total", outcome="shared")
+                if trace:
+                    trace.cache_hit()
+                ResumeExtractor._remember(resume_blob_path, text)
+                return text
+        if trace:
+            trace.cache_miss()
+        
         try:
-            # Download file from GCS
-            if not gcp_storage.client or not gcp_storage.bucket:
-                logger.error("GCS not initialized")
+            # Download file from storage
+            if not file_storage.available:
+                logger.error(f"{file_storage.name} storage not initialized")
                 return None
             
-            blob = gcp_storage.bucket.blob(resume_blob_path)
-            file_content = blob.download_as_bytes()
+            with _stage(trace, "download"):
+                file_content = file_storage.read_file(resume_blob_path)
+            if file_content is None:
+                return None
+            
+            if not document_hash:
+                # Legacy uuid-named blob: the same document may have been extracted under another name
+                document_hash = content_hash(file_content)
+                text = ResumeExtractor._stored_text(document_hash)
+                if text is not None:
+                    metrics.inc("resume_extractions_total", outcome="shared")
+                    ResumeExtractor._remember(resume_blob_path, text)
+                    return text
             
             # Determine file type and extract accordingly
             file_ext = Path(resume_blob_path).suffix.lower()
             
             if file_ext == '.pdf':
-                return ResumeExtractor.extract_text_from_pdf(file_content)
+                text = ResumeExtractor.extract_text_from_pdf(file_content, trace)
             elif file_ext in ['.docx', '.doc']:
-                return ResumeExtractor.extract_text_from_docx(file_content)
+                text = ResumeExtractor.extract_text_from_docx(file_content, trace)
             else:
                 logger.warning(f"Unsupported file type: {file_ext}")
                 return None
+            
+            metrics.inc("resume_extractions_total", outcome="parsed" if text else "empty")
+            if text:
+                ResumeExtractor._remember(resume_blob_path, text)
+                ResumeExtractor._store_text(document_hash, text)
+            return text
                 
+        except ExtractionError:
+            raise
         except Exception as e:
             logger.error(f"Failed to extract resume content: {e}")
             return None
+    
+    @staticmethod
+    def _remember(resume_blob_path: str, text: str):
+        """Store extracted text, evicting the least recently used entries"""
+        with ResumeExtractor._cache_lock:
+            ResumeExtractor._cache[resume_blob_path] = text
+            ResumeExtractor._cache.move_to_end(resume_blob_path)
+            while len(ResumeExtractor._cache) > settings.AI_RESUME_CACHE_SIZE:
+                ResumeExtractor._cache.popitem(last=False)
 
 
 class ApplicantAIAnalyzer:
     """Analyzes and ranks job applicants using Gemini AI"""
     
-    def __init__(self):
-        self.api_key = settings.GEMINI_API_KEY
-        if self.api_key:
-            try:
-                genai.configure(api_key=self.api_key)
-                self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-                logger.info("Gemini AI initialized successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize Gemini AI: {e}")
-                self.model = None
-        else:
-            logger.warning("GEMINI_API_KEY not configured")
-            self.model = None
+    def __init__(self, backend: Optional[ModelBackend] = None):
+        # Backend is chosen by settings.AI_BACKEND unless one is injected (benchmarks, replay)
+        self.backend = backend if backend is not None else create_backend()
+    
+    @property
+    def model_version(self) -> str:
+        """Version recorded with persisted analyses ("fallback" when no model is configured)"""
+        return self.backend.model_version if self.backend else "fallback"
+    
+    def fingerprint(self, application: Application, job_title: str, job_description: str,
+                    job_requirements: Optional[str], model_version: Optional[str] = None) -> str:
+        """Hash of everything an analysis depends on; a change means the stored analysis is stale"""
+        payload = json.dumps([
+            model_version or self.model_version,
+            PROMPT_VERSION,
+            job_title,
+            job_description,
+            job_requirements,
+            application.cover_letter,
+            application.resume_url,
+        ])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
     
     def analyze_applicants(
         self, 
         applications: List[Application], 
         job_title: str,
         job_description: str,
-        job_requirements: Optional[str] = None
+        job_requirements: Optional[str] = None,
+        trace: Optional[RankingTrace] = None
     ) -> List[Dict]:
         """
-        Analyze and rank applicants using AI with resume content extraction
+        Analyze applicants using AI with resume content extraction
         
-        Returns list of applications with AI scores and insights
+        Returns list of applications with AI scores and insights. Each applicant is
+        scored on an absolute rubric, independently of the others in the batch, so
+        scores from different calls can be sorted and compared.
+        Stage timings, sizes and fallback reasons are recorded on `trace`
+        (a new one is created when not given) and published to the metrics registry.
         """
-        if not self.model:
+        trace = trace or RankingTrace()
+        trace.applicants = len(applications)
+        try:
+            return self._analyze(applications, job_title, job_description, job_requirements, trace)
+        finally:
+            trace.finish()
+    
+    def _analyze(
+        self,
+        applications: List[Application],
+        job_title: str,
+        job_description: str,
+        job_requirements: Optional[str],
+        trace: RankingTrace
+    ) -> List[Dict]:
+        if not self.backend:
             logger.warning("Gemini AI not available, returning unranked applications")
+            trace.fallback("model_unavailable")
             return self._fallback_ranking(applications)
         
         if not applications:
             return []
         
+        # Application id -> ExtractionError kind, for resumes that exist but could not be parsed
+        unreadable: Dict[int, str] = {}
         try:
             # Prepare applicant data with resume content extraction
             applicants_data = []
@@ -178,7 +248,10 @@ class ApplicantAIAnalyzer:
                 resume_content = None
                 if app.resume_url and DOCUMENT_PROCESSING_AVAILABLE:
                     logger.info(f"Extracting resume for application {app.id}")
-                    resume_content = ResumeExtractor.extract_resume_content(app.resume_url)
+                    try:
+                        resume_content = ResumeExtractor.read_resume(app.resume_url, trace)
+                    except ExtractionError as e:
+                        unreadable[app.id] = e.kind
                     if resume_content:
                         logger.info(f"Successfully extracted {len(resume_content)} characters from resume")
                     else:
@@ -191,32 +264,55 @@ class ApplicantAIAnalyzer:
                     "cover_letter": app.cover_letter or "No cover letter provided",
                     "has_resume": bool(app.resume_url),
                     "resume_content": resume_content if resume_content else "Resume not accessible or no text content",
+                    "resume_unreadable": unreadable.get(app.id),
                     "status": app.status.value
                 }
                 applicants_data.append(applicant_info)
             
             # Create comprehensive prompt for Gemini with resume analysis
-            prompt = self._create_analysis_prompt(
-                job_title=job_title,
-                job_description=job_description,
-                job_requirements=job_requirements,
-                applicants=applicants_data
-            )
+            with trace.stage("prompt_build"):
+                prompt = self._create_analysis_prompt(
+                    job_title=job_title,
+                    job_description=job_description,
+                    job_requirements=job_requirements,
+                    applicants=applicants_data
+                )
+            trace.prompt_chars = len(prompt)
             
             # Get AI analysis
-            logger.info("Sending request to Gemini AI for applicant analysis")
-            response = self.model.generate_content(prompt)
-            analysis_text = response.text
+            logger.info(f"Sending request to {self.backend.name} backend for applicant analysis")
+            with trace.stage("inference"):
+                response = self.backend.generate(prompt)
+                analysis_text = response.text
+            trace.response_chars = len(analysis_text)
+            trace.prompt_tokens = response.prompt_token_count
+            trace.response_tokens = response.candidates_token_count
             
             # Parse the AI response
-            ranked_applicants = self._parse_ai_response(analysis_text, applications)
+            with trace.stage("parse"):
+                ranked_applicants = self._parse_ai_response(analysis_text, applications, trace)
             
             logger.info(f"Successfully analyzed {len(ranked_applicants)} applicants")
-            return ranked_applicants
+            return self._flag_unreadable_resumes(ranked_applicants, unreadable)
             
+        except ReplayMissError as e:
+            logger.error(f"AI analysis failed: {e}")
+            trace.fallback("replay_miss")
+            return self._flag_unreadable_resumes(self._fallback_ranking(applications), unreadable)
         except Exception as e:
             logger.error(f"AI analysis failed: {e}")
-            return self._fallback_ranking(applications)
+            trace.fallback("analysis_error")
+            return self._flag_unreadable_resumes(self._fallback_ranking(applications), unreadable)
+    
+    @staticmethod
+    def _flag_unreadable_resumes(results: List[Dict], unreadable: Dict[int, str]) -> List[Dict]:
+        """Say in the stored concerns when a resume was scored without being read"""
+        for result in results:
+            kind = unreadable.get(result["application"].id)
+            if kind:
+                concerns = [concern for concern in result["ai_analysis"]["concerns"] if concern]
+                result["ai_analysis"]["concerns"] = concerns + [f"Resume could not be read ({kind}); scored without it"]
+        return results
     
     def _create_analysis_prompt(
         self, 
@@ -229,7 +325,9 @@ class ApplicantAIAnalyzer:
         
         requirements_section = f"\n**Requirements:**\n{job_requirements}" if job_requirements else ""
         
-        prompt = f"""You are an expert HR professional and talent acquisition specialist with extensive experience in technical recruiting. Analyze the following job applicants and rank them based on their suitability for the position.
+        prompt = f"""You are an expert HR professional and talent acquisition specialist with extensive experience in technical recruiting. Score each of the following job applicants on their suitability for the position.
+
+Score every applicant independently, against the job and the absolute criteria below only. Do not compare applicants with each other or spread scores across this group: applicants are analyzed in separate batches as they apply, and all their scores are ranked together.
 
 **Job Position:** {job_title}
 
@@ -245,7 +343,10 @@ class ApplicantAIAnalyzer:
    - **Resume Content:** 
      {applicant['resume_content'][:3000] if len(applicant['resume_content']) > 3000 else applicant['resume_content']}
      {"... (truncated for length)" if len(applicant['resume_content']) > 3000 else ""}
-""" if applicant['resume_content'] != "Resume not accessible or no text content" else "\n   - **Resume:** Not available\n"
+""" if applicant['resume_content'] != "Resume not accessible or no text content" else (
+                f"\n   - **Resume:** Attached but could not be read ({applicant['resume_unreadable']}); do not treat it as missing\n"
+                if applicant['resume_unreadable'] else "\n   - **Resume:** Not available\n"
+            )
 
             prompt += f"""
 {i}. **{applicant['name']}** (@{applicant['username']})
@@ -327,12 +428,17 @@ Analyze each applicant comprehensively and provide a JSON response with the foll
 - "maybe" - Moderate fit, consider as backup (overall_score >= 50)
 - "pass" - Not a good fit for this position (overall_score < 50)
 
-Please provide ONLY the JSON array, no additional text or markdown formatting. Order by overall_score descending (best candidates first).
+Please provide ONLY the JSON array, no additional text or markdown formatting. Return one object per applicant, in the order given.
 """
         
         return prompt
     
-    def _parse_ai_response(self, response_text: str, applications: List[Application]) -> List[Dict]:
+    def _parse_ai_response(
+        self,
+        response_text: str,
+        applications: List[Application],
+        trace: Optional[RankingTrace] = None
+    ) -> List[Dict]:
         """Parse AI response and merge with application data"""
         
         try:
@@ -383,9 +489,13 @@ Please provide ONLY the JSON array, no additional text or markdown formatting. O
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse AI response as JSON: {e}")
             logger.error(f"Response text: {response_text[:500]}")
+            if trace:
+                trace.fallback("invalid_json")
             return self._fallback_ranking(applications)
         except Exception as e:
             logger.error(f"Error parsing AI response: {e}")
+            if trace:
+                trace.fallback("parse_error")
             return self._fallback_ranking(applications)
     
     def _fallback_ranking(self, applications: List[Application]) -> List[Dict]:
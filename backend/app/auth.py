@@ -1,21 +1,103 @@
 import hashlib
 import hmac
 import json
+import logging
+import secrets
+import threading
+import time
 import urllib.parse
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.config import settings
+from app.crud import (
+    create_refresh_token, get_refresh_token, mark_refresh_token_rotated, revoke_refresh_token_family
+)
 from app.database import get_db
+from app.metrics import metrics
 from app.models import User
 from app.schemas import UserRole
+from app.user_cache import user_cache
 
+logger = logging.getLogger(__name__)
 
 security = HTTPBearer()
 
+# Telegram initData is valid for 24 hours
+INIT_DATA_MAX_AGE_SECONDS = 86400
+
+
+class VerifiedInitDataCache:
+    """
+    Recently verified initData, by its sha256
+    The Mini App sends the same initData every time it is opened in a session;
+    a repeat skips parsing and the HMAC check. Entries expire with the initData.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # digest -> (expiry as epoch seconds, auth_date, user data), least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, int, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(init_data: str) -> str:
+        return hashlib.sha256(init_data.encode()).hexdigest()
+
+    def get(self, digest: str) -> Optional[Tuple[int, dict]]:
+        """(auth_date, user data) of verified initData, or None"""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            expires_at, auth_date, user_data = entry
+            if expires_at < time.time():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return auth_date, dict(user_data)
+
+    def add(self, digest: str, auth_date: int, user_data: dict):
+        if self.max_size <= 0:
+            return
+        expires_at = min(time.time() + self.ttl_seconds, auth_date + INIT_DATA_MAX_AGE_SECONDS)
+        with self._lock:
+            self._entries[digest] = (expires_at, auth_date, dict(user_data))
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+verified_init_data = VerifiedInitDataCache(
+    max_size=settings.TELEGRAM_INIT_DATA_CACHE_SIZE,
+    ttl_seconds=settings.TELEGRAM_INIT_DATA_CACHE_TTL_SECONDS
+)
+
+
+@lru_cache(maxsize=4)
+def _webapp_secret_key(bot_token: str) -> bytes:
+    """initData HMAC key; depends only on the bot token, so derived once"""
+    return hmac.new(
+        b"WebAppData",
+        bot_token.encode(),
+        hashlib.sha256
+    ).digest()
+
+
+def _check_auth_date(auth_date: int):
+    if datetime.now().timestamp() - auth_date > INIT_DATA_MAX_AGE_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Telegram data expired"
+        )
+
 
 def verify_telegram_webapp_data(init_data: str) -> dict:
     """
@@ -29,6 +111,15 @@ def verify_telegram_webapp_data(init_data: str) -> dict:
                 detail="Telegram bot token not configured. Please set TELEGRAM_BOT_TOKEN in environment variables."
             )
         
+        # Same initData as a recent login: already verified
+        digest = verified_init_data.digest(init_data)
+        cached = verified_init_data.get(digest)
+        if cached:
+            auth_date, user_data = cached
+            _check_auth_date(auth_date)
+            metrics.inc("telegram_init_data_verifications_total", outcome="cached")
+            return user_data
+        
         # Parse the init_data
         parsed_data = urllib.parse.parse_qs(init_data)
         
@@ -48,21 +139,14 @@ def verify_telegram_webapp_data(init_data: str) -> dict:
         
         data_check_string = '\n'.join(sorted(data_check_string_parts))
         
-        # Create secret key
-        secret_key = hmac.new(
-            b"WebAppData",
-            settings.TELEGRAM_BOT_TOKEN.encode(),
-            hashlib.sha256
-        ).digest()
-        
         # Verify hash
         calculated_hash = hmac.new(
-            secret_key,
+            _webapp_secret_key(settings.TELEGRAM_BOT_TOKEN),
             data_check_string.encode(),
             hashlib.sha256
         ).hexdigest()
         
-        if calculated_hash != received_hash:
+        if not hmac.compare_digest(calculated_hash, received_hash):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid Telegram data hash"
@@ -73,12 +157,10 @@ def verify_telegram_webapp_data(init_data: str) -> dict:
         
         # Check auth_date (should be within 24 hours)
         auth_date = int(parsed_data.get('auth_date', ['0'])[0])
-        if datetime.now().timestamp() - auth_date > 86400:  # 24 hours
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Telegram data expired"
-            )
+        _check_auth_date(auth_date)
         
+        verified_init_data.add(digest, auth_date, user_data)
+        metrics.inc("telegram_init_data_verifications_total", outcome="verified")
         return user_data
         
     except Exception as e:
@@ -100,6 +182,105 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def create_user_access_token(user: User) -> str:
+    """
+    Access token; role and telegram_id are for clients to read, role checks
+    use the stored user (see _check_roles)
+    """
+    return create_access_token(data={
+        "sub": str(user.id),
+        "tid": user.telegram_id,
+        "role": user.role.value if user.role else None,
+    })
+
+
+def _hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_refresh_token(db: Session, user_id: int, family_id: Optional[str] = None) -> str:
+    """
+    New opaque refresh token; only its hash is stored
+    Tokens rotated from the same login share a family, revoked together on reuse
+    """
+    token = secrets.token_urlsafe(32)
+    create_refresh_token(
+        db,
+        user_id=user_id,
+        token_hash=_hash_refresh_token(token),
+        family_id=family_id or uuid.uuid4().hex,
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    return token
+
+
+def login_refresh_token(db: Session, user_id: int, token: Optional[str] = None) -> str:
+    """
+    Refresh token for a login: the one the client sent when it is a live
+    token of this user with over half its lifetime left (a single SELECT, no
+    write), else a newly issued one
+    """
+    if token:
+        record = get_refresh_token(db, _hash_refresh_token(token))
+        renew_after = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS / 2)
+        if (
+            record is not None and record.user_id == user_id
+            and record.revoked_at is None and record.rotated_at is None
+            and record.expires_at > renew_after
+        ):
+            metrics.inc("auth_login_refresh_tokens_total", outcome="reused")
+            return token
+    metrics.inc("auth_login_refresh_tokens_total", outcome="issued")
+    return issue_refresh_token(db, user_id)
+
+
+def rotate_refresh_token(db: Session, token: str) -> Tuple[User, str]:
+    """
+    Exchange a refresh token for its successor (the old one stops working)
+
+    A rotated token presented again later than REFRESH_TOKEN_REUSE_GRACE_SECONDS
+    (client retries are tolerated) has leaked: its whole family is revoked.
+    """
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token"
+    )
+    record = get_refresh_token(db, _hash_refresh_token(token))
+    now = datetime.utcnow()
+    if record is None or record.revoked_at is not None or record.expires_at <= now:
+        metrics.inc("auth_refresh_total", outcome="invalid")
+        raise invalid
+
+    outcome = "rotated"
+    if not mark_refresh_token_rotated(db, record.id):
+        # Already exchanged (or revoked meanwhile)
+        db.refresh(record)
+        if record.revoked_at is not None or record.rotated_at is None:
+            metrics.inc("auth_refresh_total", outcome="invalid")
+            raise invalid
+        if now - record.rotated_at > timedelta(seconds=settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS):
+            revoked = revoke_refresh_token_family(db, record.family_id)
+            logger.warning(f"Refresh token reuse for user {record.user_id}, revoked {revoked} tokens")
+            metrics.inc("auth_refresh_total", outcome="reused")
+            raise invalid
+        # A client retry racing the first exchange: give it a token too
+        outcome = "retried"
+
+    user = user_cache.get_user(db, record.user_id)
+    if user is None:
+        raise invalid
+    metrics.inc("auth_refresh_total", outcome=outcome)
+    return user, issue_refresh_token(db, record.user_id, family_id=record.family_id)
+
+
+def revoke_refresh_token(db: Session, token: str) -> bool:
+    """Log out a session: revoke every token of the refresh token's family"""
+    record = get_refresh_token(db, _hash_refresh_token(token))
+    if record is None:
+        return False
+    return revoke_refresh_token_family(db, record.family_id) > 0
+
+
 def verify_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
@@ -111,16 +292,10 @@ def verify_token(token: str) -> dict:
         )
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+def get_token_claims(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """
-    Get current authenticated user from JWT token
+    Verified claims of the bearer access token (no database access)
     """
-    import logging
-    logger = logging.getLogger(__name__)
-    
     if not credentials:
         logger.error("No credentials provided")
         raise HTTPException(
@@ -128,35 +303,46 @@ def get_current_user(
             detail="No credentials provided"
         )
     
-    token = credentials.credentials
-    logger.info(f"Authenticating with token: {token[:20]}...")
-    
     try:
-        payload = verify_token(token)
+        payload = verify_token(credentials.credentials)
     except HTTPException as e:
         logger.error(f"Token verification failed: {e.detail}")
         raise
     
-    user_id = payload.get("sub")
-    if user_id is None:
+    if payload.get("sub") is None:
         logger.error("No user_id in token payload")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
-    
-    user = db.query(User).filter(User.id == user_id).first()
+    return payload
+
+
+def _user_from_claims(claims: dict, db: Session) -> User:
+    user_id = claims["sub"]
+    try:
+        user = user_cache.get_user(db, int(user_id))
+    except ValueError:
+        user = None
     if user is None:
         logger.error(f"User with id {user_id} not found in database")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
-    
-    logger.info(f"User authenticated successfully: {user.username} (id: {user.id})")
     return user
 
 
+def get_current_user(
+    claims: dict = Depends(get_token_claims),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Get current authenticated user from JWT token
+    """
+    return _user_from_claims(claims, db)
+
+
 def get_current_user_or_none(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: Session = Depends(get_db)
@@ -168,22 +354,28 @@ def get_current_user_or_none(
         return None
     
     try:
-        return get_current_user(credentials, db)
+        return _user_from_claims(get_token_claims(credentials), db)
     except HTTPException:
         return None
 
 
+def _check_roles(claims: dict, db: Session, allowed: list[UserRole], detail: str) -> User:
+    """Role check against the stored role, so a role change applies to tokens already issued"""
+    user = _user_from_claims(claims, db)
+    if user.role not in allowed:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=detail
+        )
+    return user
+
+
 def require_role(required_role: UserRole):
     """
     Decorator to require specific user role
     """
-    def role_checker(current_user: User = Depends(get_current_user)):
-        if current_user.role != required_role:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Access denied. Required role: {required_role}"
-            )
-        return current_user
+    def role_checker(claims: dict = Depends(get_token_claims), db: Session = Depends(get_db)):
+        return _check_roles(claims, db, [required_role], f"Access denied. Required role: {required_role}")
     
     return role_checker
 
@@ -192,12 +384,7 @@ def require_roles(required_roles: list[UserRole]):
     """
     Decorator to require one of multiple user roles
     """
-    def role_checker(current_user: User = Depends(get_current_user)):
-        if current_user.role not in required_roles:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Access denied. Required roles: {', '.join(required_roles)}"
-            )
-        return current_user
+    def role_checker(claims: dict = Depends(get_token_claims), db: Session = Depends(get_db)):
+        return _check_roles(claims, db, required_roles, f"Access denied. Required roles: {', '.join(required_roles)}")
     
     return role_checker
@@ -0,0 +1,170 @@
+"""
+Copies of Telegram profile photos
+
+User.photo_url points at Telegram's CDN, which is slow from our users' region
+and whose URLs eventually expire. Each photo is fetched once into storage
+("avatars/<sha256>.jpg", so users sharing a photo share the file), resized
+variants are rendered like uploaded pictures, and clients load it from
+/uploads with long-lived cache headers. A login with a new photo_url refetches.
+
+photo_url is only set from verified Telegram login data, but it is still
+fetched and redirected to only when it is an https URL on Telegram's hosts
+(is_telegram_photo_url), and redirects are followed by hand so every hop is
+checked: the server never requests, nor sends clients to, anything else.
+"""
+import logging
+import mimetypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from urllib.parse import urljoin, urlsplit
+import httpx
+from app import crud
+from app.config import settings
+from app.database import SessionLocal
+from app.image_worker import image_processor
+from app.metrics import metrics
+from app.storage import file_storage
+
+logger = logging.getLogger(__name__)
+
+AVATAR_FOLDER = "avatars"
+# Hosts serving Telegram profile photos (and their subdomains, e.g. cdn4.telesco.pe)
+TELEGRAM_PHOTO_HOSTS = ("t.me", "telegram.org", "telesco.pe", "cdn-telegram.org", "telegram-cdn.org")
+MAX_REDIRECTS = 3
+
+
+def is_telegram_photo_url(url: Optional[str]) -> bool:
+    """True for https URLs on Telegram's photo hosts, on the default port"""
+    try:
+        parts = urlsplit(url or "")
+        port = parts.port
+    except ValueError:
+        return False
+    host = (parts.hostname or "").lower()
+    return (
+        parts.scheme == "https"
+        and port in (None, 443)
+        and any(host == allowed or host.endswith("." + allowed) for allowed in TELEGRAM_PHOTO_HOSTS)
+    )
+
+
+class AvatarTooLarge(Exception):
+    pass
+
+
+class AvatarUrlRejected(Exception):
+    pass
+
+
+class AvatarFetcher:
+    """Downloads Telegram photos into storage in background threads"""
+
+    def __init__(self, max_workers: int, timeout_seconds: float, max_size: int):
+        self.timeout_seconds = timeout_seconds
+        self.max_size = max_size
+        self._executor = ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix="avatar-fetch")
+        self._lock = threading.Lock()
+        self._queued = set()
+
+    def needs_refresh(self, user) -> bool:
+        """True when the user's Telegram photo hasn't been copied yet (or changed since)"""
+        return (
+            is_telegram_photo_url(user.photo_url)
+            and (not user.avatar_url or user.avatar_source_url != user.photo_url)
+        )
+
+    def refresh(self, user) -> bool:
+        """Schedule fetching the user's current photo if needed; False if nothing was queued"""
+        if not self.needs_refresh(user):
+            return False
+        return self.enqueue(user.id, user.photo_url)
+
+    def enqueue(self, user_id: int, photo_url: str) -> bool:
+        with self._lock:
+            if (user_id, photo_url) in self._queued:
+                return False
+            self._queued.add((user_id, photo_url))
+        self._executor.submit(self._run, user_id, photo_url)
+        return True
+
+    def _run(self, user_id: int, photo_url: str):
+        try:
+            metrics.inc("avatar_fetches_total", outcome=self._process(user_id, photo_url))
+        except AvatarTooLarge:
+            logger.warning(f"Telegram photo of user {user_id} exceeds {self.max_size} bytes")
+            metrics.inc("avatar_fetches_total", outcome="too_large")
+        except AvatarUrlRejected as e:
+            logger.warning(f"Not fetching the photo of user {user_id}: {e}")
+            metrics.inc("avatar_fetches_total", outcome="rejected_url")
+        except Exception as e:
+            logger.error(f"Fetching the Telegram photo of user {user_id} failed: {e}")
+            metrics.inc("avatar_fetches_total", outcome="error")
+        finally:
+            with self._lock:
+                self._queued.discard((user_id, photo_url))
+
+    def _process(self, user_id: int, photo_url: str) -> str:
+        downloaded = self._download(photo_url)
+        if downloaded is None:
+            return "not_image"
+        content, content_type = downloaded
+
+        extension = mimetypes.guess_extension(content_type) or ".jpg"
+        key = file_storage.upload_file(content, f"avatar{extension}", content_type=content_type, folder=AVATAR_FOLDER)
+        if not key:
+            return "storage_error"
+        image_processor.enqueue(key)
+
+        db = SessionLocal()
+        try:
+            if not crud.update_user_avatar(db, user_id, photo_url, key):
+                # The user logged in with another photo meanwhile; that fetch records its own
+                return "stale"
+        finally:
+            db.close()
+        logger.info(f"Stored Telegram photo of user {user_id} as {key}")
+        return "stored"
+
+    def _download(self, photo_url: str) -> Optional[tuple]:
+        """
+        (content, content type) of a Telegram photo URL, read in chunks up to max_size
+        Redirects are followed only to Telegram's hosts, checked before each request
+        """
+        url = photo_url
+        with httpx.Client(timeout=self.timeout_seconds, follow_redirects=False) as client:
+            for _ in range(MAX_REDIRECTS + 1):
+                if not is_telegram_photo_url(url):
+                    raise AvatarUrlRejected(f"{url} is not a Telegram photo URL")
+                with client.stream("GET", url) as response:
+                    if response.is_redirect:
+                        url = urljoin(url, response.headers.get("location", ""))
+                        continue
+                    response.raise_for_status()
+                    content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+                    if not content_type.startswith("image/"):
+                        return None
+
+                    content = bytearray()
+                    for chunk in response.iter_bytes(settings.UPLOAD_CHUNK_SIZE):
+                        content.extend(chunk)
+                        if len(content) > self.max_size:
+                            raise AvatarTooLarge()
+                    return bytes(content), content_type
+        raise AvatarUrlRejected(f"{photo_url} redirects more than {MAX_REDIRECTS} times")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"queued": len(self._queued)}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instance
+avatar_fetcher = AvatarFetcher(
+    max_workers=settings.AVATAR_FETCH_WORKERS,
+    timeout_seconds=settings.AVATAR_FETCH_TIMEOUT_SECONDS,
+    max_size=settings.AVATAR_MAX_SIZE
+)
+metrics.register_collector("avatar_fetcher", avatar_fetcher.stats)
@@ -1,39 +1,151 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from typing import Optional
+from typing import Dict, Optional
 import os
 
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./telegram_jobs.db"
+
+    # Connection pool, per process (PostgreSQL and SQLite files)
+    DB_POOL_SIZE: int = 5  # Connections kept open
+    DB_MAX_OVERFLOW: int = 10  # Extra connections opened under load, closed once returned
+    DB_POOL_TIMEOUT_SECONDS: float = 30  # Wait for a free connection before the request fails
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # Reopen older connections (server and proxy idle timeouts)
+    DB_POOL_PRE_PING: bool = True  # Test connections on checkout, replacing ones the server closed
+    DB_SLOW_CHECKOUT_SECONDS: float = 0.5  # Log a warning when getting a connection takes longer
+
+    # Read replica for read-only GET routes, see read_replica (unset: everything uses DATABASE_URL)
+    DATABASE_READ_URL: Optional[str] = None
+    READ_YOUR_WRITES_SECONDS: float = 5  # After a write, the caller reads from the primary this long (above replica lag)
+    READ_YOUR_WRITES_BACKEND: str = "memory"  # memory (per process) or redis (shared by workers)
     
+    # SQLite only: pragmas applied to every connection, see database.configure_sqlite
+    SQLITE_TUNING: bool = True  # Off: SQLite defaults (rollback journal, no write queue)
+    SQLITE_JOURNAL_MODE: str = "WAL"  # Readers never block the writer, nor the writer readers
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # Safe with WAL; only the last commits may be lost on power failure
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # Wait this long for another process's write lock
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024  # Page cache per connection
+    SQLITE_FOREIGN_KEYS: bool = True
+    SQLITE_WRITE_QUEUE: bool = True  # Threads of a process take turns writing instead of polling the lock
+
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
     
     # Telegram Bot
     TELEGRAM_BOT_TOKEN: str = "1386084322:AAFqtVW85NiouhfMb0z5p-fEjnJlu8_TO70"
     TELEGRAM_WEBAPP_URL: str = "https://your-domain.com"
+    TELEGRAM_INIT_DATA_CACHE_SIZE: int = 10000  # Verified initData remembered so repeat logins skip the HMAC check
+    TELEGRAM_INIT_DATA_CACHE_TTL_SECONDS: float = 3600
     
     # JWT
     SECRET_KEY: str = "your-secret-key-change-this"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30  # Session length; each refresh issues a new token
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS: int = 30  # A rotated token replayed later revokes its session
+    
+    # Authenticated users cached by id (see user_cache)
+    USER_CACHE_BACKEND: str = "memory"  # memory, redis (shared by workers) or none
+    USER_CACHE_TTL_SECONDS: float = 60
+    USER_CACHE_SIZE: int = 10000
     
     # File Storage
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    MAX_REQUEST_BODY_SIZE: int = 11 * 1024 * 1024  # MAX_FILE_SIZE plus multipart overhead
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # Uploads are hashed and copied in chunks of this size
+    
+    STORAGE_BACKEND: str = "auto"  # gcs, local, memory or auto (gcs when credentials exist, else local)
+    STORAGE_LEGACY_FALLBACK: bool = True  # With GCS, serve files missing from the bucket from UPLOAD_DIR (older uploads)
     
     # GCP Storage
     GCP_CREDENTIALS_PATH: str = Field(default="/Users/amenmohammed/Documents/projects/moyats_projects/moyats_agents/fuck-afri/credentials/creds.json", validation_alias="GCP_CREDENTIALS_PATH")
     GCP_BUCKET_NAME: str = Field(default="coders-needed-resumes")
     GCP_PROJECT_ID: str = Field(default="")
+    GCS_UPLOAD_CHUNK_SIZE: int = 2 * 1024 * 1024  # Resumable upload chunk, a multiple of 256KB
+    SIGNED_URL_CACHE_SIZE: int = 4096  # Signed URLs kept for reuse, by blob path
+    SIGNED_URL_MIN_REMAINING_MINUTES: int = 15  # Cached URLs closer to expiry are re-signed
+    
+    # Garbage collection of unreferenced stored files
+    STORAGE_GC_INTERVAL_HOURS: float = 0  # Scheduled runs in the API process, 0 disables
+    STORAGE_GC_DRY_RUN: bool = True  # Scheduled runs only report orphans until this is turned off
+    STORAGE_GC_GRACE_HOURS: float = 24  # Newer files are kept (resumes are uploaded before applying)
+    STORAGE_GC_BATCH_SIZE: int = 100
+    STORAGE_GC_DELETES_PER_SECOND: float = 20
     
     # AI
     GEMINI_API_KEY: str = Field(default="", validation_alias="GEMINI_API_KEY")
+    AI_MODEL_NAME: str = "gemini-2.0-flash-exp"
+    AI_BACKEND: str = "gemini"  # gemini, record, replay or fake
+    AI_RECORDINGS_DIR: str = "ai_recordings"  # Prompt/response pairs for record/replay
+    AI_REPLAY_LATENCY: bool = False  # Sleep for the recorded latency when replaying
+    AI_FAKE_LATENCY_MS: int = 0
+    AI_FAKE_JITTER_MS: int = 0
+    AI_RESUME_CACHE_SIZE: int = 256  # Extracted resume texts kept in memory
+    AI_EAGER_SCORING: bool = True  # Score each application in the background when submitted
+    AI_SCORING_WORKERS: int = 2  # Concurrent background scoring calls
+    AI_SCORING_QUEUE_SIZE: int = 200  # Applications waiting beyond this are scored on demand
+    AI_SCORING_BUDGET_PER_JOB: int = 200  # Max model-scored analyses per job done eagerly
+    APPLICATION_INDEX_SWEEP_SECONDS: float = 60  # Re-enqueue applications missing from the skill/search indexes, 0 disables
+    
+    # Document extraction sandbox (0 workers = parse in-process, no limits)
+    EXTRACTION_WORKERS: int = 2
+    EXTRACTION_WALL_TIMEOUT_SECONDS: float = 60
+    EXTRACTION_CPU_SECONDS: int = 30
+    EXTRACTION_MAX_RSS_MB: int = 512
+    EXTRACTION_ADDRESS_SPACE_MB: int = 2048  # Hard RLIMIT_AS guard, 0 disables
+    EXTRACTION_MAX_JOBS_PER_WORKER: int = 50  # Workers are recycled after this many jobs
+    EXTRACTION_QUEUE_TIMEOUT_SECONDS: float = 30
+    
+    # Image variants of uploaded pictures
+    IMAGE_WORKERS: int = 2  # Processes rendering variants
+    IMAGE_VARIANT_FORMAT: str = "webp"  # webp or jpeg
+    IMAGE_QUALITY: int = 80
+    IMAGE_MAX_PIXELS: int = 40_000_000  # Larger images are rejected (decompression bombs)
+    IMAGE_TIMEOUT_SECONDS: float = 30
+    
+    # Copies of Telegram profile photos (fetched once, served from our storage)
+    AVATAR_FETCH_WORKERS: int = 2
+    AVATAR_FETCH_TIMEOUT_SECONDS: float = 10
+    AVATAR_MAX_SIZE: int = 5 * 1024 * 1024
+    
+    # Single-flight: identical concurrent expensive calls share one computation
+    SINGLEFLIGHT_BACKEND: str = "memory"  # memory (within a process) or redis (lock shared by workers)
+    SINGLEFLIGHT_LOCK_TTL_SECONDS: float = 600  # Longer than the slowest ranking run
+    SINGLEFLIGHT_WAIT_SECONDS: float = 300  # Other workers wait this long before running it themselves
+    SINGLEFLIGHT_RESULT_TTL_SECONDS: float = 5  # Published results other workers may reuse
+    
+    # Rate limiting per user (or client IP) and endpoint, see rate_limit
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # memory (per process) or redis (shared by workers)
+    RATE_LIMIT_MAX_KEYS: int = 100000  # In-memory buckets kept
+    # endpoint -> "<requests>/<second|minute|hour|day>": burst size and sustained rate
+    RATE_LIMITS: Dict[str, str] = {
+        "auth": "20/minute",
+        "ranked": "10/minute",
+        "search": "60/minute",
+        "resume-urls": "60/minute",
+        "upload": "20/minute",
+        "apply": "20/minute",
+        "notifications": "60/minute",
+        "unread-count": "30/minute",
+    }
+    # Budget shared by a caller's limited endpoints; each request costs its endpoint's weight (default 1)
+    RATE_LIMIT_BUDGET: str = "600/minute"
+    RATE_LIMIT_COSTS: Dict[str, float] = {
+        "ranked": 60,  # Minutes of CPU and Gemini calls on a cold job
+        "search": 5,
+        "resume-urls": 5,
+        "upload": 10,
+        "apply": 10,
+    }
     
     # App
     DEBUG: bool = True
+    METRICS_TOKEN: str = ""  # Bearer token required by /metrics; empty disables the endpoint
     CORS_ORIGINS: list = ["*"]  # Allow all origins for Telegram Mini App
     
     class Config:
@@ -1,16 +1,28 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
-from typing import List, Optional
-from app.models import User, Company, Job, Application, JobSeekerProfile, Notification
+import json
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, or_, func, select
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List, Optional
+from datetime import datetime
+from app.models import (
+    User, Company, Job, Application, JobSeekerProfile, Notification, ApplicationAnalysis, ApplicationSkill,
+    DocumentExtraction, JobNotificationMilestone, RefreshToken
+)
 from app.schemas import (
     UserCreate, UserUpdate, CompanyCreate, CompanyUpdate,
     JobCreate, JobUpdate, ApplicationCreate, ApplicationUpdate,
     JobSeekerProfileCreate, JobSeekerProfileUpdate, JobSearch
 )
 from app.models import UserRole, JobStatus, ApplicationStatus
+from app.search import delete_job_documents
+from app.user_cache import user_cache
 
 
 # User CRUD
+def get_user(db: Session, user_id: int) -> Optional[User]:
+    return db.query(User).filter(User.id == user_id).first()
+
+
 def get_user_by_telegram_id(db: Session, telegram_id: int) -> Optional[User]:
     return db.query(User).filter(User.telegram_id == telegram_id).first()
 
@@ -30,20 +42,79 @@ def update_user(db: Session, user_id: int, user_update: UserUpdate) -> Optional[
         for field, value in update_data.items():
             setattr(db_user, field, value)
         db.commit()
+        user_cache.invalidate(user_id)
         db.refresh(db_user)
     return db_user
 
 
 def update_user_by_object(db: Session, user: User, user_update: UserUpdate) -> User:
-    """Update user by passing the user object directly"""
-    update_data = user_update.dict(exclude_unset=True)
+    """Update user by passing the user object directly; no write when nothing changed"""
+    update_data = {
+        field: value for field, value in user_update.dict(exclude_unset=True).items()
+        if getattr(user, field) != value
+    }
+    if not update_data:
+        return user
     for field, value in update_data.items():
         setattr(user, field, value)
     db.commit()
+    user_cache.invalidate(user.id)
     db.refresh(user)
     return user
 
 
+def update_user_avatar(db: Session, user_id: int, source_url: str, avatar_url: str) -> Optional[User]:
+    """Record a fetched copy of a Telegram photo, unless the photo changed meanwhile"""
+    db_user = db.query(User).filter(User.id == user_id, User.photo_url == source_url).first()
+    if db_user:
+        db_user.avatar_url = avatar_url
+        db_user.avatar_source_url = source_url
+        db.commit()
+        user_cache.invalidate(user_id)
+    return db_user
+
+
+# Refresh Token CRUD
+def create_refresh_token(db: Session, user_id: int, token_hash: str, family_id: str, expires_at: datetime) -> RefreshToken:
+    # Expired tokens of the user are dropped here instead of by a cleanup job
+    db.query(RefreshToken).filter(
+        RefreshToken.user_id == user_id, RefreshToken.expires_at < datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db_token = RefreshToken(user_id=user_id, token_hash=token_hash, family_id=family_id, expires_at=expires_at)
+    db.add(db_token)
+    db.commit()
+    return db_token
+
+
+def get_refresh_token(db: Session, token_hash: str) -> Optional[RefreshToken]:
+    return db.query(RefreshToken).filter(RefreshToken.token_hash == token_hash).first()
+
+
+def mark_refresh_token_rotated(db: Session, token_id: int) -> bool:
+    """Atomically mark a live token as rotated; False if a concurrent request rotated it first"""
+    updated = db.query(RefreshToken).filter(
+        RefreshToken.id == token_id, RefreshToken.rotated_at.is_(None), RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.rotated_at: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return updated == 1
+
+
+def revoke_refresh_token_family(db: Session, family_id: str) -> int:
+    revoked = db.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return revoked
+
+
+def revoke_user_refresh_tokens(db: Session, user_id: int) -> int:
+    revoked = db.query(RefreshToken).filter(
+        RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return revoked
+
+
 # Company CRUD
 def create_company(db: Session, company: CompanyCreate, owner_id: int) -> Company:
     db_company = Company(**company.dict(), owner_id=owner_id)
@@ -68,6 +139,13 @@ def update_company(db: Session, company_id: int, company_update: CompanyUpdate)
     return db_company
 
 
+def update_company_logo(db: Session, company: Company, logo_url: str) -> Company:
+    company.logo_url = logo_url
+    db.commit()
+    db.refresh(company)
+    return company
+
+
 # Job Seeker Profile CRUD
 def get_job_seeker_profile(db: Session, user_id: int) -> Optional[JobSeekerProfile]:
     return db.query(JobSeekerProfile).filter(JobSeekerProfile.user_id == user_id).first()
@@ -92,6 +170,13 @@ def update_job_seeker_profile(db: Session, user_id: int, profile_update: JobSeek
     return db_profile
 
 
+def update_job_seeker_cv(db: Session, profile: JobSeekerProfile, cv_url: str) -> JobSeekerProfile:
+    profile.cv_url = cv_url
+    db.commit()
+    db.refresh(profile)
+    return profile
+
+
 # Job CRUD
 def create_job(db: Session, job: JobCreate, poster_id: int) -> Job:
     db_job = Job(**job.dict(), poster_id=poster_id)
@@ -162,7 +247,11 @@ def update_job(db: Session, job_id: int, job_update: JobUpdate) -> Optional[Job]
 def delete_job(db: Session, job_id: int) -> bool:
     db_job = db.query(Job).filter(Job.id == job_id).first()
     if db_job:
-        # Delete all applications for this job first (explicit cascade)
+        # Delete all analyses, skills, milestones and applications for this job first (explicit cascade)
+        db.query(ApplicationAnalysis).filter(ApplicationAnalysis.job_id == job_id).delete()
+        db.query(ApplicationSkill).filter(ApplicationSkill.job_id == job_id).delete()
+        db.query(JobNotificationMilestone).filter(JobNotificationMilestone.job_id == job_id).delete()
+        delete_job_documents(db, job_id)
         db.query(Application).filter(Application.job_id == job_id).delete()
         # Then delete the job
         db.delete(db_job)
@@ -182,8 +271,18 @@ def create_application(db: Session, application: ApplicationCreate, applicant_id
         raise ValueError("You have already applied for this job")
     
     db_application = Application(**application.dict(), applicant_id=applicant_id)
+    if not db_application.resume_url:
+        # Fall back to the CV on the applicant's profile so it can be analyzed too
+        profile = get_job_seeker_profile(db, applicant_id)
+        if profile and profile.cv_url:
+            db_application.resume_url = profile.cv_url
     db.add(db_application)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request for the same job and applicant won the unique index
+        db.rollback()
+        raise ValueError("You have already applied for this job")
     db.refresh(db_application)
     return db_application
 
@@ -192,8 +291,11 @@ def get_application(db: Session, application_id: int) -> Optional[Application]:
     return db.query(Application).filter(Application.id == application_id).first()
 
 
-def get_applications_by_job(db: Session, job_id: int) -> List[Application]:
-    return db.query(Application).filter(Application.job_id == job_id).all()
+def get_applications_by_job(db: Session, job_id: int, skills: Optional[List[str]] = None) -> List[Application]:
+    query = db.query(Application).filter(Application.job_id == job_id)
+    if skills:
+        query = query.filter(Application.id.in_(_applications_with_all_skills(job_id, skills)))
+    return query.all()
 
 
 def get_applications_by_applicant(db: Session, applicant_id: int) -> List[Application]:
@@ -215,6 +317,159 @@ def get_application_count_by_job(db: Session, job_id: int) -> int:
     return db.query(Application).filter(Application.job_id == job_id).count()
 
 
+# Application Analysis CRUD
+def get_analysis_fingerprints(db: Session, job_id: int) -> Dict[int, str]:
+    """Map application_id -> input_fingerprint for every stored analysis of a job"""
+    rows = db.query(ApplicationAnalysis.application_id, ApplicationAnalysis.input_fingerprint).filter(
+        ApplicationAnalysis.job_id == job_id
+    ).all()
+    return {application_id: fingerprint for application_id, fingerprint in rows}
+
+
+def upsert_application_analysis(
+    db: Session,
+    application_id: int,
+    job_id: int,
+    analysis: dict,
+    model_version: str,
+    input_fingerprint: str
+) -> ApplicationAnalysis:
+    """Insert or replace the stored analysis of an application (caller commits)"""
+    db_analysis = db.query(ApplicationAnalysis).filter(
+        ApplicationAnalysis.application_id == application_id
+    ).first()
+    if not db_analysis:
+        db_analysis = ApplicationAnalysis(application_id=application_id, job_id=job_id)
+        db.add(db_analysis)
+    
+    for field in ("overall_score", "cover_letter_score", "completeness_score", "relevance_score", "resume_score"):
+        setattr(db_analysis, field, int(analysis.get(field) or 0))
+    db_analysis.ai_summary = analysis.get("ai_summary", "")
+    db_analysis.strengths = json.dumps([s for s in analysis.get("strengths", []) if s])
+    db_analysis.concerns = json.dumps([c for c in analysis.get("concerns", []) if c])
+    db_analysis.recommendation = analysis.get("recommendation", "maybe")
+    db_analysis.model_version = model_version
+    db_analysis.input_fingerprint = input_fingerprint
+    return db_analysis
+
+
+def get_job_score_distribution(db: Session, job_id: int) -> List[int]:
+    """All overall scores of a job's analyses, ascending (served from the job/score index)"""
+    rows = db.query(ApplicationAnalysis.overall_score).filter(
+        ApplicationAnalysis.job_id == job_id
+    ).order_by(ApplicationAnalysis.overall_score).all()
+    return [score for (score,) in rows]
+
+
+def get_ranked_analyses(
+    db: Session,
+    job_id: int,
+    recommendations: Optional[List[str]] = None,
+    min_score: Optional[int] = None,
+    max_score: Optional[int] = None,
+    sort: str = "score_desc",
+    skip: int = 0,
+    limit: int = 100
+) -> List[ApplicationAnalysis]:
+    query = db.query(ApplicationAnalysis).options(
+        joinedload(ApplicationAnalysis.application).joinedload(Application.applicant)
+    ).filter(ApplicationAnalysis.job_id == job_id)
+    
+    if recommendations:
+        query = query.filter(ApplicationAnalysis.recommendation.in_(recommendations))
+    if min_score is not None:
+        query = query.filter(ApplicationAnalysis.overall_score >= min_score)
+    if max_score is not None:
+        query = query.filter(ApplicationAnalysis.overall_score <= max_score)
+    
+    if sort == "score_asc":
+        query = query.order_by(ApplicationAnalysis.overall_score.asc(), ApplicationAnalysis.application_id)
+    elif sort == "recent":
+        query = query.order_by(ApplicationAnalysis.application_id.desc())
+    else:
+        query = query.order_by(ApplicationAnalysis.overall_score.desc(), ApplicationAnalysis.application_id)
+    
+    return query.offset(skip).limit(limit).all()
+
+
+# Application Skill CRUD
+def _applications_with_all_skills(job_id: int, skills: List[str]):
+    """Subquery of application ids of a job having every skill in `skills`"""
+    return select(ApplicationSkill.application_id).where(
+        ApplicationSkill.job_id == job_id,
+        ApplicationSkill.skill.in_(skills)
+    ).group_by(ApplicationSkill.application_id).having(
+        func.count(func.distinct(ApplicationSkill.skill)) == len(set(skills))
+    )
+
+
+def replace_application_skills(db: Session, application_id: int, job_id: int, skills: Dict[str, str]):
+    """Replace the indexed skills of an application; `skills` maps skill -> source (caller commits)"""
+    db.query(ApplicationSkill).filter(ApplicationSkill.application_id == application_id).delete()
+    db.add_all([
+        ApplicationSkill(application_id=application_id, job_id=job_id, skill=skill, source=source)
+        for skill, source in skills.items()
+    ])
+
+
+def mark_application_indexed(db: Session, application_id: int):
+    """Record that an application's skill and search documents are written (caller commits)"""
+    db.query(Application).filter(Application.id == application_id).update(
+        # Keep updated_at: indexing is not a change to the application
+        {Application.indexed_at: func.now(), Application.updated_at: Application.updated_at},
+        synchronize_session=False
+    )
+
+
+def get_unindexed_application_ids(db: Session, created_before: datetime, limit: int = 100) -> List[int]:
+    """Applications never indexed (queue full, restart, failure), oldest first"""
+    rows = db.query(Application.id).filter(
+        Application.indexed_at.is_(None),
+        Application.created_at < created_before
+    ).order_by(Application.id).limit(limit).all()
+    return [application_id for (application_id,) in rows]
+
+
+def get_job_skill_facets(db: Session, job_id: int, skills: Optional[List[str]] = None, limit: int = 50) -> List[tuple]:
+    """(skill, applicant count) for a job, most common first, within applicants matching `skills`"""
+    query = db.query(ApplicationSkill.skill, func.count(ApplicationSkill.application_id)).filter(
+        ApplicationSkill.job_id == job_id
+    )
+    if skills:
+        query = query.filter(ApplicationSkill.application_id.in_(_applications_with_all_skills(job_id, skills)))
+    return query.group_by(ApplicationSkill.skill).order_by(
+        func.count(ApplicationSkill.application_id).desc(), ApplicationSkill.skill
+    ).limit(limit).all()
+
+
+def count_file_references(db: Session, key: str) -> int:
+    """Records pointing at a stored file (files are content-addressed and may be shared)"""
+    return (
+        db.query(Application).filter(Application.resume_url == key).count()
+        + db.query(User).filter(User.profile_picture_url == key).count()
+        + db.query(User).filter(User.avatar_url == key).count()
+        + db.query(JobSeekerProfile).filter(JobSeekerProfile.cv_url == key).count()
+        + db.query(Company).filter(Company.logo_url == key).count()
+    )
+
+
+# Document extraction CRUD
+def get_document_extraction(db: Session, content_hash: str) -> Optional[DocumentExtraction]:
+    return db.query(DocumentExtraction).filter(DocumentExtraction.content_hash == content_hash).first()
+
+
+def save_document_extraction(db: Session, content_hash: str, text: str) -> DocumentExtraction:
+    """Store extracted text for a document (caller commits)"""
+    extraction = get_document_extraction(db, content_hash)
+    if extraction:
+        extraction.text = text
+        extraction.skills = None
+    else:
+        extraction = DocumentExtraction(content_hash=content_hash, text=text)
+        db.add(extraction)
+    return extraction
+
+
 # Notification CRUD
 def create_notification(db: Session, user_id: int, title: str, message: str, notification_type: str, data: str = None) -> Notification:
     db_notification = Notification(
@@ -1,16 +1,174 @@
-from sqlalchemy import create_engine
+import logging
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from fastapi import Request
 from app.config import settings
+from app.metrics import metrics
 
-engine = create_engine(settings.DATABASE_URL)
+logger = logging.getLogger(__name__)
+
+_WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait and how often they time out"""
+
+    pool_name = "primary"
+    slow_checkout_seconds = 0.5
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            metrics.observe("db_pool_checkout_seconds", time.perf_counter() - start, pool=self.pool_name)
+            metrics.inc("db_pool_timeouts_total", pool=self.pool_name)
+            logger.error(f"Database pool {self.pool_name} exhausted: {self.status()}")
+            raise
+        elapsed = time.perf_counter() - start
+        metrics.observe("db_pool_checkout_seconds", elapsed, pool=self.pool_name)
+        if elapsed > self.slow_checkout_seconds:
+            logger.warning(f"Slow database connection checkout ({elapsed:.2f}s) from {self.pool_name}: {self.status()}")
+        return connection
+
+    def recreate(self):
+        # engine.dispose() replaces the pool; keep its name and threshold
+        pool = super().recreate()
+        pool.pool_name = self.pool_name
+        pool.slow_checkout_seconds = self.slow_checkout_seconds
+        return pool
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            # Connections opened beyond size (negative while the pool is still filling)
+            "overflow": max(self.overflow(), 0),
+        }
+
+
+class SQLiteWriteQueue:
+    """
+    One write transaction at a time per process. SQLite allows a single writer
+    anyway; threads waiting here queue on a lock instead of sleeping and retrying
+    inside SQLite's busy handler until busy_timeout expires ("database is locked")
+    A connection takes the lock at its first write statement and releases it on
+    commit, rollback or when returned to the pool
+    """
+
+    def __init__(self, timeout_seconds: float):
+        self.timeout_seconds = timeout_seconds
+        self._lock = threading.Lock()
+        self.waiting = 0
+
+    def attach(self, engine: Engine):
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "commit", self._release_connection)
+        event.listen(engine, "rollback", self._release_connection)
+        event.listen(engine.pool, "checkin", self._checkin)
+        metrics.register_collector("sqlite_write_queue", self.stats)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get("sqlite_writer") or not statement.lstrip().upper().startswith(_WRITE_STATEMENTS):
+            return
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            acquired = self._lock.acquire(timeout=self.timeout_seconds)
+        finally:
+            self.waiting -= 1
+        metrics.observe("sqlite_write_queue_wait_seconds", time.perf_counter() - start)
+        if acquired:
+            conn.info["sqlite_writer"] = True
+        else:
+            # Let SQLite's own busy timeout decide rather than failing here
+            metrics.inc("sqlite_write_queue_timeouts_total")
+            logger.warning(f"Write queue wait exceeded {self.timeout_seconds}s, writing without it")
+
+    def _release(self, info: dict):
+        if info.pop("sqlite_writer", False):
+            self._lock.release()
+
+    def _release_connection(self, conn):
+        self._release(conn.info)
+
+    def _checkin(self, dbapi_connection, connection_record):
+        self._release(connection_record.info)
+
+    def stats(self) -> dict:
+        return {"waiting": self.waiting, "held": int(self._lock.locked())}
+
+
+def configure_sqlite(engine: Engine, write_queue: bool = True):
+    """Apply the SQLITE_* pragmas to every new connection of a SQLite engine"""
+    pragmas = [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA foreign_keys={'ON' if settings.SQLITE_FOREIGN_KEYS else 'OFF'}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    if write_queue:
+        SQLiteWriteQueue(settings.SQLITE_BUSY_TIMEOUT_MS / 1000).attach(engine)
+
+
+def create_database_engine(url: str, name: str = "primary") -> Engine:
+    """Engine with the DB_POOL_* settings, pool metrics and, for SQLite, the SQLITE_* profile"""
+    database_url = make_url(url)
+    sqlite = database_url.get_backend_name() == "sqlite"
+    if sqlite and database_url.database in (None, "", ":memory:"):
+        # In-memory databases live in one connection; keep SQLAlchemy's default pool
+        engine = create_engine(url)
+    else:
+        engine = create_engine(
+            url,
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            # A SQLite file cannot drop a connection; a network database can
+            pool_pre_ping=settings.DB_POOL_PRE_PING and not sqlite,
+        )
+        engine.pool.pool_name = name
+        engine.pool.slow_checkout_seconds = settings.DB_SLOW_CHECKOUT_SECONDS
+        metrics.register_collector(f"db_pool_{name}", lambda: engine.pool.stats())
+    if sqlite and settings.SQLITE_TUNING:
+        configure_sqlite(engine, write_queue=settings.SQLITE_WRITE_QUEUE)
+    return engine
+
+
+engine = create_database_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Read-only routes (see read_replica.get_read_db); the primary when no replica is configured
+read_engine = create_database_engine(settings.DATABASE_READ_URL, name="replica") if settings.DATABASE_READ_URL else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
 
 
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    # Lets read_replica remember who wrote, so their next reads see it
+    db.info["request"] = request
     try:
         yield db
     finally:
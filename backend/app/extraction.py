@@ -0,0 +1,425 @@
+"""
+Sandboxed text extraction for uploaded documents
+
+PDF/DOCX parsing of untrusted uploads runs in a pool of recycled subprocess
+workers with per-job CPU time, wall time and memory caps, so a pathological
+file can only take down a disposable worker, never the API process.
+
+This module is imported by the workers themselves, so it must stay light:
+no database, storage or AI imports.
+"""
+import io
+import logging
+import os
+import queue
+import signal
+import tempfile
+import threading
+import time
+import multiprocessing
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.metrics import metrics
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Document processing imports
+try:
+    from PyPDF2 import PdfReader
+    from docx import Document
+    from pdf2image import convert_from_path
+    import pytesseract
+    DOCUMENT_PROCESSING_AVAILABLE = True
+except ImportError as e:
+    logging.getLogger(__name__).warning(f"Document processing libraries not available: {e}")
+    DOCUMENT_PROCESSING_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_KINDS = ("pdf", "docx")
+
+
+class ExtractionError(Exception):
+    """
+    Extraction failed in a classified way. `kind` is one of:
+    timeout, cpu_limit, memory_limit, crashed, busy, unsupported, failed
+    """
+
+    def __init__(self, kind: str, message: str = ""):
+        super().__init__(message or kind)
+        self.kind = kind
+
+
+# ---------------------------------------------------------------------------
+# Parsers (run inside the workers)
+# ---------------------------------------------------------------------------
+
+def extract_pdf_text(file_content: bytes, timings: Dict[str, float]) -> str:
+    """Extract text from PDF file, falling back to OCR for scanned documents"""
+    try:
+        reader = PdfReader(io.BytesIO(file_content))
+        text = ""
+
+        for page in reader.pages:
+            page_text = page.extract_text()
+            if page_text:
+                text += page_text + "\n"
+
+        # If no text extracted, try OCR
+        if not text.strip():
+            logger.info("No text in PDF, attempting OCR")
+            start = time.perf_counter()
+            text = extract_ocr_text(file_content)
+            timings["ocr"] = time.perf_counter() - start
+
+        return text.strip()
+    except MemoryError:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to extract text from PDF: {e}")
+        return ""
+
+
+def extract_ocr_text(file_content: bytes) -> str:
+    """Extract text from PDF using OCR"""
+    try:
+        # Save to temporary file for pdf2image
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp_file:
+            tmp_file.write(file_content)
+            tmp_path = tmp_file.name
+
+        try:
+            # Convert PDF to images
+            images = convert_from_path(tmp_path)
+            text = ""
+
+            for i, image in enumerate(images):
+                logger.info(f"Performing OCR on page {i+1}")
+                page_text = pytesseract.image_to_string(image)
+                text += page_text + "\n"
+
+            return text.strip()
+        finally:
+            # Clean up temp file
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    except MemoryError:
+        raise
+    except Exception as e:
+        logger.error(f"OCR extraction failed: {e}")
+        return ""
+
+
+def extract_docx_text(file_content: bytes, timings: Dict[str, float]) -> str:
+    """Extract text from DOCX file"""
+    try:
+        doc = Document(io.BytesIO(file_content))
+        text = ""
+
+        for paragraph in doc.paragraphs:
+            text += paragraph.text + "\n"
+
+        # Extract text from tables
+        for table in doc.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    text += cell.text + " "
+                text += "\n"
+
+        return text.strip()
+    except MemoryError:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to extract text from DOCX: {e}")
+        return ""
+
+
+PARSERS = {
+    "pdf": extract_pdf_text,
+    "docx": extract_docx_text,
+}
+
+
+def _worker_main(conn, cpu_seconds: int, address_space_bytes: int):
+    """
+    Worker loop: receive (kind, content), reply with
+    ("ok", text, timings, max_rss_kb) or ("error", kind, message)
+    """
+    if resource is not None and address_space_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (address_space_bytes, address_space_bytes))
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if job is None:
+            return
+
+        kind, content = job
+        if resource is not None and cpu_seconds:
+            # RLIMIT_CPU counts the whole process lifetime, so move the soft limit per job
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            used = int(usage.ru_utime + usage.ru_stime) + 1
+            _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+            resource.setrlimit(resource.RLIMIT_CPU, (used + cpu_seconds, hard))
+
+        timings: Dict[str, float] = {}
+        try:
+            text = PARSERS[kind](content, timings)
+        except MemoryError:
+            conn.send(("error", "memory_limit", "Worker exceeded its address space limit"))
+            return
+        except Exception as e:
+            conn.send(("error", "failed", str(e)))
+            continue
+
+        max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else 0
+        conn.send(("ok", text, timings, max_rss_kb))
+
+
+# ---------------------------------------------------------------------------
+# Pool (runs in the API process)
+# ---------------------------------------------------------------------------
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    """Current resident set size of a process (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _Worker:
+    """A single extraction subprocess and the parent end of its pipe"""
+
+    def __init__(self, context, cpu_seconds: int, address_space_bytes: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, cpu_seconds, address_space_bytes),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs_done = 0
+        self.retire_reason: Optional[str] = None
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def stop(self):
+        try:
+            if self.process.is_alive():
+                self.conn.send(None)
+        except Exception:
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=1)
+        self.conn.close()
+
+
+class ExtractionPool:
+    """Bounded pool of recycled extraction subprocesses"""
+
+    def __init__(
+        self,
+        size: int,
+        wall_timeout: float,
+        cpu_seconds: int,
+        max_rss_mb: int,
+        address_space_mb: int,
+        max_jobs_per_worker: int,
+        queue_timeout: float
+    ):
+        self.size = size
+        self.wall_timeout = wall_timeout
+        self.cpu_seconds = cpu_seconds
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024
+        self.address_space_bytes = address_space_mb * 1024 * 1024
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.queue_timeout = queue_timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(max(size, 1))
+        self._idle: "queue.LifoQueue[_Worker]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._workers = 0
+        self._busy = 0
+        self._waiting = 0
+
+    def extract(self, file_content: bytes, kind: str, trace=None) -> str:
+        """
+        Extract text from a document in a sandboxed worker.
+        Raises ExtractionError on limit violations or failures.
+        """
+        if kind not in SUPPORTED_KINDS:
+            raise ExtractionError("unsupported", f"Unsupported document type: {kind}")
+        if not DOCUMENT_PROCESSING_AVAILABLE:
+            raise ExtractionError("unsupported", "Document processing libraries not available")
+
+        start = time.perf_counter()
+        try:
+            text, timings = self._run(file_content, kind)
+        except ExtractionError as e:
+            metrics.inc("extraction_jobs_total", kind=kind, outcome=e.kind)
+            raise
+        finally:
+            metrics.observe("extraction_seconds", time.perf_counter() - start, kind=kind)
+
+        metrics.inc("extraction_jobs_total", kind=kind, outcome="ok")
+        if trace:
+            elapsed = time.perf_counter() - start
+            ocr = timings.get("ocr", 0.0)
+            trace.add_stage_time("extract", elapsed - ocr)
+            if ocr:
+                trace.add_stage_time("ocr", ocr)
+        return text
+
+    def _run(self, file_content: bytes, kind: str) -> Tuple[str, Dict[str, float]]:
+        if self.size <= 0:
+            # In-process mode (no sandbox), for platforms without subprocess support
+            timings: Dict[str, float] = {}
+            return PARSERS[kind](file_content, timings), timings
+
+        wait_start = time.perf_counter()
+        with self._lock:
+            self._waiting += 1
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        with self._lock:
+            self._waiting -= 1
+        metrics.observe("extraction_queue_wait_seconds", time.perf_counter() - wait_start)
+        if not acquired:
+            raise ExtractionError("busy", "All extraction workers are busy")
+
+        worker = None
+        try:
+            worker = self._checkout()
+            return self._dispatch(worker, file_content, kind)
+        finally:
+            if worker is not None:
+                self._checkin(worker)
+            self._slots.release()
+
+    def _checkout(self) -> _Worker:
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                worker = _Worker(self._context, self.cpu_seconds, self.address_space_bytes)
+                with self._lock:
+                    self._workers += 1
+                break
+            if worker.is_alive():
+                break
+            self._retire(worker, "died")
+        with self._lock:
+            self._busy += 1
+        return worker
+
+    def _checkin(self, worker: _Worker):
+        with self._lock:
+            self._busy -= 1
+        if worker.jobs_done >= self.max_jobs_per_worker:
+            worker.retire_reason = worker.retire_reason or "max_jobs"
+        if not worker.is_alive():
+            worker.retire_reason = worker.retire_reason or "died"
+
+        if worker.retire_reason:
+            self._retire(worker, worker.retire_reason)
+        else:
+            self._idle.put(worker)
+
+    def _retire(self, worker: _Worker, reason: str):
+        worker.stop()
+        with self._lock:
+            self._workers -= 1
+        metrics.inc("extraction_worker_recycles_total", reason=reason)
+
+    def _dispatch(self, worker: _Worker, file_content: bytes, kind: str) -> Tuple[str, Dict[str, float]]:
+        worker.conn.send((kind, file_content))
+        deadline = time.monotonic() + self.wall_timeout
+
+        # Wait for the reply while watching wall time and resident memory
+        while not worker.conn.poll(0.25):
+            if time.monotonic() > deadline:
+                worker.retire_reason = "timeout"
+                worker.process.kill()
+                raise ExtractionError("timeout", f"Extraction exceeded {self.wall_timeout}s wall time")
+            rss = _rss_bytes(worker.process.pid)
+            if self.max_rss_bytes and rss and rss > self.max_rss_bytes:
+                worker.retire_reason = "memory_limit"
+                worker.process.kill()
+                raise ExtractionError("memory_limit", f"Extraction exceeded {self.max_rss_bytes // (1024 * 1024)}MB RSS")
+            if not worker.is_alive():
+                break
+
+        try:
+            reply = worker.conn.recv()
+        except (EOFError, OSError):
+            worker.process.join(timeout=1)
+            raise self._classify_exit(worker.process.exitcode)
+
+        worker.jobs_done += 1
+        if reply[0] == "error":
+            _, error_kind, message = reply
+            if error_kind == "memory_limit":
+                worker.retire_reason = "memory_limit"
+            raise ExtractionError(error_kind, message)
+
+        _, text, timings, max_rss_kb = reply
+        # ru_maxrss never goes down, so a worker that once ballooned is replaced
+        if self.max_rss_bytes and max_rss_kb * 1024 > self.max_rss_bytes:
+            worker.retire_reason = "max_rss"
+        return text, timings
+
+    @staticmethod
+    def _classify_exit(exitcode: Optional[int]) -> ExtractionError:
+        if exitcode == -signal.SIGXCPU:
+            return ExtractionError("cpu_limit", "Extraction exceeded its CPU time limit")
+        if exitcode == -signal.SIGKILL:
+            return ExtractionError("memory_limit", "Extraction worker was killed (likely out of memory)")
+        return ExtractionError("crashed", f"Extraction worker exited with code {exitcode}")
+
+    def stats(self) -> Dict[str, float]:
+        """Pool utilization for the metrics registry"""
+        with self._lock:
+            return {
+                "size": self.size,
+                "workers": self._workers,
+                "busy": self._busy,
+                "idle": self._idle.qsize(),
+                "waiting": self._waiting,
+                "utilization": round(self._busy / self.size, 3) if self.size else 0,
+            }
+
+    def shutdown(self):
+        """Stop all idle workers (busy ones exit when their pipe closes)"""
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+            with self._lock:
+                self._workers -= 1
+
+
+# Singleton instance
+extraction_pool = ExtractionPool(
+    size=settings.EXTRACTION_WORKERS,
+    wall_timeout=settings.EXTRACTION_WALL_TIMEOUT_SECONDS,
+    cpu_seconds=settings.EXTRACTION_CPU_SECONDS,
+    max_rss_mb=settings.EXTRACTION_MAX_RSS_MB,
+    address_space_mb=settings.EXTRACTION_ADDRESS_SPACE_MB,
+    max_jobs_per_worker=settings.EXTRACTION_MAX_JOBS_PER_WORKER,
+    queue_timeout=settings.EXTRACTION_QUEUE_TIMEOUT_SECONDS
+)
+metrics.register_collector("extraction_pool", extraction_pool.stats)
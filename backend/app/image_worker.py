@@ -0,0 +1,112 @@
+"""
+Background generation of image variants
+
+Uploads return immediately with their variant URLs; variants are rendered in
+a process pool (Pillow is CPU-bound and holds the GIL) and written to storage.
+Until they exist, the /uploads route serves the original image.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from app.config import settings
+from app.images import (
+    IMAGE_PROCESSING_AVAILABLE, VARIANTS, render_variants, variant_content_type, variant_format, variant_key
+)
+from app.metrics import metrics
+from app.storage import file_storage
+
+logger = logging.getLogger(__name__)
+
+
+class ImageProcessor:
+    """Renders variants of uploaded images in worker processes"""
+
+    def __init__(self, max_workers: int, timeout_seconds: float):
+        self.max_workers = max(max_workers, 1)
+        self.timeout_seconds = timeout_seconds
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image-variants")
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = set()
+
+    def enqueue(self, source_key: str) -> bool:
+        """Schedule variant generation for an uploaded image; False if already queued"""
+        if not IMAGE_PROCESSING_AVAILABLE:
+            return False
+        with self._lock:
+            if source_key in self._queued:
+                return False
+            self._queued.add(source_key)
+        self._executor.submit(self._run, source_key)
+        return True
+
+    def _run(self, source_key: str):
+        try:
+            metrics.inc("image_variants_total", outcome=self._process(source_key))
+        except Exception as e:
+            logger.error(f"Generating variants of {source_key} failed: {e}")
+            metrics.inc("image_variants_total", outcome="error")
+        finally:
+            with self._lock:
+                self._queued.discard(source_key)
+
+    def _process(self, source_key: str) -> str:
+        keys = {variant: variant_key(source_key, variant) for variant in VARIANTS}
+        # Content-addressed sources: re-uploads of the same image already have variants
+        if all(file_storage.file_exists(key) for key in keys.values()):
+            return "exists"
+
+        content = file_storage.read_file(source_key)
+        if content is None:
+            return "missing"
+
+        start = time.perf_counter()
+        rendered = self._render(content)
+        metrics.observe("image_variants_seconds", time.perf_counter() - start)
+
+        content_type = variant_content_type()
+        for variant, data in rendered.items():
+            file_storage.store(keys[variant], data, content_type)
+        logger.info(f"Stored {len(rendered)} variants of {source_key}")
+        return "rendered"
+
+    def _render(self, content: bytes):
+        args = (content, variant_format(), settings.IMAGE_QUALITY, settings.IMAGE_MAX_PIXELS)
+        try:
+            return self._pool().submit(render_variants, *args).result(timeout=self.timeout_seconds)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory on a huge image); start a fresh pool for the next job
+            with self._lock:
+                self._processes = None
+            raise
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._processes
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"workers": self.max_workers, "queued": len(self._queued)}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            if self._processes is not None:
+                self._processes.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instance
+image_processor = ImageProcessor(
+    max_workers=settings.IMAGE_WORKERS,
+    timeout_seconds=settings.IMAGE_TIMEOUT_SECONDS
+)
+metrics.register_collector("image_processor", image_processor.stats)
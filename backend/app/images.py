@@ -0,0 +1,82 @@
+"""
+Image variants for uploaded pictures (profile pictures, company logos)
+
+Each uploaded image gets fixed-size variants so clients never download the
+original to show a 40px avatar. Rendering runs in worker processes (see
+image_worker), so this module must stay light: no database or storage imports.
+"""
+import io
+import re
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+
+try:
+    from PIL import Image, ImageOps
+    IMAGE_PROCESSING_AVAILABLE = True
+except ImportError:
+    IMAGE_PROCESSING_AVAILABLE = False
+
+# name -> (size in px, crop to a square)
+VARIANTS: Dict[str, Tuple[int, bool]] = {
+    "thumb": (96, True),
+    "card": (320, True),
+    "full": (1280, False),
+}
+
+_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+_VARIANT_KEY_PATTERN = re.compile(r"^(?P<source>.+)\.(?P<variant>thumb|card|full)\.(?:webp|jpeg)$")
+
+
+def variant_format() -> str:
+    return settings.IMAGE_VARIANT_FORMAT if settings.IMAGE_VARIANT_FORMAT in _FORMATS else "webp"
+
+
+def variant_content_type() -> str:
+    return _FORMATS[variant_format()][1]
+
+
+def variant_key(source_key: str, variant: str) -> str:
+    """Storage key of a variant: "<source key>.<variant>.<format>" """
+    return f"{source_key}.{variant}.{variant_format()}"
+
+
+def variant_source_key(key: str) -> Optional[str]:
+    """Source image of a variant key, or None if `key` is not a variant"""
+    match = _VARIANT_KEY_PATTERN.match(key)
+    return match.group("source") if match else None
+
+
+def image_variant_urls(source_key: Optional[str]) -> Optional[Dict[str, str]]:
+    """URLs of every variant of an uploaded image (served by the /uploads route)"""
+    if not source_key:
+        return None
+    return {variant: f"/uploads/{variant_key(source_key, variant)}" for variant in VARIANTS}
+
+
+def render_variants(file_content: bytes, fmt: str, quality: int, max_pixels: int) -> Dict[str, bytes]:
+    """Encode every variant of an image (runs in a worker process)"""
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    pil_format = _FORMATS[fmt][0]
+
+    with Image.open(io.BytesIO(file_content)) as image:
+        # Animated GIFs: first frame only
+        image.seek(0)
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if pil_format == "WEBP" and image.mode in ("RGBA", "LA", "P") else "RGB")
+
+        rendered = {}
+        for name, (size, crop) in VARIANTS.items():
+            if crop:
+                variant = ImageOps.fit(image, (size, size), method=Image.Resampling.LANCZOS)
+            else:
+                variant = image.copy()
+                variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+            output = io.BytesIO()
+            variant.save(output, format=pil_format, quality=quality, optimize=True)
+            rendered[name] = output.getvalue()
+        return rendered
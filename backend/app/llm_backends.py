@@ -0,0 +1,226 @@
+"""
+Pluggable LLM backends for the applicant analyzer
+
+- GeminiBackend: Google Gemini (production)
+- RecordingBackend: wraps another backend and saves prompt/response pairs to disk
+- ReplayBackend: answers from recordings keyed by prompt hash (no network)
+- FakeBackend: deterministic synthetic rankings with injected latency (load tests)
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def prompt_hash(prompt: str) -> str:
+    """Stable key for a prompt, used to name recordings"""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class ModelResponse:
+    """Text and token usage of a single model call"""
+
+    def __init__(
+        self,
+        text: str,
+        prompt_token_count: Optional[int] = None,
+        candidates_token_count: Optional[int] = None
+    ):
+        self.text = text
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class ReplayMissError(KeyError):
+    """No recording exists for the requested prompt"""
+
+
+class ModelBackend(ABC):
+    """Interface every model backend implements"""
+
+    name = "base"
+    model_version = "unknown"
+
+    @abstractmethod
+    def generate(self, prompt: str) -> ModelResponse:
+        """The model's response to `prompt`"""
+
+
+class GeminiBackend(ModelBackend):
+    """Google Gemini via google-generativeai"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+        self.model_version = model_name
+
+    def generate(self, prompt: str) -> ModelResponse:
+        response = self.model.generate_content(prompt)
+        usage = getattr(response, "usage_metadata", None)
+        return ModelResponse(
+            text=response.text,
+            prompt_token_count=getattr(usage, "prompt_token_count", None),
+            candidates_token_count=getattr(usage, "candidates_token_count", None)
+        )
+
+
+class RecordingBackend(ModelBackend):
+    """Delegates to another backend and writes every prompt/response pair to disk"""
+
+    name = "record"
+
+    def __init__(self, inner: ModelBackend, directory: str):
+        self.inner = inner
+        self.directory = directory
+        self.model_version = inner.model_version
+        os.makedirs(directory, exist_ok=True)
+
+    def generate(self, prompt: str) -> ModelResponse:
+        start = time.perf_counter()
+        response = self.inner.generate(prompt)
+        latency = time.perf_counter() - start
+
+        key = prompt_hash(prompt)
+        record = {
+            "prompt_hash": key,
+            "model_version": self.inner.model_version,
+            "prompt": prompt,
+            "response": response.text,
+            "prompt_token_count": response.prompt_token_count,
+            "candidates_token_count": response.candidates_token_count,
+            "latency_seconds": round(latency, 4),
+            "recorded_at": int(time.time()),
+        }
+        # Write atomically so a concurrent replay never reads a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, os.path.join(self.directory, f"{key}.json"))
+        except Exception as e:
+            logger.error(f"Failed to record model response {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return response
+
+
+class ReplayBackend(ModelBackend):
+    """Serves recorded responses by prompt hash; optionally sleeps for the recorded latency"""
+
+    name = "replay"
+
+    def __init__(self, directory: str, replay_latency: bool = False):
+        self.directory = directory
+        self.replay_latency = replay_latency
+        self.model_version = "replay"
+
+    def generate(self, prompt: str) -> ModelResponse:
+        key = prompt_hash(prompt)
+        path = os.path.join(self.directory, f"{key}.json")
+        if not os.path.exists(path):
+            raise ReplayMissError(f"No recording for prompt {key} in {self.directory}")
+
+        with open(path, encoding="utf-8") as f:
+            record = json.load(f)
+        if self.replay_latency and record.get("latency_seconds"):
+            time.sleep(record["latency_seconds"])
+        return ModelResponse(
+            text=record["response"],
+            prompt_token_count=record.get("prompt_token_count"),
+            candidates_token_count=record.get("candidates_token_count")
+        )
+
+
+class FakeBackend(ModelBackend):
+    """
+    Offline stand-in that returns well-formed rankings for every application
+    in the prompt. Scores are derived from the prompt so runs are repeatable.
+    """
+
+    name = "fake"
+    model_version = "fake-1"
+
+    APPLICATION_ID_PATTERN = re.compile(r"Application ID: (\d+)")
+
+    def __init__(self, latency_ms: int = 0, jitter_ms: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+
+    def generate(self, prompt: str) -> ModelResponse:
+        rng = random.Random(prompt_hash(prompt))
+        delay_ms = self.latency_ms + (rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+
+        rankings = []
+        for application_id in self.APPLICATION_ID_PATTERN.findall(prompt):
+            score = rng.randint(20, 98)
+            if score >= 85:
+                recommendation = "hire"
+            elif score >= 70:
+                recommendation = "interview"
+            elif score >= 50:
+                recommendation = "maybe"
+            else:
+                recommendation = "pass"
+            rankings.append({
+                "application_id": int(application_id),
+                "overall_score": score,
+                "cover_letter_score": rng.randint(0, 100),
+                "completeness_score": rng.choice([0, 50, 100]),
+                "relevance_score": rng.randint(0, 100),
+                "resume_score": rng.randint(0, 100),
+                "ai_summary": "Synthetic assessment generated by the fake backend.",
+                "strengths": ["Synthetic strength"],
+                "concerns": ["Synthetic concern"],
+                "recommendation": recommendation,
+            })
+        rankings.sort(key=lambda r: r["overall_score"], reverse=True)
+        text = json.dumps(rankings)
+        return ModelResponse(
+            text=text,
+            prompt_token_count=len(prompt) // 4,
+            candidates_token_count=len(text) // 4
+        )
+
+
+def create_backend() -> Optional[ModelBackend]:
+    """Build the backend selected by settings.AI_BACKEND, or None if it can't be used"""
+    mode = settings.AI_BACKEND.lower()
+
+    if mode == "fake":
+        return FakeBackend(latency_ms=settings.AI_FAKE_LATENCY_MS, jitter_ms=settings.AI_FAKE_JITTER_MS)
+    if mode == "replay":
+        return ReplayBackend(settings.AI_RECORDINGS_DIR, replay_latency=settings.AI_REPLAY_LATENCY)
+    if mode not in ("gemini", "record"):
+        logger.error(f"Unknown AI_BACKEND '{settings.AI_BACKEND}'")
+        return None
+
+    if not settings.GEMINI_API_KEY:
+        logger.warning("GEMINI_API_KEY not configured")
+        return None
+    try:
+        backend = GeminiBackend(settings.GEMINI_API_KEY, settings.AI_MODEL_NAME)
+        logger.info("Gemini AI initialized successfully")
+    except Exception as e:
+        logger.error(f"Failed to initialize Gemini AI: {e}")
+        return None
+
+    if mode == "record":
+        logger.info(f"Recording Gemini responses to {settings.AI_RECORDINGS_DIR}")
+        return RecordingBackend(backend, settings.AI_RECORDINGS_DIR)
+    return backend
@@ -1,14 +1,18 @@
-from fastapi import FastAPI
+import hmac
+from fastapi import Depends, FastAPI, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-import os
 from app.config import settings
-from app.database import engine
-from app import models
-from app.routers import auth, jobs, applications, profiles, notifications, webhook
-
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+from app.database import engine, read_engine
+from app.metrics import metrics
+from app.middleware import RequestSizeLimitMiddleware, ResponseBytesMiddleware
+from app.extraction import extraction_pool
+from app.scoring_worker import scoring_worker
+from app.image_worker import image_processor
+from app.avatars import avatar_fetcher
+from app.storage_gc import storage_gc
+from app.migrations import check_schema_version
+from app.routers import auth, jobs, applications, profiles, notifications, webhook, uploads, avatars
 
 app = FastAPI(
     title="Telegram Job Platform API",
@@ -25,11 +29,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create uploads directory
-os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+# Reject oversized uploads before they are buffered
+app.add_middleware(RequestSizeLimitMiddleware, max_body_size=settings.MAX_REQUEST_BODY_SIZE)
 
-# Mount static files for uploads
-app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+# Measure what stored files cost in bandwidth (and what client caching saves)
+app.add_middleware(ResponseBytesMiddleware, path_prefix="/uploads")
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
@@ -38,6 +42,31 @@ app.include_router(applications.router, prefix="/api/applications", tags=["Appli
 app.include_router(profiles.router, prefix="/api/profiles", tags=["Profiles"])
 app.include_router(notifications.router, prefix="/api/notifications", tags=["Notifications"])
 app.include_router(webhook.router, prefix="/api/webhook", tags=["Webhook"])
+app.include_router(avatars.router, prefix="/api/avatars", tags=["Avatars"])
+app.include_router(uploads.router, prefix="/uploads", tags=["Uploads"])
+
+
+@app.on_event("startup")
+def check_schema():
+    # Tables are created and altered by migrations (alembic upgrade head), never at startup
+    check_schema_version(engine)
+    if read_engine is not engine:
+        check_schema_version(read_engine)
+
+
+@app.on_event("startup")
+def start_workers():
+    storage_gc.start(settings.STORAGE_GC_INTERVAL_HOURS, dry_run=settings.STORAGE_GC_DRY_RUN)
+    scoring_worker.start(settings.APPLICATION_INDEX_SWEEP_SECONDS)
+
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    storage_gc.shutdown()
+    scoring_worker.shutdown()
+    extraction_pool.shutdown()
+    image_processor.shutdown()
+    avatar_fetcher.shutdown()
 
 
 @app.get("/")
@@ -48,3 +77,28 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+def require_metrics_token(request: Request):
+    """Metrics include ranking traces (job ids, timings, failures): scrapers only"""
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+@app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+async def get_metrics(format: str = "json"):
+    """
+    Application metrics (AI ranking timings, cache hit rates, ...)
+    Use ?format=prometheus for the Prometheus text format
+    Requires "Authorization: Bearer <METRICS_TOKEN>" (bearer_token in a Prometheus scrape config)
+    """
+    if format == "prometheus":
+        return PlainTextResponse(metrics.render_prometheus())
+    return metrics.snapshot()
@@ -0,0 +1,259 @@
+"""
+In-process metrics registry and per-task traces for expensive operations
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Number of samples kept per histogram for percentile estimates
+HISTOGRAM_SAMPLE_SIZE = 1024
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Histogram:
+    """Count, sum, max and a bounded sample of recent observations"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=HISTOGRAM_SAMPLE_SIZE)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.samples.append(value)
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "max": round(self.max, 6),
+            "p50": round(self.percentile(0.5), 6),
+            "p95": round(self.percentile(0.95), 6),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms keyed by name and labels"""
+
+    def __init__(self, trace_history: int = 100):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[tuple, float]] = defaultdict(lambda: defaultdict(float))
+        self._gauges: Dict[str, Dict[tuple, float]] = defaultdict(dict)
+        self._histograms: Dict[str, Dict[tuple, _Histogram]] = defaultdict(dict)
+        self._collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+        self.recent_traces = deque(maxlen=trace_history)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increment a counter"""
+        with self._lock:
+            self._counters[name][_label_key(labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge to an absolute value"""
+        with self._lock:
+            self._gauges[name][_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record an observation (e.g. a duration in seconds or a size in bytes)"""
+        key = _label_key(labels)
+        with self._lock:
+            histogram = self._histograms[name].get(key)
+            if histogram is None:
+                histogram = self._histograms[name][key] = _Histogram()
+            histogram.observe(value)
+
+    def register_collector(self, name: str, collector: Callable[[], Dict[str, float]]):
+        """
+        Register a callable producing gauge values at read time
+        (e.g. pool sizes that are cheaper to read than to keep updated)
+        """
+        with self._lock:
+            self._collectors[name] = collector
+
+    def record_trace(self, trace: "RankingTrace"):
+        with self._lock:
+            self.recent_traces.append(trace.to_dict())
+
+    def counter_value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0.0)
+
+    def _collected(self) -> Dict[str, float]:
+        values = {}
+        for name, collector in list(self._collectors.items()):
+            try:
+                for key, value in collector().items():
+                    values[f"{name}_{key}"] = value
+            except Exception as e:
+                logger.error(f"Metrics collector {name} failed: {e}")
+        return values
+
+    def snapshot(self) -> dict:
+        """Return all metrics as a JSON-serialisable dict"""
+        collected = self._collected()
+        with self._lock:
+            def series(values: Dict[tuple, object], render) -> List[dict]:
+                return [{"labels": dict(key), "value": render(value)} for key, value in values.items()]
+
+            return {
+                "counters": {name: series(values, lambda v: v) for name, values in self._counters.items()},
+                "gauges": {
+                    **{name: series(values, lambda v: v) for name, values in self._gauges.items()},
+                    **{name: [{"labels": {}, "value": value}] for name, value in collected.items()},
+                },
+                "histograms": {name: series(values, lambda h: h.snapshot()) for name, values in self._histograms.items()},
+                "recent_traces": list(self.recent_traces),
+            }
+
+    def render_prometheus(self) -> str:
+        """Render metrics in the Prometheus text exposition format"""
+        def fmt_labels(key: tuple, extra: Optional[Dict[str, str]] = None) -> str:
+            pairs = list(key) + sorted((extra or {}).items())
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + "}"
+
+        collected = self._collected()
+        lines = []
+        with self._lock:
+            for name, values in self._counters.items():
+                lines.append(f"# TYPE {name} counter")
+                lines.extend(f"{name}{fmt_labels(key)} {value}" for key, value in values.items())
+            for name, values in self._gauges.items():
+                lines.append(f"# TYPE {name} gauge")
+                lines.extend(f"{name}{fmt_labels(key)} {value}" for key, value in values.items())
+            for name, values in self._histograms.items():
+                lines.append(f"# TYPE {name} summary")
+                for key, histogram in values.items():
+                    for q in (0.5, 0.95):
+                        lines.append(f"{name}{fmt_labels(key, {'quantile': str(q)})} {histogram.percentile(q)}")
+                    lines.append(f"{name}_sum{fmt_labels(key)} {histogram.total}")
+                    lines.append(f"{name}_count{fmt_labels(key)} {histogram.count}")
+        for name, value in collected.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance
+metrics = MetricsRegistry()
+
+
+class RankingTrace:
+    """
+    Structured record of a single AI ranking task: per-stage timings,
+    prompt/response sizes, token counts, cache usage and fallback reason
+    """
+
+    def __init__(self, job_id: Optional[int] = None):
+        self.task_id = uuid.uuid4().hex[:16]
+        self.job_id = job_id
+        self.started_at = time.time()
+        self.stages: Dict[str, float] = defaultdict(float)
+        self.applicants = 0
+        self.prompt_chars = 0
+        self.response_chars = 0
+        self.prompt_tokens: Optional[int] = None
+        self.response_tokens: Optional[int] = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.unreadable_resumes: Dict[str, int] = defaultdict(int)  # ExtractionError kind -> count
+        self.fallback_reason: Optional[str] = None
+        self.total_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a pipeline stage; repeated stages (e.g. one download per applicant) accumulate"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(name, time.perf_counter() - start)
+
+    def add_stage_time(self, name: str, elapsed: float):
+        with self._lock:
+            self.stages[name] += elapsed
+        metrics.observe("ai_ranking_stage_seconds", elapsed, stage=name)
+
+    def cache_hit(self):
+        with self._lock:
+            self.cache_hits += 1
+        metrics.inc("ai_resume_cache_total", result="hit")
+
+    def cache_miss(self):
+        with self._lock:
+            self.cache_misses += 1
+        metrics.inc("ai_resume_cache_total", result="miss")
+
+    def resume_unreadable(self, kind: str):
+        with self._lock:
+            self.unreadable_resumes[kind] += 1
+
+    def fallback(self, reason: str):
+        # Keep the first reason: later fallbacks are consequences of it
+        if self.fallback_reason is None:
+            self.fallback_reason = reason
+            metrics.inc("ai_ranking_fallback_total", reason=reason)
+
+    def finish(self):
+        """Close the trace and publish its totals"""
+        self.total_seconds = time.time() - self.started_at
+        metrics.observe("ai_ranking_seconds", self.total_seconds)
+        metrics.inc("ai_ranking_tasks_total", outcome="fallback" if self.fallback_reason else "ai")
+        if self.prompt_chars:
+            metrics.observe("ai_prompt_chars", self.prompt_chars)
+        if self.response_chars:
+            metrics.observe("ai_response_chars", self.response_chars)
+        if self.prompt_tokens is not None:
+            metrics.inc("ai_tokens_total", self.prompt_tokens, kind="prompt")
+        if self.response_tokens is not None:
+            metrics.inc("ai_tokens_total", self.response_tokens, kind="response")
+        metrics.record_trace(self)
+        logger.info(f"AI ranking trace: {self.to_dict()}")
+
+    def server_timing(self) -> str:
+        """Render stage timings as a Server-Timing header value (milliseconds)"""
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items())
+
+    def to_dict(self) -> dict:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "task_id": self.task_id,
+            "job_id": self.job_id,
+            "applicants": self.applicants,
+            "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            "total_seconds": round(self.total_seconds, 4) if self.total_seconds is not None else None,
+            "prompt_chars": self.prompt_chars,
+            "response_chars": self.response_chars,
+            "prompt_tokens": self.prompt_tokens,
+            "response_tokens": self.response_tokens,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": round(self.cache_hits / lookups, 3) if lookups else None,
+            "unreadable_resumes": dict(self.unreadable_resumes),
+            "fallback_reason": self.fallback_reason,
+        }
@@ -0,0 +1,128 @@
+"""
+ASGI middleware
+"""
+import logging
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _BodyTooLarge(HTTPException):
+    """Raised from receive(); an HTTPException so body parsing lets it through as a 413"""
+
+    def __init__(self, max_body_size: int):
+        super().__init__(
+            status_code=413,
+            detail=f"Request body exceeds maximum allowed size of {max_body_size} bytes"
+        )
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject request bodies over `max_body_size` bytes before they are read:
+    up front from Content-Length, or as soon as a chunked body crosses the limit
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None:
+            try:
+                too_large = int(content_length) > self.max_body_size
+            except ValueError:
+                too_large = False
+            if too_large:
+                await self._reject(scope, receive, send)
+                return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    metrics.inc("http_requests_too_large_total")
+                    raise _BodyTooLarge(self.max_body_size)
+            return message
+
+        async def tracking_send(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge:
+            # Only reached when nothing below turned the exception into a response
+            if response_started:
+                raise
+            await self._reject(scope, receive, send, count=False)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, count: bool = True):
+        if count:
+            metrics.inc("http_requests_too_large_total")
+        logger.warning(f"Rejected oversized request body: {scope['method']} {scope['path']}")
+        response = JSONResponse(
+            status_code=413,
+            content={"detail": f"Request body exceeds maximum allowed size of {self.max_body_size} bytes"},
+            headers={"Connection": "close"}
+        )
+        await response(scope, receive, send)
+
+
+class ResponseBytesMiddleware:
+    """
+    Count response bytes and responses by status for paths under `path_prefix`
+    (http_response_bytes_total / http_responses_total), so cache hit rates show up
+    as 304s and bytes saved
+    """
+
+    # Messages that hand the file to the server instead of passing bytes through us
+    _FILE_MESSAGES = ("http.response.pathsend", "http.response.zerocopysend")
+
+    def __init__(self, app: ASGIApp, path_prefix: str):
+        self.app = app
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        content_length = 0
+        sent = 0
+
+        async def counting_send(message: Message):
+            nonlocal status_code, content_length, sent
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                value = dict(message.get("headers", [])).get(b"content-length")
+                content_length = int(value) if value and value.isdigit() else 0
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            elif message["type"] in self._FILE_MESSAGES:
+                sent += content_length
+            await send(message)
+
+        try:
+            await self.app(scope, receive, counting_send)
+        finally:
+            metrics.inc("http_responses_total", path=self.path_prefix, status=str(status_code))
+            if sent:
+                metrics.inc("http_response_bytes_total", sent, path=self.path_prefix, status=str(status_code))
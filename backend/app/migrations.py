@@ -0,0 +1,84 @@
+"""
+Schema migrations (Alembic, see backend/alembic/)
+
+- upgrade_schema(): bring a database to the latest revision (`alembic upgrade head`)
+- check_schema_version(): startup check, one query on alembic_version
+- create_index_online() / run_in_batches(): helpers for revisions that touch
+  large tables without holding locks for the whole migration
+"""
+import logging
+import os
+from typing import List, Optional
+from alembic import command, op
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+
+def alembic_config(database_url: Optional[str] = None) -> Config:
+    config = Config(ALEMBIC_INI)
+    # Callers configure logging themselves
+    config.attributes["configure_logger"] = False
+    if database_url:
+        config.set_main_option("sqlalchemy.url", database_url)
+    return config
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def upgrade_schema(database_url: Optional[str] = None, revision: str = "head"):
+    """Run pending migrations (settings.DATABASE_URL unless another database is given)"""
+    command.upgrade(alembic_config(database_url), revision)
+
+
+def check_schema_version(engine: Engine):
+    """Raise unless the database is at the head revision of the migrations"""
+    with engine.connect() as conn:
+        current = MigrationContext.configure(conn).get_current_revision()
+    head = head_revision()
+    if current != head:
+        raise RuntimeError(
+            f"Database schema is at revision {current or 'none'} but the code expects {head}; "
+            f"run `alembic upgrade head` in backend/"
+        )
+    logger.info(f"Database schema at revision {head}")
+
+
+def create_index_online(name: str, table: str, columns: List[str], unique: bool = False):
+    """
+    Create an index unless it exists. On PostgreSQL it is built CONCURRENTLY,
+    outside the migration's transaction, so writes to the table continue meanwhile
+    """
+    bind = op.get_bind()
+    if name in {index["name"] for index in inspect(bind).get_indexes(table)}:
+        return
+    if bind.dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True)
+    else:
+        op.create_index(name, table, columns, unique=unique)
+
+
+def run_in_batches(statement: str, batch_size: int = 1000, **params) -> int:
+    """
+    Repeat a backfill/cleanup statement, committing after each run, until it
+    affects fewer than batch_size rows; returns the rows affected in total
+    The statement limits itself with :batch_size, e.g.
+    UPDATE t SET x = ... WHERE id IN (SELECT id FROM t WHERE x IS NULL LIMIT :batch_size)
+    """
+    total = 0
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        while True:
+            affected = bind.execute(text(statement), {"batch_size": batch_size, **params}).rowcount
+            total += affected
+            if affected < batch_size:
+                return total
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Float, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Float, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -33,7 +33,9 @@ class User(Base):
     first_name = Column(String, nullable=True)
     last_name = Column(String, nullable=True)
     photo_url = Column(String, nullable=True)  # Telegram profile photo
-    profile_picture_url = Column(String, nullable=True)  # Custom uploaded profile picture
+    avatar_url = Column(String, nullable=True, index=True)  # Copy of the Telegram photo in our storage
+    avatar_source_url = Column(String, nullable=True)  # photo_url the avatar was fetched from
+    profile_picture_url = Column(String, nullable=True, index=True)  # Custom uploaded profile picture
     phone = Column(String, nullable=True)  # Phone number
     email = Column(String, nullable=True)  # Email address
     language_code = Column(String, nullable=True)  # Telegram language
@@ -54,9 +56,9 @@ class Company(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    logo_url = Column(String, nullable=True)
+    logo_url = Column(String, nullable=True, index=True)
     website = Column(String, nullable=True)
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -69,11 +71,11 @@ class JobSeekerProfile(Base):
     __tablename__ = "job_seeker_profiles"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     bio = Column(Text, nullable=True)
     skills = Column(Text, nullable=True)  # JSON string or comma-separated
     experience_years = Column(Integer, nullable=True)
-    cv_url = Column(String, nullable=True)
+    cv_url = Column(String, nullable=True, index=True)
     phone = Column(String, nullable=True)
     email = Column(String, nullable=True)
     location = Column(String, nullable=True)
@@ -111,6 +113,12 @@ class Job(Base):
     poster = relationship("User", back_populates="jobs_posted")
     company = relationship("Company", back_populates="jobs")
     applications = relationship("Application", back_populates="job", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Public feed (active jobs, newest first) and "my jobs" (newest first)
+        Index("ix_jobs_status_created", "status", "created_at"),
+        Index("ix_jobs_poster_created", "poster_id", "created_at"),
+    )
 
 
 class Application(Base):
@@ -118,11 +126,12 @@ class Application(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     job_id = Column(Integer, ForeignKey("jobs.id"), nullable=False)
-    applicant_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    applicant_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     cover_letter = Column(Text, nullable=True)
-    resume_url = Column(String, nullable=True)  # GCP Storage URL for resume
+    resume_url = Column(String, nullable=True, index=True)  # GCP Storage URL for resume
     status = Column(Enum(ApplicationStatus), default=ApplicationStatus.PENDING)
     notes = Column(Text, nullable=True)  # Internal notes from employer
+    indexed_at = Column(DateTime(timezone=True), nullable=True, index=True)  # Skill and full-text indexes written
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -130,6 +139,70 @@ class Application(Base):
     # Relationships
     job = relationship("Job", back_populates="applications")
     applicant = relationship("User", back_populates="applications")
+    analysis = relationship("ApplicationAnalysis", back_populates="application", uselist=False, cascade="all, delete-orphan")
+    skills = relationship("ApplicationSkill", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # One application per applicant and job; also serves every per-job lookup.
+        # A unique index rather than a constraint so migrations can add it to existing SQLite tables
+        Index("uq_applications_job_applicant", "job_id", "applicant_id", unique=True),
+    )
+
+
+class ApplicationAnalysis(Base):
+    __tablename__ = "application_analyses"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    application_id = Column(Integer, ForeignKey("applications.id"), nullable=False, unique=True)
+    job_id = Column(Integer, ForeignKey("jobs.id"), nullable=False)
+    overall_score = Column(Integer, nullable=False)
+    cover_letter_score = Column(Integer, nullable=False)
+    completeness_score = Column(Integer, nullable=False)
+    relevance_score = Column(Integer, nullable=False)
+    resume_score = Column(Integer, nullable=False)
+    ai_summary = Column(Text, nullable=True)
+    strengths = Column(Text, nullable=True)  # JSON list
+    concerns = Column(Text, nullable=True)  # JSON list
+    recommendation = Column(String, nullable=False)  # hire, interview, maybe, pass, review
+    model_version = Column(String, nullable=False)  # Backend model, or "fallback" for rule-based scores
+    input_fingerprint = Column(String, nullable=False)  # Hash of job + application inputs
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    application = relationship("Application", back_populates="analysis")
+    
+    __table_args__ = (
+        # Ranked view: all analyses of a job ordered by score, optionally per recommendation
+        Index("ix_application_analyses_job_score", "job_id", "overall_score"),
+        Index("ix_application_analyses_job_recommendation_score", "job_id", "recommendation", "overall_score"),
+    )
+
+
+class ApplicationSkill(Base):
+    __tablename__ = "application_skills"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    application_id = Column(Integer, ForeignKey("applications.id"), nullable=False)
+    job_id = Column(Integer, ForeignKey("jobs.id"), nullable=False)  # Denormalized for per-job filters and facets
+    skill = Column(String, nullable=False)  # Normalized name, see app/skills.py
+    source = Column(String, nullable=False)  # profile, resume or cover_letter
+    
+    __table_args__ = (
+        UniqueConstraint("application_id", "skill", name="uq_application_skills_application_skill"),
+        Index("ix_application_skills_job_skill", "job_id", "skill", "application_id"),
+    )
+
+
+class DocumentExtraction(Base):
+    """Extraction results of an uploaded document, shared by every application using it"""
+    __tablename__ = "document_extractions"
+    
+    content_hash = Column(String(64), primary_key=True)  # sha256 of the file, also its blob name
+    text = Column(Text, nullable=False)
+    skills = Column(Text, nullable=True)  # JSON list of resume skills, filled on first skill indexing
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
 class JobNotificationMilestone(Base):
@@ -139,6 +212,10 @@ class JobNotificationMilestone(Base):
     job_id = Column(Integer, ForeignKey("jobs.id"), nullable=False)
     milestone = Column(Integer, nullable=False)  # 1, 5, 10, 20, 50, etc.
     notified_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("uq_job_notification_milestones_job_milestone", "job_id", "milestone", unique=True),
+    )
 
 
 class Notification(Base):
@@ -156,3 +233,22 @@ class Notification(Base):
     
     # Relationships
     user = relationship("User")
+    
+    __table_args__ = (
+        # Unread badge count; the list is ordered by created_at within the user's rows
+        Index("ix_notifications_user_read", "user_id", "is_read"),
+    )
+
+
+class RefreshToken(Base):
+    """Long-lived session credential, exchanged (and rotated) for new access tokens"""
+    __tablename__ = "refresh_tokens"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True)  # sha256; the token itself is never stored
+    family_id = Column(String(32), nullable=False, index=True)  # Every token rotated from the same login
+    expires_at = Column(DateTime, nullable=False)  # UTC
+    rotated_at = Column(DateTime, nullable=True)  # UTC; exchanged for a newer token of the family
+    revoked_at = Column(DateTime, nullable=True)  # UTC; logged out, or the family was compromised
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
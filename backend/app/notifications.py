@@ -3,6 +3,7 @@ Notification service for sending Telegram messages to job posters
 """
 import logging
 from typing import Optional
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.config import settings
 from app.models import Job, Application, JobNotificationMilestone, User
@@ -43,7 +44,11 @@ def mark_notification_sent(db: Session, job_id: int, milestone: int):
         milestone=milestone
     )
     db.add(notification)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request recorded the same milestone first
+        db.rollback()
 
 
 def send_application_milestone_notification(
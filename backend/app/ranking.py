@@ -0,0 +1,87 @@
+"""
+Persisted AI rankings: keeps application_analyses in sync with applications
+so the ranked view is a plain indexed query
+
+Only new or changed applications are sent to the model, so a job's stored
+scores come from many calls. That is sound because the prompt asks for
+independent, absolute scores (see ai_service.PROMPT_VERSION), never scores
+relative to the other applicants in the call.
+"""
+import logging
+from typing import List, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.ai_service import ai_analyzer
+from app.crud import get_analysis_fingerprints, upsert_application_analysis
+from app.metrics import RankingTrace, metrics
+from app.models import Application, Job
+
+logger = logging.getLogger(__name__)
+
+
+def stale_applications(db: Session, job: Job, applications: List[Application]) -> List[Application]:
+    """Applications with no stored analysis, or one computed from different inputs/model"""
+    stored = get_analysis_fingerprints(db, job.id)
+    return [
+        app for app in applications
+        if stored.get(app.id) != ai_analyzer.fingerprint(app, job.title, job.description, job.requirements)
+    ]
+
+
+def analyze_and_store(
+    db: Session,
+    job: Job,
+    applications: List[Application],
+    trace: Optional[RankingTrace] = None
+) -> int:
+    """
+    Run the analyzer over `applications` and persist one analysis row per application.
+    Returns the number of analyses stored.
+    """
+    if not applications:
+        return 0
+
+    trace = trace or RankingTrace(job_id=job.id)
+    results = ai_analyzer.analyze_applicants(
+        applications=applications,
+        job_title=job.title,
+        job_description=job.description,
+        job_requirements=job.requirements,
+        trace=trace
+    )
+    model_version = "fallback" if trace.fallback_reason else ai_analyzer.model_version
+
+    rows = [
+        (
+            result["application"].id,
+            result["ai_analysis"],
+            # Fallback scores get a "fallback" fingerprint so they are redone once the model is back
+            ai_analyzer.fingerprint(
+                result["application"], job.title, job.description, job.requirements, model_version=model_version
+            )
+        )
+        for result in results
+    ]
+    for attempt in range(2):
+        for application_id, analysis, fingerprint in rows:
+            upsert_application_analysis(
+                db,
+                application_id=application_id,
+                job_id=job.id,
+                analysis=analysis,
+                model_version=model_version,
+                input_fingerprint=fingerprint
+            )
+        try:
+            db.commit()
+            break
+        except IntegrityError:
+            # A concurrent analysis (eager worker vs. ranked view) inserted the same
+            # application first; retry as an update of its row
+            db.rollback()
+            if attempt:
+                raise
+
+    metrics.inc("ai_analyses_stored_total", len(results), model=model_version)
+    logger.info(f"Stored {len(results)} analyses for job {job.id} (model: {model_version})")
+    return len(results)
@@ -0,0 +1,211 @@
+"""
+Rate limiting with token buckets
+
+Every limited endpoint names a bucket; each caller (user id from the access
+token, else client IP) gets one bucket per endpoint, sized by
+settings.RATE_LIMITS, plus one shared budget (settings.RATE_LIMIT_BUDGET) that
+each request spends its endpoint's cost from (settings.RATE_LIMIT_COSTS).
+Expensive endpoints like the AI ranking cost more of the budget.
+
+The check is a route dependency that reads only the JWT, so it runs before
+any database work. Over the limit: 429 with Retry-After.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import redis
+from fastapi import HTTPException, Request, status
+from jose import JWTError, jwt
+from app.config import settings
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# (key, capacity, refill per second, cost)
+Bucket = Tuple[str, float, float, float]
+
+
+def parse_rate(spec: str) -> Tuple[float, float]:
+    """'10/minute' -> (bucket capacity 10, refill 10/60 tokens per second)"""
+    count, _, period = spec.partition("/")
+    seconds = _PERIODS.get(period.strip().rstrip("s"))
+    if not seconds:
+        raise ValueError(f"Invalid rate limit {spec!r}, expected '<requests>/<second|minute|hour|day>'")
+    capacity = float(count)
+    return capacity, capacity / seconds
+
+
+class MemoryBuckets:
+    """Token buckets of this process (each worker process limits separately)"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # key -> (tokens, last refill as monotonic seconds), least recently used first
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, buckets: List[Bucket]) -> float:
+        """Take `cost` tokens from every bucket, or none: 0 if allowed, else seconds until allowed"""
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            wait = 0.0
+            for key, capacity, rate, cost in buckets:
+                tokens, updated = self._buckets.get(key, (capacity, now))
+                tokens = min(capacity, tokens + (now - updated) * rate)
+                levels.append(tokens)
+                if tokens < cost:
+                    wait = max(wait, (cost - tokens) / rate)
+            if wait > 0:
+                return wait
+
+            for (key, capacity, rate, cost), tokens in zip(buckets, levels):
+                self._buckets[key] = (tokens - cost, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                # Least recently used buckets are the fullest anyway
+                self._buckets.popitem(last=False)
+            return 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"buckets": len(self._buckets)}
+
+
+# KEYS: bucket keys; ARGV: capacity, rate, cost for each key. Returns the wait in seconds ("0" = allowed)
+_REDIS_ACQUIRE = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 3 - 2])
+    local rate = tonumber(ARGV[i * 3 - 1])
+    local cost = tonumber(ARGV[i * 3])
+    local state = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    levels[i] = tokens
+    if tokens < cost then
+        wait = math.max(wait, (cost - tokens) / rate)
+    end
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 3 - 2])
+    local rate = tonumber(ARGV[i * 3 - 1])
+    redis.call('HSET', key, 'tokens', levels[i] - tonumber(ARGV[i * 3]), 'updated', now)
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000))
+end
+return "0"
+"""
+
+
+class RedisBuckets:
+    """Token buckets in Redis, shared by every worker process"""
+
+    def __init__(self, redis_url: str):
+        self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._acquire = self._redis.register_script(_REDIS_ACQUIRE)
+
+    def acquire(self, buckets: List[Bucket]) -> float:
+        keys = [f"ratelimit:{key}" for key, _, _, _ in buckets]
+        args = []
+        for _, capacity, rate, cost in buckets:
+            args.extend([capacity, rate, cost])
+        try:
+            return float(self._acquire(keys=keys, args=args))
+        except Exception as e:
+            # Fail open: an unavailable Redis must not take the API down
+            logger.warning(f"Rate limit check failed, allowing request: {e}")
+            metrics.inc("rate_limit_errors_total")
+            return 0.0
+
+    def stats(self) -> dict:
+        return {}
+
+
+class RateLimiter:
+    """Per-caller, per-endpoint token buckets plus a shared per-caller cost budget"""
+
+    def __init__(self, limits: Dict[str, str], budget: Optional[str], costs: Dict[str, float], backend):
+        self.limits = {name: parse_rate(spec) for name, spec in limits.items()}
+        self.budget = parse_rate(budget) if budget else None
+        self.costs = costs
+        self.backend = backend
+
+    def buckets(self, endpoint: str, caller: str) -> List[Bucket]:
+        buckets = []
+        if endpoint in self.limits:
+            capacity, rate = self.limits[endpoint]
+            buckets.append((f"{caller}:{endpoint}", capacity, rate, 1.0))
+        if self.budget:
+            capacity, rate = self.budget
+            # A cost above the budget's size could never be paid
+            cost = min(float(self.costs.get(endpoint, 1)), capacity)
+            buckets.append((f"{caller}:budget", capacity, rate, cost))
+        return buckets
+
+    def check(self, endpoint: str, caller: str) -> float:
+        """0 if the request may proceed, else seconds to wait"""
+        buckets = self.buckets(endpoint, caller)
+        return self.backend.acquire(buckets) if buckets else 0.0
+
+    def stats(self) -> dict:
+        return self.backend.stats()
+
+
+def caller_key(request: Request) -> str:
+    """User id from a valid bearer token (no database access), else the client IP"""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            user_id = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("sub")
+            if user_id is not None:
+                return f"user:{user_id}"
+        except JWTError:
+            pass
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def rate_limit(endpoint: str):
+    """
+    Route dependency limiting `endpoint` per caller; use in the route decorator:
+    @router.get(..., dependencies=[Depends(rate_limit("ranked"))])
+    """
+    def check_rate_limit(request: Request):
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        wait = rate_limiter.check(endpoint, caller_key(request))
+        if wait > 0:
+            metrics.inc("rate_limited_total", endpoint=endpoint)
+            retry_after = max(1, math.ceil(wait))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Too many requests, retry in {retry_after} seconds",
+                headers={"Retry-After": str(retry_after)}
+            )
+
+    return check_rate_limit
+
+
+def create_rate_limiter() -> RateLimiter:
+    if settings.RATE_LIMIT_BACKEND.lower() == "redis":
+        backend = RedisBuckets(settings.REDIS_URL)
+    else:
+        backend = MemoryBuckets(settings.RATE_LIMIT_MAX_KEYS)
+    return RateLimiter(settings.RATE_LIMITS, settings.RATE_LIMIT_BUDGET, settings.RATE_LIMIT_COSTS, backend)
+
+
+# Singleton instance
+rate_limiter = create_rate_limiter()
+metrics.register_collector("rate_limiter", rate_limiter.stats)
@@ -0,0 +1,167 @@
+"""
+Read-replica routing for read-only routes
+
+Feed, job detail, notification and my-applications reads dominate the load.
+Routes that only read take `Depends(get_read_db)` instead of get_db and get a
+session on the replica engine (settings.DATABASE_READ_URL), so reads scale by
+adding replicas while writes stay on the primary.
+
+A replica lags the primary, so a user who just applied could open "My
+applications" and not see it. Sessions from get_db remember the request; when
+one commits a write, the caller (user id from the token, else client IP) is
+marked for READ_YOUR_WRITES_SECONDS and their read sessions use the primary
+until it expires. Backends (settings.READ_YOUR_WRITES_BACKEND):
+- memory: per process, enough with a single worker or sticky load balancing
+- redis: shared by all workers
+Read sessions refuse to write, with or without a replica.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+import redis
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+from app.config import settings
+from app.database import ReadSessionLocal, SessionLocal, engine, read_engine
+from app.metrics import metrics
+from app.rate_limit import caller_key
+
+logger = logging.getLogger(__name__)
+
+_WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class RecentWriters:
+    """Callers that wrote within the last `window_seconds`"""
+
+    def __init__(self, backend: str, window_seconds: float, max_size: int = 100000, redis_url: str = None):
+        self.backend = backend.lower()
+        self.window_seconds = window_seconds
+        self.max_size = max_size
+        # caller -> expiry as monotonic seconds, oldest write first
+        self._writers: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        if self.backend == "redis":
+            self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def mark(self, caller: str):
+        if self.window_seconds <= 0:
+            return
+        if self._redis is not None:
+            try:
+                self._redis.set(self._redis_key(caller), 1, px=int(self.window_seconds * 1000))
+            except Exception as e:
+                logger.warning(f"Recording a write by {caller} failed: {e}")
+                metrics.inc("read_your_writes_errors_total", operation="mark")
+            return
+
+        with self._lock:
+            self._writers[caller] = time.monotonic() + self.window_seconds
+            self._writers.move_to_end(caller)
+            while len(self._writers) > self.max_size:
+                self._writers.popitem(last=False)
+
+    def wrote_recently(self, caller: str) -> bool:
+        if self.window_seconds <= 0:
+            return False
+        if self._redis is not None:
+            try:
+                return bool(self._redis.exists(self._redis_key(caller)))
+            except Exception as e:
+                # Unknown: the primary is always up to date
+                logger.warning(f"Read-your-writes lookup failed, reading from the primary: {e}")
+                metrics.inc("read_your_writes_errors_total", operation="lookup")
+                return True
+
+        with self._lock:
+            expires_at = self._writers.get(caller)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self._writers[caller]
+                return False
+            return True
+
+    @staticmethod
+    def _redis_key(caller: str) -> str:
+        return f"wrote:{caller}"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"writers": len(self._writers)}
+
+
+def _is_write(orm_execute_state) -> bool:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        return True
+    statement = orm_execute_state.statement
+    return isinstance(statement, TextClause) and statement.text.lstrip().upper().startswith(_WRITE_STATEMENTS)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _flushed(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _executed(orm_execute_state):
+    if _is_write(orm_execute_state):
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _committed(session):
+    request = session.info.get("request")
+    if session.info.pop("wrote", False) and request is not None and read_engine is not engine:
+        recent_writers.mark(caller_key(request))
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _rolled_back(session):
+    session.info.pop("wrote", None)
+
+
+@event.listens_for(ReadSessionLocal, "before_flush")
+def _refuse_flush(session, flush_context, instances):
+    raise RuntimeError("Read-only session: use get_db for routes that write")
+
+
+@event.listens_for(ReadSessionLocal, "do_orm_execute")
+def _refuse_write(orm_execute_state):
+    if _is_write(orm_execute_state):
+        raise RuntimeError("Read-only session: use get_db for routes that write")
+
+
+def read_target(request: Request) -> str:
+    """'replica', or 'primary' when there is none or the caller wrote recently"""
+    if read_engine is engine or recent_writers.wrote_recently(caller_key(request)):
+        return "primary"
+    return "replica"
+
+
+def open_read_session(target: str) -> Session:
+    """A read-only session on the primary or the replica"""
+    metrics.inc("db_read_sessions_total", target=target)
+    return ReadSessionLocal(bind=engine) if target == "primary" else ReadSessionLocal()
+
+
+def get_read_db(request: Request):
+    """get_db for routes that only read"""
+    db = open_read_session(read_target(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Singleton instance
+recent_writers = RecentWriters(
+    backend=settings.READ_YOUR_WRITES_BACKEND,
+    window_seconds=settings.READ_YOUR_WRITES_SECONDS,
+    redis_url=settings.REDIS_URL
+)
+metrics.register_collector("read_your_writes", recent_writers.stats)
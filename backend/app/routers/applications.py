@@ -1,23 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Response, Query
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional
+from app.database import SessionLocal, get_db
 from app.auth import get_current_user, require_roles
-from app.models import User, UserRole
-from app.schemas import Application, ApplicationCreate, ApplicationUpdate, RankedApplication
+from app.rate_limit import rate_limit
+from app.read_replica import get_read_db
+from app.models import User, UserRole, Application as ApplicationModel
+from app.schemas import (
+    Application, ApplicationCreate, ApplicationUpdate, RankedApplication, SkillFacet, ApplicationSearchHit,
+    ResumeUrlBatchRequest, ResumeUrlBatch
+)
 from app.crud import (
-    create_application, get_application, get_applications_by_job,
-    get_applications_by_applicant, update_application
+    create_application, get_application, get_applications_by_job, get_job,
+    get_applications_by_applicant, update_application, get_ranked_analyses,
+    get_job_score_distribution, get_job_skill_facets
 )
-from app.storage import gcp_storage
-from app.ai_service import ai_analyzer
+from app.storage import file_storage
+from app.metrics import RankingTrace, metrics
+from app.ranking import analyze_and_store, stale_applications
+from app.scoring_worker import scoring_worker
+from app.skills import parse_skill_filter
+from app.search import search_applications
+from app.singleflight import create_single_flight
+import time
+from bisect import bisect_left, bisect_right
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Ranking runs per job, shared by concurrent ranked views (double clicks, several devices)
+ranking_flight = create_single_flight("ranking")
+
 
-@router.post("/", response_model=Application)
+@router.post("/", response_model=Application, dependencies=[Depends(rate_limit("apply"))])
 async def apply_for_job(
     application: ApplicationCreate,
     current_user: User = Depends(get_current_user),
@@ -48,6 +64,10 @@ async def apply_for_job(
             # Don't fail the application if notification fails
             logger.error(f"Failed to send milestone notification: {e}")
         
+        # Index skills and score the applicant in the background so the
+        # skill filters and ranked view are precomputed
+        scoring_worker.enqueue(db_application.id)
+        
         return db_application
         
     except ValueError as e:
@@ -60,7 +80,7 @@ async def apply_for_job(
 @router.get("/my-applications/", response_model=List[Application])
 async def get_my_applications(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get applications made by current user
@@ -69,14 +89,60 @@ async def get_my_applications(
     return applications
 
 
+@router.get("/search", response_model=List[ApplicationSearchHit], dependencies=[Depends(rate_limit("search"))])
+async def search_my_applicants(
+    q: str = Query(..., min_length=2, max_length=200),
+    job_id: Optional[int] = Query(None, description="Restrict to one of your jobs"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(require_roles([UserRole.EMPLOYER, UserRole.INDIVIDUAL])),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Full-text search over cover letters and resume text of applicants to all of
+    the current user's jobs, best matches first with highlighted snippets
+    """
+    start = time.perf_counter()
+    try:
+        hits = search_applications(db, current_user.id, q, job_id=job_id, limit=limit)
+    except Exception as e:
+        logger.error(f"Applicant search failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Search is not available right now"
+        )
+    metrics.observe("application_search_seconds", time.perf_counter() - start)
+    
+    if not hits:
+        return []
+    
+    applications = {
+        app.id: app for app in db.query(ApplicationModel).options(
+            joinedload(ApplicationModel.applicant), joinedload(ApplicationModel.job)
+        ).filter(ApplicationModel.id.in_([hit["application_id"] for hit in hits])).all()
+    }
+    results = []
+    for hit in hits:
+        app = applications.get(hit["application_id"])
+        if not app:
+            continue
+        results.append({
+            **hit,
+            "job_title": app.job.title,
+            "applicant_name": f"{app.applicant.first_name or ''} {app.applicant.last_name or ''}".strip() or (app.applicant.username or ""),
+        })
+    return results
+
+
 @router.get("/job/{job_id}", response_model=List[Application])
 async def get_job_applications(
     job_id: int,
+    skills: Optional[str] = Query(None, description="Comma-separated skills the applicant must all have"),
     current_user: User = Depends(require_roles([UserRole.EMPLOYER, UserRole.INDIVIDUAL])),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get applications for a specific job (only by job poster)
+    Optionally filtered by skills extracted from profiles, resumes and cover letters
     """
     # Verify the job belongs to current user
     from app.crud import get_job
@@ -93,13 +159,50 @@ async def get_job_applications(
             detail="You can only view applications for your own jobs"
         )
     
-    applications = get_applications_by_job(db, job_id)
+    applications = get_applications_by_job(db, job_id, skills=parse_skill_filter(skills))
     return applications
 
 
-@router.get("/job/{job_id}/ranked", response_model=List[RankedApplication])
+@router.get("/job/{job_id}/skills", response_model=List[SkillFacet], dependencies=[Depends(rate_limit("search"))])
+async def get_job_applicant_skills(
+    job_id: int,
+    skills: Optional[str] = Query(None, description="Only count applicants having all of these skills"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(require_roles([UserRole.EMPLOYER, UserRole.INDIVIDUAL])),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Skill facet counts for a job's applicants (only by job poster)
+    """
+    from app.crud import get_job
+    job = get_job(db, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    if job.poster_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only view applications for your own jobs"
+        )
+    
+    facets = get_job_skill_facets(db, job_id, skills=parse_skill_filter(skills), limit=limit)
+    return [{"skill": skill, "count": count} for skill, count in facets]
+
+
+@router.get("/job/{job_id}/ranked", response_model=List[RankedApplication], dependencies=[Depends(rate_limit("ranked"))])
 async def get_ranked_job_applications(
     job_id: int,
+    response: Response,
+    sort: str = Query("score_desc", pattern="^(score_desc|score_asc|recent)$"),
+    recommendation: Optional[str] = Query(None, description="Comma-separated: hire,interview,maybe,pass,review"),
+    min_score: Optional[int] = Query(None, ge=0, le=100),
+    max_score: Optional[int] = Query(None, ge=0, le=100),
+    page: int = Query(1, ge=1),
+    limit: int = Query(100, ge=1, le=500),
+    refresh: bool = Query(False, description="Re-analyze every application"),
     current_user: User = Depends(require_roles([UserRole.EMPLOYER, UserRole.INDIVIDUAL])),
     db: Session = Depends(get_db)
 ):
@@ -109,6 +212,16 @@ async def get_ranked_job_applications(
     - Cover letter quality
     - Application completeness  
     - Overall fit for the role
+    
+    Analyses are persisted in application_analyses (most are scored in the background
+    at apply time); only applications that are new or whose inputs changed since their
+    last analysis are sent to the model, and the response is a sorted, filtered query
+    over the stored rows. Rank and percentile are normalized across the whole pool:
+    the model scores each applicant independently on an absolute rubric, so scores
+    from different calls are comparable.
+    
+    Per-stage timings of the ranking task (when one runs) are returned in the
+    Server-Timing header and the full trace is available under /metrics (METRICS_TOKEN) by X-Ranking-Task-Id
     """
     # Verify the job belongs to current user
     from app.crud import get_job
@@ -125,27 +238,65 @@ async def get_ranked_job_applications(
             detail="You can only view applications for your own jobs"
         )
     
-    # Get all applications for this job
-    applications = get_applications_by_job(db, job_id)
-    
-    if not applications:
-        return []
-    
-    # Use AI to analyze and rank applicants
+    # Analyze applications that have no up-to-date stored analysis; concurrent
+    # requests for the same job wait for one run instead of starting their own
     try:
-        ranked_results = ai_analyzer.analyze_applicants(
-            applications=applications,
-            job_title=job.title,
-            job_description=job.description,
-            job_requirements=job.requirements
+        trace = await ranking_flight.do_async(
+            f"{job_id}:{'refresh' if refresh else 'stale'}",
+            lambda: _analyze_job_applications(job_id, refresh)
         )
-        return ranked_results
     except Exception as e:
         logger.error(f"AI ranking failed: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to analyze applications with AI"
         )
+    if trace:
+        response.headers["X-Ranking-Task-Id"] = trace.task_id
+        if trace.stages:
+            response.headers["Server-Timing"] = trace.server_timing()
+        # Start a new read transaction that sees the analyses just stored
+        db.commit()
+    
+    recommendations = [r.strip() for r in recommendation.split(",") if r.strip()] if recommendation else None
+    analyses = get_ranked_analyses(
+        db,
+        job_id,
+        recommendations=recommendations,
+        min_score=min_score,
+        max_score=max_score,
+        sort=sort,
+        skip=(page - 1) * limit,
+        limit=limit
+    )
+    
+    # Cross-applicant normalization over every analyzed applicant of the job
+    scores = get_job_score_distribution(db, job_id)
+    return [
+        {
+            "application": analysis.application,
+            "ai_analysis": analysis,
+            "rank": len(scores) - bisect_right(scores, analysis.overall_score) + 1,
+            "percentile": round(100 * bisect_left(scores, analysis.overall_score) / len(scores), 1),
+        }
+        for analysis in analyses
+    ]
+
+
+def _analyze_job_applications(job_id: int, refresh: bool) -> Optional[RankingTrace]:
+    """Analyze a job's new or changed applications (all of them on refresh); runs in a worker thread"""
+    db = SessionLocal()
+    try:
+        job = get_job(db, job_id)
+        applications = get_applications_by_job(db, job_id)
+        pending = applications if refresh else stale_applications(db, job, applications)
+        if not pending:
+            return None
+        trace = RankingTrace(job_id=job_id)
+        analyze_and_store(db, job, pending, trace)
+        return trace
+    finally:
+        db.close()
 
 
 @router.put("/{application_id}", response_model=Application)
@@ -232,7 +383,7 @@ async def update_application_status(
 async def get_application_detail(
     application_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get application details (only by applicant or job poster)
@@ -254,7 +405,7 @@ async def get_application_detail(
     return application
 
 
-@router.get("/resume-url/{application_id}")
+@router.get("/resume-url/{application_id}", dependencies=[Depends(rate_limit("resume-urls"))])
 async def get_resume_signed_url(
     application_id: int,
     current_user: User = Depends(get_current_user),
@@ -262,7 +413,7 @@ async def get_resume_signed_url(
 ):
     """
     Generate a signed URL for viewing/downloading a resume
-    Returns a temporary signed URL valid for 1 hour
+    Returns a temporary signed URL valid for at least 15 minutes (up to 1 hour)
     """
     # Get the application
     application = get_application(db, application_id)
@@ -286,8 +437,8 @@ async def get_resume_signed_url(
             detail="No resume uploaded for this application"
         )
     
-    # Check if GCP Storage is initialized
-    if not gcp_storage.client or not gcp_storage.bucket:
+    # Check if file storage is initialized
+    if not file_storage.available:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Resume storage is not available. Please contact support."
@@ -295,7 +446,7 @@ async def get_resume_signed_url(
     
     # Generate signed URL (valid for 1 hour)
     try:
-        signed_url = gcp_storage.generate_signed_url(application.resume_url, expiration_minutes=60)
+        signed_url = await file_storage.signed_url(application.resume_url, expiration_minutes=60)
         
         if not signed_url:
             raise HTTPException(
@@ -304,6 +455,8 @@ async def get_resume_signed_url(
             )
         
         return {"url": signed_url}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating signed URL: {e}")
         raise HTTPException(
@@ -312,14 +465,47 @@ async def get_resume_signed_url(
         )
 
 
-@router.post("/upload-resume/")
+@router.post("/resume-urls", response_model=ResumeUrlBatch, dependencies=[Depends(rate_limit("resume-urls"))])
+async def get_resume_signed_urls(
+    request: ResumeUrlBatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Signed resume URLs for a page of applications in one call
+    Applications the user can't view or without a resume are left out
+    """
+    if not file_storage.available:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Resume storage is not available. Please contact support."
+        )
+    
+    applications = db.query(ApplicationModel).options(joinedload(ApplicationModel.job)).filter(
+        ApplicationModel.id.in_(request.application_ids),
+        ApplicationModel.resume_url.isnot(None)
+    ).all()
+    allowed = [
+        app for app in applications
+        if app.applicant_id == current_user.id or app.job.poster_id == current_user.id
+    ]
+    
+    signed_urls = await file_storage.signed_urls(app.resume_url for app in allowed)
+    return {
+        "urls": {
+            app.id: signed_urls[app.resume_url] for app in allowed if app.resume_url in signed_urls
+        }
+    }
+
+
+@router.post("/upload-resume/", dependencies=[Depends(rate_limit("upload"))])
 async def upload_resume(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
 ):
     """
-    Upload resume file to GCP Storage
-    Returns the blob path (not a URL)
+    Upload resume file to storage
+    Returns the storage key (not a URL)
     """
     # Validate file type
     allowed_types = ["application/pdf", "application/msword", 
@@ -330,22 +516,9 @@ async def upload_resume(
             detail="Only PDF and Word documents are allowed"
         )
     
-    # Validate file size (max 10MB)
-    contents = await file.read()
-    if len(contents) > 10 * 1024 * 1024:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File size must be less than 10MB"
-        )
-    
-    # Upload to GCP
+    # Validate size (max 10MB) while hashing in chunks, then stream to storage
     try:
-        resume_url = gcp_storage.upload_file(
-            file_content=contents,
-            filename=file.filename,
-            content_type=file.content_type,
-            folder="resumes"
-        )
+        resume_url = await file_storage.save_upload(file, folder="resumes", max_size=10 * 1024 * 1024)
         
         if not resume_url:
             raise HTTPException(
@@ -355,6 +528,8 @@ async def upload_resume(
         
         return {"resume_url": resume_url}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Resume upload failed: {e}")
         raise HTTPException(
@@ -1,12 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.auth import verify_telegram_webapp_data, create_access_token, get_current_user
-from app.schemas import TelegramAuth, User, UserCreate, UserRole, UserUpdate
-from app.crud import get_user_by_telegram_id, create_user, update_user_by_object
-from datetime import timedelta
+from app.auth import (
+    verify_telegram_webapp_data, create_user_access_token, get_current_user,
+    issue_refresh_token, login_refresh_token, rotate_refresh_token, revoke_refresh_token
+)
+from app.schemas import TelegramAuth, RefreshTokenRequest, TokenRefresh, TelegramUserUpdate, User, UserCreate, UserRole, UserUpdate
+from app.crud import get_user_by_telegram_id, create_user, update_user_by_object, revoke_user_refresh_tokens
+from typing import Optional
 from app.config import settings
-from app.storage import gcp_storage
+from app.rate_limit import rate_limit
+from app.storage import file_storage
+from app.images import image_variant_urls
+from app.image_worker import image_processor
+from app.avatars import avatar_fetcher
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,7 +21,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.post("/telegram", response_model=dict)
+@router.post("/telegram", response_model=dict, dependencies=[Depends(rate_limit("auth"))])
 async def auto_login_telegram(
     telegram_auth: TelegramAuth,
     db: Session = Depends(get_db)
@@ -22,6 +29,7 @@ async def auto_login_telegram(
     """
     Automatically authenticate user with Telegram WebApp initData
     Creates new user if doesn't exist, updates existing user with latest data
+    Clients send their refresh token to get it back instead of a new one
     """
     try:
         # Verify Telegram WebApp data
@@ -52,7 +60,7 @@ async def auto_login_telegram(
             user = create_user(db, user_create)
         else:
             # Update existing user with latest Telegram data
-            user_update = UserUpdate(
+            user_update = TelegramUserUpdate(
                 username=user_data.get("username"),
                 first_name=user_data.get("first_name"),
                 last_name=user_data.get("last_name"),
@@ -62,15 +70,18 @@ async def auto_login_telegram(
             )
             user = update_user_by_object(db, user, user_update)
         
-        # Create access token
-        access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": str(user.id)}, expires_delta=access_token_expires
-        )
+        # Copy a new or changed Telegram photo into storage in the background
+        avatar_fetcher.refresh(user)
+        
+        # Create access token; keep the client's refresh token while it is live
+        access_token = create_user_access_token(user)
+        refresh_token = login_refresh_token(db, user.id, telegram_auth.refresh_token)
         
         return {
             "access_token": access_token,
+            "refresh_token": refresh_token,
             "token_type": "bearer",
+            "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
             "user": {
                 "id": user.id,
                 "telegram_id": user.telegram_id,
@@ -78,6 +89,7 @@ async def auto_login_telegram(
                 "first_name": user.first_name,
                 "last_name": user.last_name,
                 "photo_url": user.photo_url,
+                "avatar_variants": image_variant_urls(user.avatar_url),
                 "language_code": user.language_code,
                 "is_premium": user.is_premium,
                 "role": user.role,
@@ -102,15 +114,15 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
 
 
-@router.post("/upload-profile-picture/")
+@router.post("/upload-profile-picture/", dependencies=[Depends(rate_limit("upload"))])
 async def upload_profile_picture(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Upload profile picture to GCP Storage
-    Returns the public URL of the uploaded file
+    Upload profile picture to storage
+    Returns its storage key and the URLs of its resized variants
     """
     # Validate file type (images only)
     allowed_types = ["image/jpeg", "image/jpg", "image/png", "image/webp", "image/gif"]
@@ -120,22 +132,9 @@ async def upload_profile_picture(
             detail="Only image files (JPEG, PNG, WebP, GIF) are allowed"
         )
     
-    # Validate file size (max 5MB)
-    contents = await file.read()
-    if len(contents) > 5 * 1024 * 1024:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File size must be less than 5MB"
-        )
-    
-    # Upload to GCP
+    # Validate size (max 5MB) while hashing in chunks, then stream to storage
     try:
-        picture_url = gcp_storage.upload_file(
-            file_content=contents,
-            filename=file.filename,
-            content_type=file.content_type,
-            folder="profile-pictures"
-        )
+        picture_url = await file_storage.save_upload(file, folder="profile-pictures", max_size=5 * 1024 * 1024)
         
         if not picture_url:
             raise HTTPException(
@@ -147,7 +146,10 @@ async def upload_profile_picture(
         user_update = UserUpdate(profile_picture_url=picture_url)
         updated_user = update_user_by_object(db, current_user, user_update)
         
-        return {"profile_picture_url": picture_url}
+        # Render thumb/card/full variants in the background
+        image_processor.enqueue(picture_url)
+        
+        return {"profile_picture_url": picture_url, "variants": image_variant_urls(picture_url)}
         
     except HTTPException:
         raise
@@ -159,14 +161,50 @@ async def upload_profile_picture(
         )
 
 
+@router.post("/refresh", response_model=TokenRefresh, dependencies=[Depends(rate_limit("auth"))])
+async def refresh_access_token(
+    request: RefreshTokenRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Exchange a refresh token for a new access token and a new refresh token
+    The refresh token sent is no longer valid afterwards
+    """
+    user, refresh_token = rotate_refresh_token(db, request.refresh_token)
+    return TokenRefresh(
+        access_token=create_user_access_token(user),
+        refresh_token=refresh_token,
+        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    )
+
+
 @router.post("/logout")
-async def logout():
+async def logout(
+    request: Optional[RefreshTokenRequest] = None,
+    db: Session = Depends(get_db)
+):
     """
-    Logout endpoint (client should discard the token)
+    Logout endpoint (client should discard the access token)
+    Revokes the session's refresh token when it is sent
     """
+    if request:
+        revoke_refresh_token(db, request.refresh_token)
     return {"message": "Successfully logged out"}
 
 
+@router.post("/logout-all")
+async def logout_all(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Revoke every refresh token of the current user (all devices)
+    Access tokens already issued stay valid until they expire
+    """
+    revoke_user_refresh_tokens(db, current_user.id)
+    return {"message": "Logged out of all sessions"}
+
+
 @router.post("/dev-login", response_model=dict)
 async def dev_login(db: Session = Depends(get_db)):
     """
@@ -197,14 +235,14 @@ async def dev_login(db: Session = Depends(get_db)):
         user = create_user(db, user_create)
     
     # Create access token
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
-    )
+    access_token = create_user_access_token(user)
+    refresh_token = issue_refresh_token(db, user.id)
     
     return {
         "access_token": access_token,
+        "refresh_token": refresh_token,
         "token_type": "bearer",
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
         "user": {
             "id": user.id,
             "telegram_id": user.telegram_id,
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import RedirectResponse
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.crud import get_user
+from app.avatars import avatar_fetcher, is_telegram_photo_url
+from app.images import VARIANTS, variant_key
+
+router = APIRouter()
+
+# The redirect target changes when the user's photo does; the target itself is immutable
+AVATAR_REDIRECT_CACHE_CONTROL = "public, max-age=300"
+# Telegram's URL, used until our copy is stored
+PENDING_AVATAR_CACHE_CONTROL = "public, max-age=60"
+
+
+@router.get("/{user_id}")
+async def get_avatar(
+    user_id: int,
+    variant: str = Query("thumb"),
+    db: Session = Depends(get_db)
+):
+    """
+    Redirect to a user's avatar: the stored copy of their Telegram photo
+    Clients that have the user object should use its avatar_variants URLs directly
+    """
+    if variant not in VARIANTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown variant, expected one of: {', '.join(VARIANTS)}"
+        )
+
+    user = get_user(db, user_id)
+    if not user or not user.photo_url:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Avatar not found"
+        )
+
+    # Fetched on first request for users who haven't logged in since avatars were cached
+    avatar_fetcher.refresh(user)
+
+    if user.avatar_url:
+        return RedirectResponse(
+            f"/uploads/{variant_key(user.avatar_url, variant)}",
+            headers={"Cache-Control": AVATAR_REDIRECT_CACHE_CONTROL}
+        )
+    if not is_telegram_photo_url(user.photo_url):
+        # Never redirect off Telegram's hosts (rows written before photo_url was login-only)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Avatar not found"
+        )
+    return RedirectResponse(user.photo_url, headers={"Cache-Control": PENDING_AVATAR_CACHE_CONTROL})
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
+from app.read_replica import get_read_db, open_read_session, read_target
 from app.auth import get_current_user, require_roles
 from app.models import User, UserRole
 from app.schemas import Job, JobCreate, JobUpdate, JobSearch
@@ -10,12 +11,18 @@ from app.crud import (
     update_job, delete_job, get_application_count_by_job
 )
 from app.utils import format_salary
+from app.singleflight import create_single_flight
+import json
 
 router = APIRouter()
 
+# Identical feed queries in flight at once (e.g. the first page after a deploy) share one run
+feed_flight = create_single_flight("job_feed")
+
 
 @router.get("/", response_model=List[Job])
 async def get_jobs_list(
+    request: Request,
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
     query: Optional[str] = Query(None),
@@ -23,8 +30,7 @@ async def get_jobs_list(
     is_remote: Optional[bool] = Query(None),
     salary_min: Optional[float] = Query(None),
     salary_max: Optional[float] = Query(None),
-    tags: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    tags: Optional[str] = Query(None)
 ):
     """
     Get list of active jobs with optional filtering
@@ -45,19 +51,36 @@ async def get_jobs_list(
         tags=tags_list
     )
     
-    jobs = get_jobs(db, skip=skip, limit=limit, search=search_params)
-    
-    # Add applications count to each job
-    for job in jobs:
-        job.applications_count = get_application_count_by_job(db, job.id)
-    
-    return jobs
+    # Callers who just wrote read from the primary and must not share a replica result
+    target = read_target(request)
+    fingerprint = json.dumps([target, skip, limit, search_params.model_dump()], sort_keys=True, default=str)
+    return await feed_flight.do_async(
+        fingerprint,
+        lambda: _load_job_feed(skip, limit, search_params, target),
+        encode=lambda jobs: json.dumps([job.model_dump(mode="json") for job in jobs]),
+        decode=lambda data: [Job.model_validate(job) for job in json.loads(data)]
+    )
+
+
+def _load_job_feed(skip: int, limit: int, search_params: JobSearch, target: str) -> List[Job]:
+    """A feed page as response models, so it can be shared by concurrent requests"""
+    db = open_read_session(target)
+    try:
+        jobs = get_jobs(db, skip=skip, limit=limit, search=search_params)
+        
+        # Add applications count to each job
+        for job in jobs:
+            job.applications_count = get_application_count_by_job(db, job.id)
+        
+        return [Job.model_validate(job) for job in jobs]
+    finally:
+        db.close()
 
 
 @router.get("/{job_id}", response_model=Job)
 async def get_job_detail(
     job_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get job details by ID
@@ -106,7 +129,7 @@ async def create_new_job(
 @router.get("/my-jobs/", response_model=List[Job])
 async def get_my_jobs(
     current_user: User = Depends(require_roles([UserRole.EMPLOYER, UserRole.INDIVIDUAL])),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get jobs posted by current user
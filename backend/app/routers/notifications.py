@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
 from app.auth import get_current_user
+from app.read_replica import get_read_db
+from app.rate_limit import rate_limit
 from app.models import User
 from app.schemas import Notification
 from app.crud import (
@@ -12,12 +14,12 @@ from app.crud import (
 router = APIRouter()
 
 
-@router.get("/", response_model=List[Notification])
+@router.get("/", response_model=List[Notification], dependencies=[Depends(rate_limit("notifications"))])
 async def get_my_notifications(
     skip: int = 0,
     limit: int = 20,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get user notifications
@@ -26,10 +28,10 @@ async def get_my_notifications(
     return notifications
 
 
-@router.get("/unread-count")
+@router.get("/unread-count", dependencies=[Depends(rate_limit("unread-count"))])
 async def get_unread_notifications_count(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get count of unread notifications
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.auth import get_current_user, require_role
+from app.rate_limit import rate_limit
 from app.models import User, UserRole
 from app.schemas import (
     User, UserUpdate, Company, CompanyCreate, CompanyUpdate,
@@ -9,9 +10,13 @@ from app.schemas import (
 )
 from app.crud import (
     update_user, get_company_by_owner, create_company, update_company,
-    get_job_seeker_profile, create_job_seeker_profile, update_job_seeker_profile
+    get_job_seeker_profile, create_job_seeker_profile, update_job_seeker_profile,
+    count_file_references, update_company_logo, update_job_seeker_cv
 )
-from app.utils import save_upload_file, validate_file_type, delete_file
+from app.storage import file_storage
+from app.images import image_variant_urls
+from app.image_worker import image_processor
+from app.utils import validate_file_type
 from typing import Optional
 
 router = APIRouter()
@@ -95,7 +100,7 @@ async def update_company_profile(
     )
 
 
-@router.post("/company/logo")
+@router.post("/company/logo", dependencies=[Depends(rate_limit("upload"))])
 async def upload_company_logo(
     file: UploadFile = File(...),
     current_user: User = Depends(require_role(UserRole.EMPLOYER)),
@@ -120,22 +125,34 @@ async def upload_company_logo(
             detail="Company profile not found"
         )
     
-    # Delete old logo if exists
-    if company.logo_url:
-        delete_file(company.logo_url)
-    
     # Save new logo
-    file_path = await save_upload_file(file, "company_logos")
+    old_logo = company.logo_url
+    file_path = await file_storage.save_upload(file, "company_logos")
+    if not file_path:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to upload file to storage"
+        )
     
     # Update company with new logo URL
-    company_update = CompanyUpdate(logo_url=file_path)
-    updated_company = update_company(db, company.id, company_update)
+    update_company_logo(db, company, file_path)
+    
+    # Render thumb/card/full variants in the background
+    image_processor.enqueue(file_path)
+    
+    # Delete old logo unless someone else uploaded the same file
+    if old_logo and old_logo != file_path and not count_file_references(db, old_logo):
+        await file_storage.delete(old_logo)
     
-    return {"message": "Logo uploaded successfully", "logo_url": f"/uploads/{file_path}"}
+    return {
+        "message": "Logo uploaded successfully",
+        "logo_url": f"/uploads/{file_path}",
+        "variants": image_variant_urls(file_path)
+    }
 
 
 @router.get("/job-seeker", response_model=Optional[JobSeekerProfile])
-async def get_job_seeker_profile(
+async def get_my_job_seeker_profile(
     current_user: User = Depends(require_role(UserRole.JOB_SEEKER)),
     db: Session = Depends(get_db)
 ):
@@ -147,7 +164,7 @@ async def get_job_seeker_profile(
 
 
 @router.post("/job-seeker", response_model=JobSeekerProfile)
-async def create_job_seeker_profile(
+async def create_my_job_seeker_profile(
     profile: JobSeekerProfileCreate,
     current_user: User = Depends(require_role(UserRole.JOB_SEEKER)),
     db: Session = Depends(get_db)
@@ -168,7 +185,7 @@ async def create_job_seeker_profile(
 
 
 @router.put("/job-seeker", response_model=JobSeekerProfile)
-async def update_job_seeker_profile(
+async def update_my_job_seeker_profile(
     profile_update: JobSeekerProfileUpdate,
     current_user: User = Depends(require_role(UserRole.JOB_SEEKER)),
     db: Session = Depends(get_db)
@@ -186,7 +203,7 @@ async def update_job_seeker_profile(
     )
 
 
-@router.post("/job-seeker/cv")
+@router.post("/job-seeker/cv", dependencies=[Depends(rate_limit("upload"))])
 async def upload_cv(
     file: UploadFile = File(...),
     current_user: User = Depends(require_role(UserRole.JOB_SEEKER)),
@@ -210,15 +227,20 @@ async def upload_cv(
         basic_profile = JobSeekerProfileCreate()
         profile = create_job_seeker_profile(db, basic_profile, current_user.id)
     
-    # Delete old CV if exists
-    if profile.cv_url:
-        delete_file(profile.cv_url)
-    
     # Save new CV
-    file_path = await save_upload_file(file, "cvs")
+    old_cv = profile.cv_url
+    file_path = await file_storage.save_upload(file, "cvs")
+    if not file_path:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to upload file to storage"
+        )
     
     # Update profile with new CV URL
-    profile_update = JobSeekerProfileUpdate(cv_url=file_path)
-    updated_profile = update_job_seeker_profile(db, current_user.id, profile_update)
+    update_job_seeker_cv(db, profile, file_path)
+    
+    # Delete old CV unless it is still referenced (e.g. attached to applications)
+    if old_cv and old_cv != file_path and not count_file_references(db, old_cv):
+        await file_storage.delete(old_cv)
     
     return {"message": "CV uploaded successfully", "cv_url": f"/uploads/{file_path}"}
@@ -0,0 +1,151 @@
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from typing import Optional, Tuple
+from app.images import variant_source_key
+from app.storage import file_storage, content_hash_from_path, verify_upload_signature
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import time
+
+router = APIRouter()
+
+# Folders readable without a signed URL. Logos and CVs have always been public under /uploads.
+# Profile pictures and avatars are shown to other users on profiles and applicant lists, the
+# way Telegram's own photo_url is; their keys are unguessable content hashes, and their
+# variant URLs (schemas.image_variant_urls) are built without a request to sign them for.
+PUBLIC_FOLDERS = ("company_logos/", "cvs/", "profile-pictures/", "avatars/")
+
+# Stored files never change: keys are content hashes (or uuids for older uploads)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# An original served in place of a variant that is still being rendered
+PENDING_VARIANT_CACHE_CONTROL = "public, max-age=60"
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+mimetypes.add_type("image/webp", ".webp")
+
+
+def _etag(key: str) -> str:
+    """Strong ETag for a key; keys are never rewritten, so the key identifies the content"""
+    content_hash = content_hash_from_path(key)
+    if content_hash and not variant_source_key(key):
+        return f'"{content_hash}"'
+    return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Single byte range as (start, end exclusive), or None to send the whole file
+    Raises 416 when the range starts past the end of the file
+    """
+    match = _RANGE_PATTERN.match(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == "":
+        # Absent, malformed or multi-range: a full response is always acceptable
+        return None
+
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size
+    else:
+        start = int(first)
+        end = min(int(last) + 1, size) if last else size
+    if start >= size or start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+
+def _normalize_key(key: str) -> str:
+    """
+    Storage key of a request path, or 404 for anything but plain relative
+    segments: the access checks below and the backends both see this key,
+    so "cvs/../resumes/..." can't pass as a public file
+    """
+    if key.startswith("/") or any(part in ("", ".", "..") for part in key.split("/")):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+    return posixpath.normpath(key)
+
+
+@router.get("/{key:path}")
+async def get_upload(
+    key: str,
+    request: Request,
+    expires: Optional[int] = None,
+    signature: Optional[str] = None
+):
+    """
+    Serve a stored file from any storage backend, with validators, long-lived
+    cache headers and byte ranges
+    Private files (resumes, ...) need the expires/signature of a signed URL
+    """
+    key = _normalize_key(key)
+    private = not key.startswith(PUBLIC_FOLDERS)
+    if private:
+        if expires is None or not signature or not verify_upload_signature(key, expires, signature):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Invalid or expired file link"
+            )
+
+    cache_control = IMMUTABLE_CACHE_CONTROL
+    # Older uploads may only exist in the backend's fallback (UPLOAD_DIR)
+    storage, size = await file_storage.locate(key)
+    if size is None:
+        # Image variants are rendered in the background; serve the original meanwhile
+        source_key = variant_source_key(key)
+        if source_key:
+            storage, size = await file_storage.locate(source_key)
+        if size is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="File not found"
+            )
+        key = source_key
+        cache_control = PENDING_VARIANT_CACHE_CONTROL
+    if private:
+        # Keep resumes out of shared caches; the browser may reuse them until the link expires
+        cache_control = f"private, max-age={max(int(expires - time.time()), 0)}"
+
+    etag = _etag(key)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    media_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+    byte_range = _parse_range(request.headers.get("range"), size)
+    if byte_range and request.headers.get("if-range", etag) != etag:
+        # The client's partial copy is of another version: send everything
+        byte_range = None
+
+    if byte_range:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+        headers["Content-Length"] = str(end - start)
+        return StreamingResponse(
+            storage.stream(key, start=start, end=end),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=media_type,
+            headers=headers
+        )
+
+    local_path = storage.local_path(key)
+    if local_path:
+        # FileResponse uses the server's sendfile/pathsend extension where available
+        return FileResponse(local_path, media_type=media_type, headers=headers)
+
+    headers["Content-Length"] = str(size)
+    headers["Content-Disposition"] = f'inline; filename="{os.path.basename(key)}"'
+    return StreamingResponse(storage.stream(key), media_type=media_type, headers=headers)
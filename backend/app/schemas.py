@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+import json
+from pydantic import BaseModel, Field, computed_field, field_validator
+from typing import Optional, List, Dict
 from datetime import datetime
 from app.models import UserRole, JobStatus, ApplicationStatus
+from app.images import image_variant_urls
 
 
 # User Schemas
@@ -27,7 +29,6 @@ class UserUpdate(BaseModel):
     username: Optional[str] = None
     first_name: Optional[str] = None
     last_name: Optional[str] = None
-    photo_url: Optional[str] = None
     profile_picture_url: Optional[str] = None
     phone: Optional[str] = None
     email: Optional[str] = None
@@ -36,11 +37,27 @@ class UserUpdate(BaseModel):
     role: Optional[UserRole] = None
 
 
+class TelegramUserUpdate(UserUpdate):
+    """Data from a verified Telegram login; photo_url is only ever set from here (see avatars)"""
+    photo_url: Optional[str] = None
+
+
 class User(UserBase):
     id: int
+    avatar_url: Optional[str] = None  # Cached copy of photo_url, see avatars
     created_at: datetime
     updated_at: Optional[datetime] = None
     
+    @computed_field
+    @property
+    def profile_picture_variants(self) -> Optional[Dict[str, str]]:
+        return image_variant_urls(self.profile_picture_url)
+    
+    @computed_field
+    @property
+    def avatar_variants(self) -> Optional[Dict[str, str]]:
+        return image_variant_urls(self.avatar_url)
+    
     class Config:
         from_attributes = True
 
@@ -69,6 +86,11 @@ class Company(CompanyBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     
+    @computed_field
+    @property
+    def logo_variants(self) -> Optional[Dict[str, str]]:
+        return image_variant_urls(self.logo_url)
+    
     class Config:
         from_attributes = True
 
@@ -239,6 +261,18 @@ class TelegramWebAppData(BaseModel):
 
 class TelegramAuth(BaseModel):
     init_data: str
+    refresh_token: Optional[str] = None  # The client's current one, returned again while still live
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+
+class TokenRefresh(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int  # Access token lifetime in seconds
 
 
 # AI Analysis Schemas
@@ -252,11 +286,51 @@ class AIAnalysis(BaseModel):
     strengths: List[str]
     concerns: List[str]
     recommendation: str
+    
+    @field_validator("strengths", "concerns", mode="before")
+    @classmethod
+    def parse_json_list(cls, value):
+        # Persisted analyses store lists as JSON strings
+        if isinstance(value, str):
+            return json.loads(value) if value else []
+        return value
+    
+    class Config:
+        from_attributes = True
+
+
+class ResumeUrlBatchRequest(BaseModel):
+    application_ids: List[int] = Field(..., min_length=1, max_length=100)
+
+
+class ResumeUrlBatch(BaseModel):
+    # application_id -> signed URL; applications without an accessible resume are left out
+    urls: Dict[int, str]
+
+
+class SkillFacet(BaseModel):
+    skill: str
+    count: int
+
+
+class ApplicationSearchHit(BaseModel):
+    application_id: int
+    job_id: int
+    job_title: str
+    applicant_name: str
+    score: float
+    # Matching excerpts with matches wrapped in ** markers
+    cover_letter_snippet: Optional[str] = None
+    resume_snippet: Optional[str] = None
 
 
 class RankedApplication(BaseModel):
     application: Application
     ai_analysis: AIAnalysis
+    # Position among all analyzed applicants of the job (1 = best)
+    rank: Optional[int] = None
+    # Share of the job's analyzed applicants scoring below this one (0-100)
+    percentile: Optional[float] = None
     
     class Config:
         from_attributes = True
@@ -0,0 +1,197 @@
+"""
+Background processing of new applications: skill and full-text indexing, AI scoring
+
+Each application is analyzed individually right after it is submitted, so
+the employer's ranked view is mostly precomputed and LLM load is spread over
+time instead of spiking when a popular job is opened.
+
+Indexing must not be lost with the queue: applications.indexed_at is set once
+both indexes are written, and a periodic sweep re-enqueues applications that
+are still unindexed (queue was full, process restarted, indexing failed).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+from app.config import settings
+from app.crud import get_unindexed_application_ids, mark_application_indexed
+from app.database import SessionLocal
+from app.metrics import RankingTrace, metrics
+from app.models import Application, ApplicationAnalysis
+from app.ranking import analyze_and_store, stale_applications
+from app.skills import index_application_skills
+from app.search import index_application_document
+from app.ai_service import ResumeExtractor
+
+logger = logging.getLogger(__name__)
+
+
+class ScoringWorker:
+    """Bounded thread pool that indexes and scores applications one at a time"""
+
+    def __init__(self, max_workers: int, max_queued: int, budget_per_job: int):
+        self.max_workers = max_workers
+        self.budget_per_job = budget_per_job
+        self._executor = ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix="ai-scoring")
+        self._slots = threading.BoundedSemaphore(max_queued)
+        self._lock = threading.Lock()
+        self._queued = set()
+        self._running = 0
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+
+    def enqueue(self, application_id: int) -> bool:
+        """
+        Schedule indexing and scoring of an application. Returns False when the queue
+        is full, the application is already queued or the worker is shut down; it will
+        then be indexed by the sweep and scored on demand.
+        """
+        with self._lock:
+            if application_id in self._queued:
+                return False
+            if not self._slots.acquire(blocking=False):
+                metrics.inc("ai_eager_scoring_total", outcome="queue_full")
+                return False
+            self._queued.add(application_id)
+
+        try:
+            self._executor.submit(self._run, application_id)
+        except RuntimeError:
+            # Shutting down: the application is committed, don't fail the request
+            with self._lock:
+                self._queued.discard(application_id)
+            self._slots.release()
+            metrics.inc("ai_eager_scoring_total", outcome="shutdown")
+            return False
+        return True
+
+    def _run(self, application_id: int):
+        with self._lock:
+            self._running += 1
+        db = SessionLocal()
+        try:
+            application = db.query(Application).filter(Application.id == application_id).first()
+            if application:
+                self._index(db, application)
+                if settings.AI_EAGER_SCORING:
+                    metrics.inc("ai_eager_scoring_total", outcome=self._score(db, application))
+        finally:
+            db.close()
+            with self._lock:
+                self._running -= 1
+                self._queued.discard(application_id)
+            self._slots.release()
+
+    def _index(self, db, application: Application):
+        """Extract the resume once and feed it to the skill and full-text indexes"""
+        resume_text = None
+        if application.resume_url:
+            resume_text = ResumeExtractor.extract_resume_content(application.resume_url) or ""
+
+        indexed = True
+        try:
+            index_application_skills(db, application, resume_text=resume_text)
+            metrics.inc("application_skills_indexed_total", outcome="ok")
+        except Exception as e:
+            db.rollback()
+            indexed = False
+            logger.error(f"Skill indexing of application {application.id} failed: {e}")
+            metrics.inc("application_skills_indexed_total", outcome="error")
+
+        try:
+            index_application_document(
+                db,
+                application_id=application.id,
+                job_id=application.job_id,
+                poster_id=application.job.poster_id,
+                cover_letter=application.cover_letter,
+                resume_text=resume_text
+            )
+            if indexed:
+                # Otherwise the sweep retries it
+                mark_application_indexed(db, application.id)
+            db.commit()
+            metrics.inc("application_search_indexed_total", outcome="ok")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Search indexing of application {application.id} failed: {e}")
+            metrics.inc("application_search_indexed_total", outcome="error")
+
+    def sweep(self, min_age_seconds: float, limit: int = 100) -> int:
+        """Enqueue applications older than `min_age_seconds` that were never indexed"""
+        db = SessionLocal()
+        try:
+            application_ids = get_unindexed_application_ids(
+                db, created_before=datetime.utcnow() - timedelta(seconds=min_age_seconds), limit=limit
+            )
+        finally:
+            db.close()
+        enqueued = sum(1 for application_id in application_ids if self.enqueue(application_id))
+        if application_ids:
+            logger.info(f"Index sweep: {len(application_ids)} unindexed applications, {enqueued} enqueued")
+            metrics.inc("application_index_sweep_enqueued_total", enqueued)
+        return enqueued
+
+    def start(self, sweep_interval_seconds: float):
+        """Sweep for unindexed applications now and every `sweep_interval_seconds`"""
+        if sweep_interval_seconds <= 0 or self._sweeper is not None:
+            return
+        self._stop.clear()
+        self._sweeper = threading.Thread(
+            target=self._sweep_loop, args=(sweep_interval_seconds,), name="index-sweep", daemon=True
+        )
+        self._sweeper.start()
+
+    def _sweep_loop(self, interval_seconds: float):
+        while True:
+            try:
+                # Younger applications are most likely still queued
+                self.sweep(min_age_seconds=interval_seconds)
+            except Exception as e:
+                logger.error(f"Index sweep failed: {e}")
+            if self._stop.wait(interval_seconds):
+                return
+
+    def _score(self, db, application: Application) -> str:
+        try:
+            job = application.job
+
+            # Budget: model-scored analyses per job; the rest are scored when the employer asks
+            spent = db.query(ApplicationAnalysis).filter(
+                ApplicationAnalysis.job_id == job.id,
+                ApplicationAnalysis.model_version != "fallback"
+            ).count()
+            if spent >= self.budget_per_job:
+                return "over_budget"
+
+            if not stale_applications(db, job, [application]):
+                return "up_to_date"
+
+            analyze_and_store(db, job, [application], RankingTrace(job_id=job.id))
+            return "scored"
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Eager scoring of application {application.id} failed: {e}")
+            return "error"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "running": self._running,
+                "queued": len(self._queued) - self._running,
+            }
+
+    def shutdown(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instance
+scoring_worker = ScoringWorker(
+    max_workers=settings.AI_SCORING_WORKERS,
+    max_queued=settings.AI_SCORING_QUEUE_SIZE,
+    budget_per_job=settings.AI_SCORING_BUDGET_PER_JOB
+)
+metrics.register_collector("ai_scoring_worker", scoring_worker.stats)
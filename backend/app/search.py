@@ -0,0 +1,208 @@
+"""
+Full-text search over applications (cover letters and extracted resume text)
+
+Backed by an incrementally maintained inverted index:
+- SQLite: an FTS5 virtual table ranked with bm25()
+- PostgreSQL: a table with a generated, weighted tsvector column and a GIN index
+
+Documents are written when an application is processed in the background
+(see scoring_worker) and removed with their job.
+"""
+import logging
+import re
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Highlight markers in snippets (plain text, safe to render without HTML escaping issues)
+HIGHLIGHT_START = "**"
+HIGHLIGHT_END = "**"
+SNIPPET_TOKENS = 16
+
+_SQLITE_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS application_search USING fts5(
+        cover_letter,
+        resume_text,
+        scope,
+        job_id UNINDEXED,
+        poster_id UNINDEXED,
+        tokenize = 'porter unicode61'
+    )
+    """,
+]
+
+_POSTGRES_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS application_search (
+        application_id INTEGER PRIMARY KEY REFERENCES applications(id) ON DELETE CASCADE,
+        job_id INTEGER NOT NULL,
+        poster_id INTEGER NOT NULL,
+        cover_letter TEXT,
+        resume_text TEXT,
+        document tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(cover_letter, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(resume_text, '')), 'B')
+        ) STORED
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_application_search_document ON application_search USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS ix_application_search_poster ON application_search (poster_id, job_id)",
+]
+
+
+def _dialect(bind) -> str:
+    return bind.dialect.name
+
+
+def ensure_search_index(engine: Engine) -> bool:
+    """Create the search index structures if missing. Returns False if unsupported."""
+    statements = _POSTGRES_SCHEMA if _dialect(engine) == "postgresql" else _SQLITE_SCHEMA
+    try:
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+        return True
+    except Exception as e:
+        logger.error(f"Full-text search index unavailable: {e}")
+        return False
+
+
+def index_application_document(
+    db: Session,
+    application_id: int,
+    job_id: int,
+    poster_id: int,
+    cover_letter: Optional[str],
+    resume_text: Optional[str]
+):
+    """Insert or replace the search document of an application (caller commits)"""
+    params = {
+        "application_id": application_id,
+        "job_id": job_id,
+        "poster_id": poster_id,
+        "cover_letter": cover_letter or "",
+        "resume_text": resume_text or "",
+    }
+    if _dialect(db.bind) == "postgresql":
+        db.execute(text("""
+            INSERT INTO application_search (application_id, job_id, poster_id, cover_letter, resume_text)
+            VALUES (:application_id, :job_id, :poster_id, :cover_letter, :resume_text)
+            ON CONFLICT (application_id) DO UPDATE SET
+                job_id = EXCLUDED.job_id,
+                poster_id = EXCLUDED.poster_id,
+                cover_letter = EXCLUDED.cover_letter,
+                resume_text = EXCLUDED.resume_text
+        """), params)
+    else:
+        params["scope"] = _scope_tokens(poster_id, job_id)
+        db.execute(text("DELETE FROM application_search WHERE rowid = :application_id"), params)
+        db.execute(text("""
+            INSERT INTO application_search (rowid, cover_letter, resume_text, scope, job_id, poster_id)
+            VALUES (:application_id, :cover_letter, :resume_text, :scope, :job_id, :poster_id)
+        """), params)
+
+
+def delete_job_documents(db: Session, job_id: int):
+    """Remove the search documents of a job's applications (caller commits)"""
+    try:
+        with db.begin_nested():
+            db.execute(text("DELETE FROM application_search WHERE job_id = :job_id"), {"job_id": job_id})
+    except Exception as e:
+        logger.error(f"Failed to remove search documents of job {job_id}: {e}")
+
+
+def _scope_tokens(poster_id: int, job_id: Optional[int] = None) -> str:
+    """
+    Owner tokens stored in the indexed `scope` column, so the poster/job
+    restriction is intersected inside the FTS index instead of filtering
+    every match of a common word afterwards
+    """
+    tokens = f"u{poster_id}"
+    if job_id is not None:
+        tokens += f" j{job_id}"
+    return tokens
+
+
+def _fts5_query(query: str, poster_id: int, job_id: Optional[int] = None) -> str:
+    """
+    Turn user input into a safe FTS5 expression: every word must match,
+    the last one as a prefix (search-as-you-type)
+    """
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return ""
+    terms = [f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*']
+    scope = " AND ".join(f'scope:"{token}"' for token in _scope_tokens(poster_id, job_id).split())
+    return f"{scope} AND ({' '.join(terms)})"
+
+
+def search_applications(
+    db: Session,
+    poster_id: int,
+    query: str,
+    job_id: Optional[int] = None,
+    limit: int = 20
+) -> List[dict]:
+    """
+    Ranked matches among applications to the poster's jobs, best first.
+    Each hit has application_id, job_id, score and highlighted snippets.
+    """
+    params = {"poster_id": poster_id, "job_id": job_id, "limit": limit}
+
+    if _dialect(db.bind) == "postgresql":
+        if not query.strip():
+            return []
+        params["query"] = query
+        # Rank on the index first, then build (expensive) headlines only for the returned rows
+        rows = db.execute(text(f"""
+            WITH matches AS (
+                SELECT application_id, job_id, cover_letter, resume_text,
+                       ts_rank_cd(document, websearch_to_tsquery('english', :query)) AS score
+                FROM application_search
+                WHERE document @@ websearch_to_tsquery('english', :query)
+                  AND poster_id = :poster_id
+                  AND (CAST(:job_id AS INTEGER) IS NULL OR job_id = :job_id)
+                ORDER BY score DESC
+                LIMIT :limit
+            )
+            SELECT application_id, job_id, score,
+                   ts_headline('english', cover_letter, websearch_to_tsquery('english', :query),
+                       'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=24, MinWords=8') AS cover_letter_snippet,
+                   ts_headline('english', resume_text, websearch_to_tsquery('english', :query),
+                       'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=24, MinWords=8') AS resume_snippet
+            FROM matches
+            ORDER BY score DESC
+        """), params).mappings().all()
+    else:
+        match = _fts5_query(query, poster_id, job_id)
+        if not match:
+            return []
+        params["match"] = match
+        # bm25() is lower-is-better; cover letters weigh more than resume text, scope not at all
+        rows = db.execute(text(f"""
+            SELECT rowid AS application_id, job_id,
+                   -bm25(application_search, 2.0, 1.0, 0.0) AS score,
+                   snippet(application_search, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', {SNIPPET_TOKENS}) AS cover_letter_snippet,
+                   snippet(application_search, 1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', {SNIPPET_TOKENS}) AS resume_snippet
+            FROM application_search
+            WHERE application_search MATCH :match
+              AND poster_id = :poster_id
+              AND (:job_id IS NULL OR job_id = :job_id)
+            ORDER BY bm25(application_search, 2.0, 1.0, 0.0)
+            LIMIT :limit
+        """), params).mappings().all()
+
+    return [
+        {
+            "application_id": int(row["application_id"]),
+            "job_id": int(row["job_id"]),
+            "score": round(float(row["score"]), 6),
+            "cover_letter_snippet": row["cover_letter_snippet"] or None,
+            "resume_snippet": row["resume_snippet"] or None,
+        }
+        for row in rows
+    ]
@@ -0,0 +1,203 @@
+"""
+Single-flight: concurrent identical calls share one computation
+
+A double-clicked ranked view or the first feed page after a deploy starts the
+same expensive work many times at once. Callers pass a fingerprint of the work;
+while a call with that key is in flight, others wait for its result instead of
+starting their own.
+
+Within a process, waiters get the leader's result (or exception). With the
+redis backend, the leader also holds a Redis lock so other worker processes
+wait for it too; they then read the result it published (when the call site
+supplies encode/decode) or run the work themselves, which is cheap once the
+leader's work is persisted (e.g. stored analyses).
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+import redis
+from fastapi.concurrency import run_in_threadpool
+from app.config import settings
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Deletes the lock only if this caller still owns it
+_RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls by key; optionally across processes through a Redis lock"""
+
+    def __init__(
+        self,
+        name: str,
+        redis_url: Optional[str] = None,
+        lock_ttl_seconds: float = 600,
+        wait_seconds: float = 300,
+        result_ttl_seconds: float = 5
+    ):
+        self.name = name
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.wait_seconds = wait_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._redis = None
+        if redis_url:
+            self._redis = redis.Redis.from_url(redis_url, socket_timeout=1, socket_connect_timeout=1)
+            self._release = self._redis.register_script(_RELEASE_LOCK)
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        encode: Optional[Callable[[Any], str]] = None,
+        decode: Optional[Callable[[str], Any]] = None
+    ) -> Any:
+        """Run fn(), or wait for the in-flight call with the same key (blocking; for worker threads)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        metrics.inc("singleflight_calls_total", flight=self.name, outcome="leader" if leader else "shared")
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._execute(key, fn, encode, decode)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def do_async(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        encode: Optional[Callable[[Any], str]] = None,
+        decode: Optional[Callable[[str], Any]] = None
+    ) -> Any:
+        """
+        Async variant for request handlers: fn runs in the threadpool. The work
+        continues if the request that started it is cancelled, for the others.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(run_in_threadpool(self._execute, key, fn, encode, decode))
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._finish_task(key, done))
+            metrics.inc("singleflight_calls_total", flight=self.name, outcome="leader")
+        else:
+            metrics.inc("singleflight_calls_total", flight=self.name, outcome="shared")
+        return await asyncio.shield(task)
+
+    def _finish_task(self, key: str, task: asyncio.Future):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter went away
+            task.exception()
+
+    def _execute(self, key: str, fn, encode, decode):
+        if self._redis is None:
+            return fn()
+
+        lock_key = f"singleflight:{self.name}:{key}"
+        result_key = f"{lock_key}:result"
+        token = uuid.uuid4().hex
+        try:
+            acquired = self._redis.set(lock_key, token, nx=True, px=int(self.lock_ttl_seconds * 1000))
+        except Exception as e:
+            logger.warning(f"Single-flight lock {lock_key} unavailable, running locally: {e}")
+            metrics.inc("singleflight_errors_total", flight=self.name)
+            return fn()
+
+        if not acquired:
+            # Another worker is computing it: wait, then use what it published
+            metrics.inc("singleflight_calls_total", flight=self.name, outcome="waited")
+            self._wait_for_release(lock_key)
+            if decode is not None:
+                shared = self._get_result(result_key)
+                if shared is not None:
+                    return decode(shared)
+            return fn()
+
+        try:
+            result = fn()
+            if encode is not None:
+                try:
+                    self._redis.set(result_key, encode(result), px=int(self.result_ttl_seconds * 1000))
+                except Exception as e:
+                    logger.warning(f"Publishing single-flight result {result_key} failed: {e}")
+            return result
+        finally:
+            try:
+                self._release(keys=[lock_key], args=[token])
+            except Exception as e:
+                # The lock expires by itself
+                logger.warning(f"Releasing single-flight lock {lock_key} failed: {e}")
+
+    def _wait_for_release(self, lock_key: str):
+        deadline = time.monotonic() + self.wait_seconds
+        delay = 0.05
+        while time.monotonic() < deadline:
+            try:
+                if not self._redis.exists(lock_key):
+                    return
+            except Exception:
+                return
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+        logger.warning(f"Gave up waiting for {lock_key} after {self.wait_seconds}s")
+
+    def _get_result(self, result_key: str) -> Optional[str]:
+        try:
+            value = self._redis.get(result_key)
+        except Exception:
+            return None
+        return value.decode() if value is not None else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._calls) + len(self._tasks)}
+
+
+def create_single_flight(name: str, distributed: bool = True) -> SingleFlight:
+    """Single-flight group configured from settings; `distributed` uses the Redis lock when enabled"""
+    redis_url = settings.REDIS_URL if distributed and settings.SINGLEFLIGHT_BACKEND.lower() == "redis" else None
+    flight = SingleFlight(
+        name,
+        redis_url=redis_url,
+        lock_ttl_seconds=settings.SINGLEFLIGHT_LOCK_TTL_SECONDS,
+        wait_seconds=settings.SINGLEFLIGHT_WAIT_SECONDS,
+        result_ttl_seconds=settings.SINGLEFLIGHT_RESULT_TTL_SECONDS
+    )
+    metrics.register_collector(f"singleflight_{name}", flight.stats)
+    return flight
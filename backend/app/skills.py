@@ -0,0 +1,192 @@
+"""
+Skill extraction: maps resume text, cover letters and profile skills onto a
+normalized skill vocabulary stored in the application_skills index
+"""
+import json
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy.orm import Session
+from app.ai_service import ResumeExtractor
+from app.crud import get_document_extraction, replace_application_skills
+from app.storage import content_hash_from_path
+from app.models import Application, JobSeekerProfile
+
+logger = logging.getLogger(__name__)
+
+# Canonical skill -> aliases as they appear in resumes (lowercase)
+SKILL_VOCABULARY: Dict[str, List[str]] = {
+    "python": ["python", "python3"],
+    "django": ["django"],
+    "flask": ["flask"],
+    "fastapi": ["fastapi"],
+    "javascript": ["javascript", "js", "ecmascript", "es6"],
+    "typescript": ["typescript", "ts"],
+    "node.js": ["node.js", "nodejs", "node"],
+    "react": ["react", "reactjs", "react.js"],
+    "react native": ["react native", "react-native"],
+    "next.js": ["next.js", "nextjs"],
+    "vue": ["vue", "vue.js", "vuejs"],
+    "angular": ["angular", "angularjs"],
+    "html": ["html", "html5"],
+    "css": ["css", "css3"],
+    "tailwind": ["tailwind", "tailwindcss"],
+    "java": ["java"],
+    "spring": ["spring", "spring boot", "springboot"],
+    "kotlin": ["kotlin"],
+    "swift": ["swift"],
+    "android": ["android"],
+    "ios": ["ios"],
+    "flutter": ["flutter"],
+    "dart": ["dart"],
+    "go": ["golang"],
+    "rust": ["rust"],
+    "c": ["c"],
+    "c++": ["c++", "cpp"],
+    "c#": ["c#", "csharp"],
+    ".net": [".net", "dotnet", "asp.net"],
+    "php": ["php"],
+    "laravel": ["laravel"],
+    "ruby": ["ruby"],
+    "rails": ["rails", "ruby on rails"],
+    "sql": ["sql"],
+    "postgresql": ["postgresql", "postgres", "psql"],
+    "mysql": ["mysql"],
+    "sqlite": ["sqlite"],
+    "mongodb": ["mongodb", "mongo"],
+    "redis": ["redis"],
+    "graphql": ["graphql"],
+    "rest api": ["rest api", "restful", "rest apis"],
+    "docker": ["docker"],
+    "kubernetes": ["kubernetes", "k8s"],
+    "terraform": ["terraform"],
+    "aws": ["aws", "amazon web services"],
+    "gcp": ["gcp", "google cloud"],
+    "azure": ["azure"],
+    "linux": ["linux", "ubuntu"],
+    "git": ["git", "github", "gitlab"],
+    "ci/cd": ["ci/cd", "cicd", "github actions", "jenkins"],
+    "machine learning": ["machine learning", "ml"],
+    "deep learning": ["deep learning"],
+    "tensorflow": ["tensorflow"],
+    "pytorch": ["pytorch"],
+    "pandas": ["pandas"],
+    "numpy": ["numpy"],
+    "data analysis": ["data analysis", "data analytics"],
+    "excel": ["excel"],
+    "power bi": ["power bi", "powerbi"],
+    "figma": ["figma"],
+    "ui/ux": ["ui/ux", "ux", "ui design", "user experience"],
+    "photoshop": ["photoshop"],
+    "seo": ["seo"],
+    "project management": ["project management", "scrum", "agile"],
+    "telegram bots": ["telegram bot", "telegram bots", "aiogram"],
+}
+
+_ALIASES: Dict[str, str] = {
+    alias: canonical for canonical, aliases in SKILL_VOCABULARY.items() for alias in aliases + [canonical]
+}
+_MAX_ALIAS_WORDS = max(len(alias.split()) for alias in _ALIASES)
+_TOKEN_PATTERN = re.compile(r"[a-z0-9.+#/-]+")
+
+# Single-letter and very common words are only trusted in profile skill lists
+_AMBIGUOUS_IN_TEXT = {"c", "node", "ts", "ml", "ux", "go", "spring", "excel"}
+
+
+def normalize_skill(name: str) -> str:
+    """Canonical name for a skill; unknown skills are lowercased and whitespace-collapsed"""
+    cleaned = " ".join(name.lower().strip().split())
+    return _ALIASES.get(cleaned, cleaned)
+
+
+def _tokens(text: str) -> List[str]:
+    tokens = []
+    for raw in _TOKEN_PATTERN.findall(text.lower()):
+        token = raw.strip(",;:-/").rstrip(".")
+        if not token:
+            continue
+        tokens.append(token)
+        # "python/django" and "react-native" also count as their parts
+        if token not in _ALIASES and ("/" in token or "-" in token):
+            tokens.extend(part for part in re.split(r"[/-]", token) if part)
+    return tokens
+
+
+def extract_skills(text: Optional[str]) -> Set[str]:
+    """Vocabulary skills mentioned in free text (resume, cover letter)"""
+    if not text:
+        return set()
+
+    tokens = _tokens(text)
+    found = set()
+    for i in range(len(tokens)):
+        for n in range(_MAX_ALIAS_WORDS, 0, -1):
+            phrase = " ".join(tokens[i:i + n])
+            canonical = _ALIASES.get(phrase)
+            if canonical and phrase not in _AMBIGUOUS_IN_TEXT:
+                found.add(canonical)
+                break
+    return found
+
+
+def parse_profile_skills(skills: Optional[str]) -> Set[str]:
+    """JobSeekerProfile.skills is either a JSON list or a comma-separated string"""
+    if not skills:
+        return set()
+    try:
+        values = json.loads(skills)
+        if not isinstance(values, list):
+            values = [str(values)]
+    except (ValueError, TypeError):
+        values = re.split(r"[,;\n]", skills)
+    return {normalize_skill(str(value)) for value in values if str(value).strip()}
+
+
+def parse_skill_filter(skills: Optional[str]) -> List[str]:
+    """Query parameter "python, Django" -> ["python", "django"]"""
+    if not skills:
+        return []
+    return sorted({normalize_skill(skill) for skill in skills.split(",") if skill.strip()})
+
+
+def _resume_skills(db: Session, resume_url: str, resume_text: Optional[str]) -> Set[str]:
+    """Skills of a resume, extracted once per distinct document and stored with its text"""
+    document_hash = content_hash_from_path(resume_url)
+    extraction = get_document_extraction(db, document_hash) if document_hash else None
+    if extraction and extraction.skills is not None:
+        return set(json.loads(extraction.skills))
+
+    if resume_text is None:
+        resume_text = ResumeExtractor.extract_resume_content(resume_url)
+        if extraction is None and document_hash:
+            extraction = get_document_extraction(db, document_hash)
+    skills = extract_skills(resume_text)
+    if extraction is not None:
+        # Committed together with the application's skill rows
+        extraction.skills = json.dumps(sorted(skills))
+    return skills
+
+
+def index_application_skills(db: Session, application: Application, resume_text: Optional[str] = None) -> Set[str]:
+    """
+    Extract skills for an application from the applicant's profile, cover letter and
+    resume, and replace its rows in application_skills. Returns the indexed skills.
+    """
+    skills: Dict[str, str] = {}
+
+    def add(found: Iterable[str], source: str):
+        for skill in found:
+            skills.setdefault(skill, source)
+
+    profile = db.query(JobSeekerProfile).filter(JobSeekerProfile.user_id == application.applicant_id).first()
+    if profile:
+        add(parse_profile_skills(profile.skills), "profile")
+
+    if application.resume_url:
+        add(_resume_skills(db, application.resume_url, resume_text), "resume")
+    add(extract_skills(application.cover_letter), "cover_letter")
+
+    replace_application_skills(db, application.id, application.job_id, skills)
+    db.commit()
+    logger.info(f"Indexed {len(skills)} skills for application {application.id}")
+    return set(skills)
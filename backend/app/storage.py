@@ -1,142 +1,649 @@
-"""Google Cloud Storage utilities for file uploads"""
+"""
+File storage for uploads (resumes, CVs, profile pictures, logos)
+
+One interface over several backends, chosen by settings.STORAGE_BACKEND:
+- gcs: Google Cloud Storage (production)
+- local: a directory on disk (settings.UPLOAD_DIR)
+- memory: a dict, for tests and offline benchmarks
+
+Files are content-addressed ("<folder>/<sha256><ext>"), so the same file
+uploaded twice is stored once. Request handlers use the async methods; worker
+threads (extraction, scoring) use the blocking ones.
+
+Logos and CVs uploaded before this interface existed were written to
+UPLOAD_DIR. When another backend is selected, reads and deletes of keys it
+doesn't have fall back to that directory (STORAGE_LEGACY_FALLBACK) until
+copy_uploads_to_storage.py has copied them over.
+"""
 import os
-import uuid
-from typing import Optional
+import re
+import time
+import hmac
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from io import BytesIO
+from typing import AsyncIterator, BinaryIO, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+from urllib.parse import urlencode
+from fastapi import UploadFile
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from google.api_core.exceptions import NotFound, PreconditionFailed
 from google.cloud import storage
 from app.config import settings
+from app.metrics import metrics
+from app.singleflight import SingleFlight
+from app.utils import hash_upload_file
 import logging
 from datetime import timedelta
 
 logger = logging.getLogger(__name__)
 
+_CONTENT_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class StoredFile(NamedTuple):
+    """A file in a storage listing"""
+    key: str
+    size: int
+    updated: float  # Last modification, epoch seconds
+
+
+def content_hash(file_content: bytes) -> str:
+    """sha256 of a file, used as its blob name"""
+    return hashlib.sha256(file_content).hexdigest()
+
+
+def content_hash_from_path(blob_path: str) -> Optional[str]:
+    """Content hash encoded in a blob path, or None for legacy (uuid-named) blobs"""
+    stem = os.path.splitext(os.path.basename(blob_path))[0]
+    return stem if _CONTENT_HASH_PATTERN.match(stem) else None
+
+
+def _upload_signature(key: str, expires: int) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), f"{key}:{expires}".encode(), hashlib.sha256).hexdigest()
+
+
+def verify_upload_signature(key: str, expires: int, signature: str) -> bool:
+    """Check a signed /uploads URL issued by a local or in-memory backend"""
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(_upload_signature(key, expires), signature)
+
+
+def _read_range(file_obj: BinaryIO, chunk_size: int, start: int, end: Optional[int]) -> Iterator[bytes]:
+    """Read bytes [start, end) of a seekable file in chunks"""
+    if start:
+        file_obj.seek(start)
+    remaining = None if end is None else end - start
+    while remaining is None or remaining > 0:
+        chunk = file_obj.read(chunk_size if remaining is None else min(chunk_size, remaining))
+        if not chunk:
+            break
+        if remaining is not None:
+            remaining -= len(chunk)
+        yield chunk
+
+
+class StorageBackend(ABC):
+    """
+    Base class: content addressing, deduplication, signed URL caching and the
+    async API live here; backends implement the blocking primitives below.
+    """
+
+    name = "base"
 
-class GCPStorage:
-    """Google Cloud Platform Storage handler"""
-    
     def __init__(self):
-        self.credentials_path = settings.GCP_CREDENTIALS_PATH
-        self.bucket_name = settings.GCP_BUCKET_NAME
-        self.client = None
-        self.bucket = None
-        
-        # Initialize GCP client if credentials are provided
-        if self.credentials_path and os.path.exists(self.credentials_path):
-            try:
-                os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = self.credentials_path
-                self.client = storage.Client()
-                self.bucket = self.client.bucket(self.bucket_name)
-                logger.info(f"GCP Storage initialized with bucket: {self.bucket_name}")
-            except Exception as e:
-                logger.error(f"Failed to initialize GCP Storage: {e}")
-        else:
-            logger.warning("GCP credentials not found. File uploads will be disabled.")
-    
+        # blob path -> (signed URL, expiry as epoch seconds), least recently used first
+        self._signed_urls: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._signed_urls_lock = threading.Lock()
+        # Concurrent cache misses for one file sign it once (in-process; signing is cheaper than a lock round trip)
+        self._signing = SingleFlight(f"{self.name}_signed_urls")
+        # Older files kept elsewhere (UPLOAD_DIR), consulted for keys this backend doesn't have
+        self.fallback: Optional["StorageBackend"] = None
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    # Blocking primitives
+
+    @abstractmethod
+    def _exists(self, key: str) -> bool:
+        """Whether `key` is stored"""
+
+    @abstractmethod
+    def _write(self, key: str, file_obj: BinaryIO, size: int, content_type: str) -> bool:
+        """Create `key` from file_obj; False if it already exists (never overwrites)"""
+
+    @abstractmethod
+    def _size(self, key: str) -> Optional[int]:
+        """Size in bytes, or None if `key` doesn't exist"""
+
+    @abstractmethod
+    def _read_chunks(self, key: str, chunk_size: int, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Bytes [start, end) of `key` in chunks; raises FileNotFoundError if missing"""
+
+    @abstractmethod
+    def _delete(self, key: str) -> bool:
+        """Delete `key`; False if it didn't exist"""
+
+    @abstractmethod
+    def _list(self, prefix: str) -> Iterator[StoredFile]:
+        """Every stored file whose key starts with `prefix`"""
+
+    def _sign(self, key: str, expiration: timedelta) -> str:
+        """URL granting temporary read access; served by the /uploads route by default"""
+        expires = int(time.time() + expiration.total_seconds())
+        query = urlencode({"expires": expires, "signature": _upload_signature(key, expires)})
+        return f"/uploads/{key}?{query}"
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path of `key` when the backend is disk-based (lets it be sent with sendfile)"""
+        return None
+
+    # Blocking API
+
     def upload_file(
-        self, 
-        file_content: bytes, 
-        filename: str, 
+        self,
+        file_content: bytes,
+        filename: str,
         content_type: str = "application/pdf",
         folder: str = "resumes"
     ) -> Optional[str]:
         """
-        Upload a file to GCP Storage
-        
+        Store a file held in memory
+
         Args:
             file_content: File content as bytes
             filename: Original filename
             content_type: MIME type of the file
             folder: Folder/prefix in the bucket
-            
+
         Returns:
-            Public URL of the uploaded file or None if upload fails
+            Storage key of the file or None if the upload fails
+        """
+        return self.upload_stream(
+            BytesIO(file_content),
+            size=len(file_content),
+            file_hash=content_hash(file_content),
+            filename=filename,
+            content_type=content_type,
+            folder=folder
+        )
+
+    def upload_stream(
+        self,
+        file_obj: BinaryIO,
+        size: int,
+        file_hash: str,
+        filename: str,
+        content_type: str = "application/pdf",
+        folder: str = "resumes"
+    ) -> Optional[str]:
         """
-        if not self.client or not self.bucket:
-            logger.error("GCP Storage not initialized")
+        Store a file object in chunks, so it is never held in memory as a whole.
+        A file that is already stored is not uploaded again.
+
+        Args:
+            file_obj: Readable file object positioned at the start of the content
+            size: Content size in bytes
+            file_hash: sha256 of the content (see utils.hash_upload_file)
+            filename: Original filename
+            content_type: MIME type of the file
+            folder: Folder/prefix in the bucket
+
+        Returns:
+            Storage key of the file or None if the upload fails
+        """
+        if not self.available:
+            logger.error(f"{self.name} storage not initialized")
             return None
-        
+
         try:
-            # Generate unique filename
-            file_extension = os.path.splitext(filename)[1]
-            unique_filename = f"{folder}/{uuid.uuid4()}{file_extension}"
-            
-            # Create blob and upload
-            blob = self.bucket.blob(unique_filename)
-            blob.upload_from_string(file_content, content_type=content_type)
-            
-            # Return the blob path (not a URL, we'll generate signed URLs on demand)
-            logger.info(f"File uploaded successfully: {unique_filename}")
-            return unique_filename
-            
+            # Name the file after its content
+            file_extension = os.path.splitext(filename or "")[1].lower()
+            key = f"{folder}/{file_hash}{file_extension}"
+
+            if self._exists(key) or not self._write(key, file_obj, size, content_type):
+                logger.info(f"File already stored, reusing: {key}")
+                metrics.inc("storage_uploads_total", backend=self.name, folder=folder, outcome="deduplicated")
+                return key
+
+            logger.info(f"File uploaded successfully: {key}")
+            metrics.inc("storage_uploads_total", backend=self.name, folder=folder, outcome="uploaded")
+            metrics.inc("storage_uploaded_bytes_total", size, backend=self.name, folder=folder)
+            return key
+
         except Exception as e:
-            logger.error(f"Failed to upload file to GCP: {e}")
+            logger.error(f"Failed to upload file to {self.name} storage: {e}")
             return None
-    
+
+    def store(self, key: str, content: bytes, content_type: str) -> bool:
+        """Store content under an explicit key (derived files such as image variants); never overwrites"""
+        try:
+            return not self._exists(key) and self._write(key, BytesIO(content), len(content), content_type)
+        except Exception as e:
+            logger.error(f"Failed to store {key} in {self.name} storage: {e}")
+            return False
+
+    def file_exists(self, key: str) -> bool:
+        try:
+            if self._exists(key):
+                return True
+        except FileNotFoundError:
+            pass
+        return self.fallback is not None and self.fallback.file_exists(key)
+
+    def file_size(self, key: str) -> Optional[int]:
+        """Size in bytes, or None if the file doesn't exist"""
+        return self.locate_file(key)[1]
+
+    def locate_file(self, key: str) -> Tuple["StorageBackend", Optional[int]]:
+        """The backend holding `key` (this one or its fallback) and the file's size, None if missing"""
+        try:
+            size = self._size(key)
+        except FileNotFoundError:
+            size = None
+        if size is None and self.fallback is not None:
+            fallback_size = self.fallback.file_size(key)
+            if fallback_size is not None:
+                metrics.inc("storage_fallback_reads_total", backend=self.fallback.name)
+                return self.fallback, fallback_size
+        return self, size
+
+    def list_files(self, prefix: str = "") -> Iterator[StoredFile]:
+        """Stored files under a folder prefix (e.g. "resumes/"); listing errors propagate"""
+        return self._list(prefix)
+
+    def read_file(self, key: str) -> Optional[bytes]:
+        """Whole content of a file, or None if it is missing or unreadable"""
+        try:
+            return b"".join(self._read_chunks(key, settings.UPLOAD_CHUNK_SIZE))
+        except FileNotFoundError:
+            if self.fallback is not None and self.fallback.file_exists(key):
+                metrics.inc("storage_fallback_reads_total", backend=self.fallback.name)
+                return self.fallback.read_file(key)
+            logger.warning(f"File not found in {self.name} storage: {key}")
+            return None
+        except Exception as e:
+            logger.error(f"Failed to read {key} from {self.name} storage: {e}")
+            return None
+
     def generate_signed_url(
-        self, 
-        blob_path: str, 
+        self,
+        blob_path: str,
         expiration_minutes: int = 60
     ) -> Optional[str]:
         """
         Generate a signed URL for a file that allows temporary access
-        
+
+        Signing may be expensive (an RSA operation for GCS), so a URL signed
+        earlier is reused while it stays valid for a reasonable time; callers may
+        get a URL expiring sooner than `expiration_minutes`.
+
         Args:
-            blob_path: Path to the blob in the bucket (e.g., "resumes/uuid.pdf") or full URL
+            blob_path: Storage key of the file (e.g., "resumes/<hash>.pdf")
             expiration_minutes: How long the URL should be valid (default 60 minutes)
-            
+
         Returns:
             Signed URL that can be used to access the file, or None if generation fails
         """
-        if not self.client or not self.bucket:
-            logger.error("GCP Storage not initialized")
+        if not self.available:
+            logger.error(f"{self.name} storage not initialized")
             return None
-        
+
         try:
-            # Extract blob path if full URL is provided
-            if blob_path.startswith('https://storage.googleapis.com/'):
-                # Extract blob path from full URL
-                # Format: https://storage.googleapis.com/bucket-name/path/to/file
-                blob_path = blob_path.split(f'{self.bucket_name}/', 1)[-1]
-                logger.info(f"Extracted blob path: {blob_path}")
-            
-            blob = self.bucket.blob(blob_path)
-            
-            # Generate signed URL valid for the specified time
-            signed_url = blob.generate_signed_url(
-                version="v4",
-                expiration=timedelta(minutes=expiration_minutes),
-                method="GET"
+            blob_path = self.normalize_key(blob_path)
+
+            # Don't hand out URLs about to expire; short-lived requests accept half their lifetime
+            min_remaining = min(settings.SIGNED_URL_MIN_REMAINING_MINUTES, expiration_minutes / 2) * 60
+            cached = self._cached_signed_url(blob_path, min_remaining)
+            if cached:
+                metrics.inc("storage_signed_urls_total", outcome="cached")
+                return cached
+
+            return self._signing.do(
+                f"{blob_path}:{expiration_minutes}",
+                lambda: self._sign_and_remember(blob_path, expiration_minutes)
             )
-            
-            logger.info(f"Generated signed URL for: {blob_path}")
-            return signed_url
-            
+
         except Exception as e:
             logger.error(f"Failed to generate signed URL for {blob_path}: {e}")
             return None
-    
+
+    def generate_signed_urls(self, blob_paths: Iterable[str], expiration_minutes: int = 60) -> Dict[str, str]:
+        """Signed URLs for several files at once; paths that fail to sign are left out"""
+        signed_urls = {}
+        for blob_path in set(blob_paths):
+            signed_url = self.generate_signed_url(blob_path, expiration_minutes)
+            if signed_url:
+                signed_urls[blob_path] = signed_url
+        return signed_urls
+
     def delete_file(self, blob_path: str) -> bool:
         """
-        Delete a file from GCP Storage
-        
+        Delete a file
+
+        Files are shared by every record uploading the same content; only
+        delete one that is no longer referenced anywhere.
+
         Args:
-            blob_path: Path to the blob in the bucket
-            
+            blob_path: Storage key of the file
+
         Returns:
             True if successful, False otherwise
         """
-        if not self.client or not self.bucket:
+        if not self.available:
             return False
-        
+
         try:
-            blob = self.bucket.blob(blob_path)
-            blob.delete()
-            logger.info(f"File deleted successfully: {blob_path}")
-            return True
+            deleted = self._delete(blob_path)
+            if not deleted and self.fallback is not None:
+                deleted = self.fallback.delete_file(blob_path)
+            with self._signed_urls_lock:
+                self._signed_urls.pop(blob_path, None)
+            if deleted:
+                logger.info(f"File deleted successfully: {blob_path}")
+            return deleted
         except Exception as e:
-            logger.error(f"Failed to delete file from GCP: {e}")
+            logger.error(f"Failed to delete file from {self.name} storage: {e}")
             return False
 
+    def normalize_key(self, blob_path: str) -> str:
+        """Storage key of a value saved in a URL column (older rows may hold full URLs)"""
+        return blob_path
 
-# Singleton instance
-gcp_storage = GCPStorage()
+    def _sign_and_remember(self, blob_path: str, expiration_minutes: int) -> str:
+        signed_url = self._sign(blob_path, timedelta(minutes=expiration_minutes))
+
+        logger.info(f"Generated signed URL for: {blob_path}")
+        metrics.inc("storage_signed_urls_total", outcome="signed")
+        self._remember_signed_url(blob_path, signed_url, time.time() + expiration_minutes * 60)
+        return signed_url
+
+    def _cached_signed_url(self, blob_path: str, min_remaining_seconds: float) -> Optional[str]:
+        with self._signed_urls_lock:
+            entry = self._signed_urls.get(blob_path)
+            if not entry:
+                return None
+            signed_url, expires_at = entry
+            if expires_at - time.time() < min_remaining_seconds:
+                del self._signed_urls[blob_path]
+                return None
+            self._signed_urls.move_to_end(blob_path)
+            return signed_url
+
+    def _remember_signed_url(self, blob_path: str, signed_url: str, expires_at: float):
+        """Store a signed URL, evicting the least recently used entries"""
+        with self._signed_urls_lock:
+            self._signed_urls[blob_path] = (signed_url, expires_at)
+            self._signed_urls.move_to_end(blob_path)
+            while len(self._signed_urls) > settings.SIGNED_URL_CACHE_SIZE:
+                self._signed_urls.popitem(last=False)
+
+    # Async API
+
+    async def save_upload(self, upload_file: UploadFile, folder: str, max_size: int = settings.MAX_FILE_SIZE) -> Optional[str]:
+        """Validate the size of an upload while hashing it, then stream it to storage"""
+        file_hash, file_size = await hash_upload_file(upload_file, max_size=max_size)
+        return await run_in_threadpool(
+            self.upload_stream,
+            upload_file.file,
+            size=file_size,
+            file_hash=file_hash,
+            filename=upload_file.filename,
+            content_type=upload_file.content_type,
+            folder=folder
+        )
+
+    async def read(self, key: str) -> Optional[bytes]:
+        return await run_in_threadpool(self.read_file, key)
+
+    async def stream(
+        self,
+        key: str,
+        chunk_size: int = settings.UPLOAD_CHUNK_SIZE,
+        start: int = 0,
+        end: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """Bytes [start, end) of a file in chunks; raises FileNotFoundError if missing"""
+        async for chunk in iterate_in_threadpool(self._read_chunks(key, chunk_size, start, end)):
+            yield chunk
+
+    async def size(self, key: str) -> Optional[int]:
+        return await run_in_threadpool(self.file_size, key)
+
+    async def locate(self, key: str) -> Tuple["StorageBackend", Optional[int]]:
+        return await run_in_threadpool(self.locate_file, key)
+
+    async def exists(self, key: str) -> bool:
+        return await run_in_threadpool(self.file_exists, key)
+
+    async def signed_url(self, key: str, expiration_minutes: int = 60) -> Optional[str]:
+        return await run_in_threadpool(self.generate_signed_url, key, expiration_minutes)
+
+    async def signed_urls(self, keys: Iterable[str], expiration_minutes: int = 60) -> Dict[str, str]:
+        return await run_in_threadpool(self.generate_signed_urls, list(keys), expiration_minutes)
+
+    async def delete(self, key: str) -> bool:
+        return await run_in_threadpool(self.delete_file, key)
+
+
+class GCPStorage(StorageBackend):
+    """Google Cloud Platform Storage handler"""
+
+    name = "gcs"
+
+    def __init__(self):
+        super().__init__()
+        self.credentials_path = settings.GCP_CREDENTIALS_PATH
+        self.bucket_name = settings.GCP_BUCKET_NAME
+        self.client = None
+        self.bucket = None
+
+        # Initialize GCP client if credentials are provided
+        if self.credentials_path and os.path.exists(self.credentials_path):
+            try:
+                os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = self.credentials_path
+                self.client = storage.Client()
+                self.bucket = self.client.bucket(self.bucket_name)
+                logger.info(f"GCP Storage initialized with bucket: {self.bucket_name}")
+            except Exception as e:
+                logger.error(f"Failed to initialize GCP Storage: {e}")
+        else:
+            logger.warning("GCP credentials not found. File uploads will be disabled.")
+
+    @property
+    def available(self) -> bool:
+        return bool(self.client and self.bucket)
+
+    def _exists(self, key: str) -> bool:
+        return self.bucket.blob(key).exists()
 
+    def _write(self, key: str, file_obj: BinaryIO, size: int, content_type: str) -> bool:
+        # Resumable upload in chunks; only create, never overwrite (a concurrent upload of the same file may win)
+        blob = self.bucket.blob(key, chunk_size=settings.GCS_UPLOAD_CHUNK_SIZE)
+        try:
+            blob.upload_from_file(file_obj, size=size, content_type=content_type, if_generation_match=0)
+            return True
+        except PreconditionFailed:
+            return False
+
+    def _size(self, key: str) -> Optional[int]:
+        blob = self.bucket.get_blob(key)
+        return blob.size if blob else None
+
+    def _read_chunks(self, key: str, chunk_size: int, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        try:
+            with self.bucket.blob(key).open("rb", chunk_size=chunk_size) as f:
+                yield from _read_range(f, chunk_size, start, end)
+        except NotFound:
+            raise FileNotFoundError(key)
+
+    def _delete(self, key: str) -> bool:
+        try:
+            self.bucket.blob(key).delete()
+            return True
+        except NotFound:
+            return False
+
+    def _list(self, prefix: str) -> Iterator[StoredFile]:
+        for blob in self.client.list_blobs(self.bucket, prefix=prefix):
+            yield StoredFile(blob.name, blob.size or 0, blob.updated.timestamp() if blob.updated else time.time())
+
+    def _sign(self, key: str, expiration: timedelta) -> str:
+        return self.bucket.blob(key).generate_signed_url(version="v4", expiration=expiration, method="GET")
+
+    def normalize_key(self, blob_path: str) -> str:
+        # Extract blob path if full URL is provided
+        if blob_path.startswith('https://storage.googleapis.com/'):
+            # Format: https://storage.googleapis.com/bucket-name/path/to/file
+            blob_path = blob_path.split(f'{self.bucket_name}/', 1)[-1]
+            logger.info(f"Extracted blob path: {blob_path}")
+        return blob_path
+
+
+class LocalStorage(StorageBackend):
+    """Files in a directory on disk, served by the /uploads route"""
+
+    name = "local"
+
+    def __init__(self, root: str):
+        super().__init__()
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def local_path(self, key: str) -> Optional[str]:
+        path = os.path.abspath(os.path.join(self.root, key))
+        # Keys come from URLs; never leave the storage directory
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise FileNotFoundError(key)
+        return path
+
+    def _exists(self, key: str) -> bool:
+        return os.path.isfile(self.local_path(key))
+
+    def _write(self, key: str, file_obj: BinaryIO, size: int, content_type: str) -> bool:
+        path = self.local_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                while chunk := file_obj.read(settings.UPLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+            try:
+                # Atomic create-only publish: a concurrent upload of the same file may win
+                os.link(temp_path, path)
+                return True
+            except FileExistsError:
+                return False
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _size(self, key: str) -> Optional[int]:
+        path = self.local_path(key)
+        return os.path.getsize(path) if os.path.isfile(path) else None
+
+    def _read_chunks(self, key: str, chunk_size: int, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        with open(self.local_path(key), "rb") as f:
+            yield from _read_range(f, chunk_size, start, end)
+
+    def _delete(self, key: str) -> bool:
+        path = self.local_path(key)
+        if not os.path.exists(path):
+            return False
+        os.remove(path)
+        return True
+
+    def _list(self, prefix: str) -> Iterator[StoredFile]:
+        # Walk only the folder part of the prefix, then filter on the rest
+        folder = os.path.join(self.root, os.path.dirname(prefix))
+        for directory, _, filenames in os.walk(folder):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    # An upload still being written
+                    continue
+                path = os.path.join(directory, filename)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if not key.startswith(prefix):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield StoredFile(key, stat.st_size, stat.st_mtime)
+
+
+class MemoryStorage(StorageBackend):
+    """Files in a dict; for tests and offline benchmarks"""
+
+    name = "memory"
+
+    def __init__(self):
+        super().__init__()
+        self._files: Dict[str, bytes] = {}
+        self._updated: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _exists(self, key: str) -> bool:
+        with self._lock:
+            return key in self._files
+
+    def _write(self, key: str, file_obj: BinaryIO, size: int, content_type: str) -> bool:
+        content = file_obj.read()
+        with self._lock:
+            if key in self._files:
+                return False
+            self._files[key] = content
+            self._updated[key] = time.time()
+            return True
+
+    def _size(self, key: str) -> Optional[int]:
+        with self._lock:
+            content = self._files.get(key)
+        return len(content) if content is not None else None
+
+    def _read_chunks(self, key: str, chunk_size: int, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        with self._lock:
+            content = self._files.get(key)
+        if content is None:
+            raise FileNotFoundError(key)
+        end = len(content) if end is None else min(end, len(content))
+        for offset in range(start, end, chunk_size):
+            yield content[offset:min(offset + chunk_size, end)]
+
+    def _delete(self, key: str) -> bool:
+        with self._lock:
+            self._updated.pop(key, None)
+            return self._files.pop(key, None) is not None
+
+    def _list(self, prefix: str) -> Iterator[StoredFile]:
+        with self._lock:
+            files = [
+                StoredFile(key, len(content), self._updated[key])
+                for key, content in self._files.items() if key.startswith(prefix)
+            ]
+        return iter(files)
+
+
+def create_storage() -> StorageBackend:
+    """Storage backend selected by settings.STORAGE_BACKEND ("auto" = GCS when configured, else local)"""
+    backend = settings.STORAGE_BACKEND.lower()
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "local":
+        return LocalStorage(settings.UPLOAD_DIR)
+
+    gcs = GCPStorage()
+    if backend == "gcs" or gcs.available:
+        if settings.STORAGE_LEGACY_FALLBACK and os.path.isdir(settings.UPLOAD_DIR):
+            gcs.fallback = LocalStorage(settings.UPLOAD_DIR)
+        return gcs
+    logger.warning(f"Falling back to local file storage in {settings.UPLOAD_DIR}")
+    return LocalStorage(settings.UPLOAD_DIR)
+
+
+# Singleton instance
+file_storage = create_storage()
@@ -0,0 +1,212 @@
+"""
+Garbage collection of orphaned stored files
+
+Files nobody points at anymore leak storage: resumes uploaded through
+upload-resume but never attached, resumes of deleted jobs, replaced profile
+pictures. A GC run lists the upload folders, compares them with the URL
+columns referencing stored files and deletes what is left over, in rate-limited
+batches. Dry runs only report what would be deleted.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy.orm import Session
+from app import crud
+from app.config import settings
+from app.database import SessionLocal
+from app.images import variant_source_key
+from app.metrics import metrics
+from app.models import Application, Company, JobSeekerProfile, User
+from app.storage import StoredFile, file_storage
+
+logger = logging.getLogger(__name__)
+
+# Folders holding user uploads (and their image variants); nothing else in the bucket is touched
+GC_FOLDERS = ("resumes/", "cvs/", "company_logos/", "profile-pictures/", "avatars/")
+
+# Orphans listed by key in a report
+REPORT_SAMPLE_SIZE = 20
+
+_REFERENCE_COLUMNS = (
+    Application.resume_url,
+    User.profile_picture_url,
+    User.avatar_url,
+    JobSeekerProfile.cv_url,
+    Company.logo_url,
+)
+
+
+def referenced_keys(db: Session) -> Set[str]:
+    """Storage keys of every file referenced by a record"""
+    keys = set()
+    for column in _REFERENCE_COLUMNS:
+        for (value,) in db.query(column).filter(column.isnot(None)).distinct():
+            if value:
+                keys.add(file_storage.normalize_key(value))
+    return keys
+
+
+def _is_referenced(key: str, referenced: Set[str]) -> bool:
+    # Image variants live as long as their source image
+    return key in referenced or variant_source_key(key) in referenced
+
+
+def _still_referenced(db: Session, key: str) -> bool:
+    """Fresh check right before deleting: the same content may have been uploaded again meanwhile"""
+    source_key = variant_source_key(key)
+    return crud.count_file_references(db, key) > 0 or (
+        source_key is not None and crud.count_file_references(db, source_key) > 0
+    )
+
+
+class StorageGC:
+    """Finds and deletes stored files no record references"""
+
+    def __init__(self, grace_hours: float, batch_size: int, deletes_per_second: float):
+        self.grace_hours = grace_hours
+        self.batch_size = max(batch_size, 1)
+        self.deletes_per_second = deletes_per_second
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_report: Dict = {}
+
+    def run(self, dry_run: bool = True, folders: Iterable[str] = GC_FOLDERS) -> Optional[Dict]:
+        """
+        Reconcile storage with the database once
+
+        Returns a report of scanned, kept and orphaned files (and what was
+        deleted unless dry_run), or None if another run is in progress.
+        """
+        if not self._run_lock.acquire(blocking=False):
+            logger.info("Storage GC already running, skipping")
+            return None
+        start = time.perf_counter()
+        try:
+            report = self._run(dry_run, folders)
+            metrics.inc("storage_gc_runs_total", outcome="dry_run" if dry_run else "ok")
+        except Exception as e:
+            logger.error(f"Storage GC failed: {e}")
+            metrics.inc("storage_gc_runs_total", outcome="error")
+            raise
+        finally:
+            self._run_lock.release()
+
+        report["seconds"] = round(time.perf_counter() - start, 3)
+        self._last_report = report
+        logger.info(
+            f"Storage GC {'dry run' if dry_run else 'run'}: scanned {report['scanned']}, "
+            f"{report['orphans']} orphans ({report['orphan_bytes']} bytes), deleted {report['deleted']}"
+        )
+        return report
+
+    def _run(self, dry_run: bool, folders: Iterable[str]) -> Dict:
+        db = SessionLocal()
+        try:
+            # References first: files uploaded after this point are younger than the grace period
+            referenced = referenced_keys(db)
+            cutoff = time.time() - self.grace_hours * 3600
+
+            report = {
+                "dry_run": dry_run,
+                "scanned": 0,
+                "referenced": 0,
+                "recent": 0,
+                "orphans": 0,
+                "orphan_bytes": 0,
+                "deleted": 0,
+                "freed_bytes": 0,
+                "by_folder": {},
+                "sample": [],
+            }
+            orphans: List[StoredFile] = []
+            for folder in folders:
+                folder_report = report["by_folder"].setdefault(folder, {"scanned": 0, "orphans": 0, "orphan_bytes": 0})
+                for stored in file_storage.list_files(folder):
+                    report["scanned"] += 1
+                    folder_report["scanned"] += 1
+                    if _is_referenced(stored.key, referenced):
+                        report["referenced"] += 1
+                    elif stored.updated > cutoff:
+                        # Resumes are uploaded before the application that references them
+                        report["recent"] += 1
+                    else:
+                        orphans.append(stored)
+                        folder_report["orphans"] += 1
+                        folder_report["orphan_bytes"] += stored.size
+
+            report["orphans"] = len(orphans)
+            report["orphan_bytes"] = sum(stored.size for stored in orphans)
+            report["sample"] = [stored.key for stored in orphans[:REPORT_SAMPLE_SIZE]]
+            metrics.set_gauge("storage_gc_orphans", len(orphans))
+            metrics.set_gauge("storage_gc_orphan_bytes", report["orphan_bytes"])
+
+            if not dry_run:
+                self._delete(db, orphans, report)
+            return report
+        finally:
+            db.close()
+
+    def _delete(self, db: Session, orphans: List[StoredFile], report: Dict):
+        for offset in range(0, len(orphans), self.batch_size):
+            if self._stop.is_set():
+                logger.info("Storage GC stopped before finishing")
+                return
+            batch_start = time.monotonic()
+            batch = orphans[offset:offset + self.batch_size]
+            for stored in batch:
+                if _still_referenced(db, stored.key):
+                    continue
+                if file_storage.delete_file(stored.key):
+                    report["deleted"] += 1
+                    report["freed_bytes"] += stored.size
+                    metrics.inc("storage_gc_deleted_total")
+                    metrics.inc("storage_gc_freed_bytes_total", stored.size)
+            db.expire_all()
+
+            # Rate limit: spread deletes so the storage API and disk aren't hammered
+            if self.deletes_per_second > 0:
+                remaining = len(batch) / self.deletes_per_second - (time.monotonic() - batch_start)
+                if remaining > 0:
+                    self._stop.wait(remaining)
+
+    def start(self, interval_hours: float, dry_run: bool):
+        """Run in a background thread every `interval_hours`"""
+        if interval_hours <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, args=(interval_hours * 3600, dry_run), name="storage-gc", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Storage GC scheduled every {interval_hours}h (dry run: {dry_run})")
+
+    def _loop(self, interval_seconds: float, dry_run: bool):
+        while not self._stop.wait(interval_seconds):
+            try:
+                self.run(dry_run=dry_run)
+            except Exception:
+                # Already logged and counted; try again next interval
+                pass
+
+    def stats(self) -> dict:
+        report = self._last_report
+        return {
+            "running": 1 if self._run_lock.locked() else 0,
+            "last_scanned": report.get("scanned", 0),
+            "last_orphans": report.get("orphans", 0),
+            "last_deleted": report.get("deleted", 0),
+        }
+
+    def shutdown(self):
+        self._stop.set()
+
+
+# Singleton instance
+storage_gc = StorageGC(
+    grace_hours=settings.STORAGE_GC_GRACE_HOURS,
+    batch_size=settings.STORAGE_GC_BATCH_SIZE,
+    deletes_per_second=settings.STORAGE_GC_DELETES_PER_SECOND
+)
+metrics.register_collector("storage_gc", storage_gc.stats)
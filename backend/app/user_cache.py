@@ -0,0 +1,160 @@
+"""
+Short-lived cache of authenticated users
+
+get_current_user runs on almost every request and used to load the user row
+each time. Column values are cached by user id for USER_CACHE_TTL_SECONDS and
+turned back into a session-attached User without a query, so relationships
+still lazy-load and crud updates still work on the returned object.
+
+Backends (settings.USER_CACHE_BACKEND):
+- memory: per-process LRU; other worker processes see changes after the TTL
+- redis: shared by all workers, so invalidation is immediate everywhere
+- none: always query
+crud's user update functions invalidate the entry after committing.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import redis
+from sqlalchemy import DateTime, Enum
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.config import settings
+from app.metrics import metrics
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = list(User.__table__.columns)
+
+
+def _encode(values: Dict) -> str:
+    """JSON for a row's column values (Redis backend)"""
+    encoded = {}
+    for column in _COLUMNS:
+        value = values.get(column.key)
+        if value is not None and isinstance(column.type, DateTime):
+            value = value.isoformat()
+        elif value is not None and isinstance(column.type, Enum):
+            value = value.value
+        encoded[column.key] = value
+    return json.dumps(encoded)
+
+
+def _decode(data: str) -> Dict:
+    values = json.loads(data)
+    for column in _COLUMNS:
+        value = values.get(column.key)
+        if value is not None and isinstance(column.type, DateTime):
+            values[column.key] = datetime.fromisoformat(value)
+        elif value is not None and isinstance(column.type, Enum):
+            values[column.key] = column.type.enum_class(value)
+    return values
+
+
+class UserCache:
+    """Column values of recently authenticated users, by id"""
+
+    def __init__(self, backend: str, ttl_seconds: float, max_size: int, redis_url: Optional[str] = None):
+        self.backend = backend.lower()
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        # user id -> (expiry as monotonic seconds, column values), least recently used first
+        self._entries: "OrderedDict[int, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        if self.backend == "redis":
+            self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend in ("memory", "redis") and self.ttl_seconds > 0
+
+    def get_user(self, db: Session, user_id: int) -> Optional[User]:
+        """The user with this id, from the cache when possible, attached to `db`"""
+        values = self._get(user_id) if self.enabled else None
+        if values is not None:
+            metrics.inc("user_cache_lookups_total", outcome="hit")
+            user = User(**values)
+            # Mark as loaded from the database, then attach without a SELECT
+            make_transient_to_detached(user)
+            return db.merge(user, load=False)
+
+        user = db.query(User).filter(User.id == user_id).first()
+        if self.enabled:
+            metrics.inc("user_cache_lookups_total", outcome="miss")
+            if user is not None:
+                self._set(user_id, {column.key: getattr(user, column.key) for column in _COLUMNS})
+        return user
+
+    def invalidate(self, user_id: int):
+        """Drop a user after their row changed (call after commit)"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+        if self._redis is not None:
+            try:
+                self._redis.delete(self._redis_key(user_id))
+            except Exception as e:
+                logger.warning(f"User cache invalidation of {user_id} failed: {e}")
+                metrics.inc("user_cache_errors_total", operation="invalidate")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, user_id: int) -> Optional[Dict]:
+        if self._redis is not None:
+            try:
+                data = self._redis.get(self._redis_key(user_id))
+            except Exception as e:
+                logger.warning(f"User cache read failed, querying the database: {e}")
+                metrics.inc("user_cache_errors_total", operation="get")
+                return None
+            return _decode(data) if data else None
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, values = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return dict(values)
+
+    def _set(self, user_id: int, values: Dict):
+        if self._redis is not None:
+            try:
+                self._redis.set(self._redis_key(user_id), _encode(values), px=int(self.ttl_seconds * 1000))
+            except Exception as e:
+                logger.warning(f"User cache write failed: {e}")
+                metrics.inc("user_cache_errors_total", operation="set")
+            return
+
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, values)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _redis_key(user_id: int) -> str:
+        return f"user:{user_id}"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries)}
+
+
+# Singleton instance
+user_cache = UserCache(
+    backend=settings.USER_CACHE_BACKEND,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+    max_size=settings.USER_CACHE_SIZE,
+    redis_url=settings.REDIS_URL
+)
+metrics.register_collector("user_cache", user_cache.stats)
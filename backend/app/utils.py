@@ -1,57 +1,34 @@
-import os
-import uuid
-import aiofiles
+import hashlib
+from typing import Tuple
 from fastapi import UploadFile, HTTPException, status
 from app.config import settings
 
 
-async def save_upload_file(upload_file: UploadFile, subfolder: str = "") -> str:
-    """
-    Save uploaded file and return the file path
-    """
-    # Create upload directory if it doesn't exist
-    upload_dir = os.path.join(settings.UPLOAD_DIR, subfolder)
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Generate unique filename
-    file_extension = os.path.splitext(upload_file.filename)[1] if upload_file.filename else ""
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(upload_dir, unique_filename)
-    
-    # Check file size
-    if upload_file.size and upload_file.size > settings.MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File size exceeds maximum allowed size of {settings.MAX_FILE_SIZE} bytes"
-        )
-    
-    # Save file
-    try:
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await upload_file.read()
-            await f.write(content)
-        
-        # Return relative path for storage in database
-        return os.path.join(subfolder, unique_filename)
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error saving file: {str(e)}"
-        )
+def _file_too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File size must be less than {max_size // (1024 * 1024)}MB"
+    )
 
 
-def delete_file(file_path: str) -> bool:
+async def hash_upload_file(upload_file: UploadFile, max_size: int = settings.MAX_FILE_SIZE) -> Tuple[str, int]:
     """
-    Delete a file from the uploads directory
+    sha256 and size of an upload, read in chunks and rejected as soon as it exceeds
+    max_size. Rewinds the file so it can be streamed to storage afterwards.
     """
-    try:
-        full_path = os.path.join(settings.UPLOAD_DIR, file_path)
-        if os.path.exists(full_path):
-            os.remove(full_path)
-            return True
-        return False
-    except Exception:
-        return False
+    if upload_file.size and upload_file.size > max_size:
+        raise _file_too_large(max_size)
+    
+    digest = hashlib.sha256()
+    size = 0
+    await upload_file.seek(0)
+    while chunk := await upload_file.read(settings.UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_size:
+            raise _file_too_large(max_size)
+        digest.update(chunk)
+    await upload_file.seek(0)
+    return digest.hexdigest(), size
 
 
 def get_file_url(file_path: str) -> str:
@@ -0,0 +1,66 @@
+"""
+Backfill the skill and full-text search indexes for applications submitted
+before they existed (or re-index after vocabulary changes)
+"""
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.ai_service import ResumeExtractor
+from app.crud import mark_application_indexed
+from app.database import SessionLocal, engine
+from app.models import Application
+from app.search import ensure_search_index, index_application_document
+from app.skills import index_application_skills
+
+
+def backfill(reindex: bool = False, batch_size: int = 100):
+    ensure_search_index(engine)
+    db = SessionLocal()
+    try:
+        query = db.query(Application.id).order_by(Application.id)
+        if not reindex:
+            query = query.filter(Application.indexed_at.is_(None))
+        application_ids = [application_id for (application_id,) in query.all()]
+        print(f"Indexing {len(application_ids)} applications...")
+
+        for start in range(0, len(application_ids), batch_size):
+            batch = db.query(Application).filter(
+                Application.id.in_(application_ids[start:start + batch_size])
+            ).all()
+            for application in batch:
+                try:
+                    resume_text = None
+                    if application.resume_url:
+                        resume_text = ResumeExtractor.extract_resume_content(application.resume_url) or ""
+                    index_application_skills(db, application, resume_text=resume_text)
+                    index_application_document(
+                        db,
+                        application_id=application.id,
+                        job_id=application.job_id,
+                        poster_id=application.job.poster_id,
+                        cover_letter=application.cover_letter,
+                        resume_text=resume_text
+                    )
+                    mark_application_indexed(db, application.id)
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    print(f"⚠️  Application {application.id} failed: {e}")
+            db.expunge_all()
+            print(f"  {min(start + batch_size, len(application_ids))}/{len(application_ids)}")
+
+        print("✅ Index backfill completed successfully!")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reindex", action="store_true", help="Re-index applications that are already indexed")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    backfill(reindex=args.reindex, batch_size=args.batch_size)
@@ -0,0 +1,96 @@
+"""
+Offline throughput benchmark for the AI ranking pipeline
+
+Runs ApplicantAIAnalyzer against a fake (latency-injecting) or replay backend
+with synthetic applicants, so no network, database or GCS access is needed.
+
+Examples:
+    python benchmark_ranking.py --backend fake --latency-ms 800 --jobs 50 --concurrency 8
+    python benchmark_ranking.py --backend replay --recordings ai_recordings
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.ai_service import ApplicantAIAnalyzer
+from app.llm_backends import FakeBackend, ReplayBackend
+from app.metrics import metrics, RankingTrace
+from app.models import Application, ApplicationStatus, User, UserRole
+
+
+def build_applications(job_index: int, count: int):
+    """Transient (unsaved) applications with deterministic content"""
+    applications = []
+    for i in range(count):
+        applicant = User(
+            id=job_index * 10000 + i,
+            telegram_id=job_index * 10000 + i,
+            first_name=f"Applicant{i}",
+            username=f"applicant_{job_index}_{i}",
+            role=UserRole.JOB_SEEKER
+        )
+        applications.append(Application(
+            id=job_index * 10000 + i,
+            job_id=job_index,
+            applicant=applicant,
+            cover_letter=("I have built Python and Django services for several years. " * (i % 5 + 1)),
+            resume_url=None,
+            status=ApplicationStatus.PENDING
+        ))
+    return applications
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["fake", "replay"], default="fake")
+    parser.add_argument("--recordings", default="ai_recordings", help="Directory of recorded responses (replay)")
+    parser.add_argument("--replay-latency", action="store_true", help="Sleep for recorded latencies (replay)")
+    parser.add_argument("--latency-ms", type=int, default=500, help="Injected model latency (fake)")
+    parser.add_argument("--jitter-ms", type=int, default=0, help="Random extra latency (fake)")
+    parser.add_argument("--jobs", type=int, default=20, help="Number of ranking tasks")
+    parser.add_argument("--applicants", type=int, default=15, help="Applicants per job")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.backend == "fake":
+        backend = FakeBackend(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    else:
+        backend = ReplayBackend(args.recordings, replay_latency=args.replay_latency)
+    analyzer = ApplicantAIAnalyzer(backend=backend)
+
+    def run(job_index: int):
+        return analyzer.analyze_applicants(
+            applications=build_applications(job_index, args.applicants),
+            job_title="Backend Engineer",
+            job_description="Build and operate Python/Django services on Kubernetes.",
+            job_requirements="3+ years of Python",
+            trace=RankingTrace(job_id=job_index)
+        )
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(run, range(1, args.jobs + 1)))
+    elapsed = time.perf_counter() - start
+
+    snapshot = metrics.snapshot()
+    fallbacks = sum(series["value"] for series in snapshot["counters"].get("ai_ranking_fallback_total", []))
+    task_latency = snapshot["histograms"]["ai_ranking_seconds"][0]["value"]
+
+    print(f"Backend:          {backend.name} ({backend.model_version})")
+    print(f"Ranking tasks:    {len(results)} x {args.applicants} applicants, concurrency {args.concurrency}")
+    print(f"Wall time:        {elapsed:.2f}s")
+    print(f"Throughput:       {len(results) / elapsed:.2f} tasks/s, {len(results) * args.applicants / elapsed:.1f} applicants/s")
+    print(f"Task latency:     p50 {task_latency['p50']:.3f}s, p95 {task_latency['p95']:.3f}s")
+    print(f"Fallbacks:        {int(fallbacks)}")
+    for series in snapshot["histograms"].get("ai_ranking_stage_seconds", []):
+        stage = series["labels"]["stage"]
+        print(f"  {stage:<13} p50 {series['value']['p50'] * 1000:.2f}ms  p95 {series['value']['p95'] * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
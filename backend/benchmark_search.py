@@ -0,0 +1,93 @@
+"""
+Latency benchmark for applicant full-text search
+
+Fills a scratch SQLite database with synthetic search documents and measures
+search_applications() latency for a mix of queries.
+
+Examples:
+    python benchmark_search.py --documents 100000 --queries 500
+    python benchmark_search.py --database sqlite:////tmp/search_bench.db --reuse
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.search import ensure_search_index, index_application_document, search_applications
+
+WORDS = (
+    "python django fastapi kubernetes docker terraform react typescript postgres redis aws gcp "
+    "team lead mentoring startup fintech payments telegram bots api design testing scaling "
+    "experience years built shipped maintained migrated improved latency reliability customers"
+).split()
+QUERIES = ["kubernetes", "python django", "kube", "telegram bots", "payments api", "react typescript", "migrat"]
+
+
+def build_documents(db, count: int, posters: int, jobs_per_poster: int):
+    rng = random.Random(42)
+    for application_id in range(1, count + 1):
+        poster_id = rng.randint(1, posters)
+        job_id = poster_id * jobs_per_poster + rng.randint(0, jobs_per_poster - 1)
+        index_application_document(
+            db,
+            application_id=application_id,
+            job_id=job_id,
+            poster_id=poster_id,
+            cover_letter=" ".join(rng.choices(WORDS, k=60)),
+            resume_text=" ".join(rng.choices(WORDS, k=400))
+        )
+        if application_id % 5000 == 0:
+            db.commit()
+            print(f"  indexed {application_id}/{count}")
+    db.commit()
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default="sqlite:////tmp/search_bench.db")
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--posters", type=int, default=20, help="Employers the documents are spread over")
+    parser.add_argument("--jobs-per-poster", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--reuse", action="store_true", help="Keep an existing index instead of rebuilding it")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database)
+    db = sessionmaker(bind=engine)()
+    ensure_search_index(engine)
+
+    existing = db.execute(text("SELECT count(*) FROM application_search")).scalar()
+    if not (args.reuse and existing):
+        db.execute(text("DELETE FROM application_search"))
+        print(f"Indexing {args.documents} documents...")
+        start = time.perf_counter()
+        build_documents(db, args.documents, args.posters, args.jobs_per_poster)
+        print(f"Indexed in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(7)
+    latencies = []
+    for _ in range(args.queries):
+        poster_id = rng.randint(1, args.posters)
+        job_id = poster_id * args.jobs_per_poster if rng.random() < 0.3 else None
+        start = time.perf_counter()
+        search_applications(db, poster_id, rng.choice(QUERIES), job_id=job_id, limit=20)
+        latencies.append(time.perf_counter() - start)
+
+    print(f"Queries:          {len(latencies)}")
+    print(f"Latency:          p50 {percentile(latencies, 0.5) * 1000:.1f}ms, p95 {percentile(latencies, 0.95) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Mixed read/write throughput benchmark for SQLite, default settings vs the
+production profile (WAL, tuned pragmas and the write queue, see database.py)
+
+Each profile gets a fresh, migrated database file; worker threads then run a
+feed/notification workload where --write-ratio of the operations write.
+
+Examples:
+    python benchmark_sqlite.py --threads 8 --seconds 10
+    python benchmark_sqlite.py --write-ratio 0.5 --profiles tuned
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.database import configure_sqlite
+from app.migrations import upgrade_schema
+from app.models import Job, JobStatus, Notification, User, UserRole
+from app.schemas import JobSearch, JobUpdate
+
+
+def seed(db, users: int, jobs: int):
+    employers = [User(telegram_id=i, role=UserRole.EMPLOYER) for i in range(1, users + 1)]
+    db.add_all(employers)
+    db.flush()
+    db.add_all([
+        Job(title=f"Job {i}", description="python " * 50, poster_id=employers[i % users].id, status=JobStatus.ACTIVE)
+        for i in range(jobs)
+    ])
+    db.add_all([
+        Notification(user_id=user.id, title="Seed", message="Seed", type="seed") for user in employers for _ in range(5)
+    ])
+    db.commit()
+
+
+def read(db, rng, users: int, jobs: int):
+    choice = rng.random()
+    if choice < 0.5:
+        crud.get_jobs(db, search=JobSearch(page=rng.randint(1, 5)))
+    elif choice < 0.8:
+        crud.get_user_notifications(db, rng.randint(1, users))
+    else:
+        crud.get_unread_notification_count(db, rng.randint(1, users))
+
+
+def write(db, rng, users: int, jobs: int):
+    choice = rng.random()
+    if choice < 0.6:
+        crud.create_notification(db, rng.randint(1, users), "Bench", "Bench", "bench")
+    elif choice < 0.8:
+        crud.get_unread_notification_count(db, rng.randint(1, users))
+        crud.mark_notification_as_read(db, rng.randint(1, users * 5), rng.randint(1, users))
+    else:
+        crud.update_job(db, rng.randint(1, jobs), JobUpdate(title=f"Job {rng.random():.6f}"))
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def run_profile(name: str, path: str, tuned: bool, args) -> dict:
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    url = f"sqlite:///{path}"
+    upgrade_schema(url)
+
+    engine = create_engine(url, pool_size=args.threads, max_overflow=0)
+    if tuned:
+        configure_sqlite(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    seed(Session(), args.users, args.jobs)
+
+    results = {"reads": [], "writes": [], "errors": 0}
+    results_lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def worker(seed_value: int):
+        rng = random.Random(seed_value)
+        reads, writes, errors = [], [], 0
+        db = Session()
+        while time.perf_counter() < deadline:
+            is_write = rng.random() < args.write_ratio
+            start = time.perf_counter()
+            try:
+                (write if is_write else read)(db, rng, args.users, args.jobs)
+                db.commit()
+                (writes if is_write else reads).append(time.perf_counter() - start)
+            except OperationalError:
+                # "database is locked"
+                db.rollback()
+                errors += 1
+        db.close()
+        with results_lock:
+            results["reads"] += reads
+            results["writes"] += writes
+            results["errors"] += errors
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    operations = len(results["reads"]) + len(results["writes"])
+    print(f"\n{name}")
+    print(f"  Throughput:     {operations / args.seconds:.0f} ops/s "
+          f"({len(results['reads']) / args.seconds:.0f} reads/s, {len(results['writes']) / args.seconds:.0f} writes/s)")
+    print(f"  Read latency:   p50 {percentile(results['reads'], 0.5) * 1000:.1f}ms, "
+          f"p95 {percentile(results['reads'], 0.95) * 1000:.1f}ms")
+    print(f"  Write latency:  p50 {percentile(results['writes'], 0.5) * 1000:.1f}ms, "
+          f"p95 {percentile(results['writes'], 0.95) * 1000:.1f}ms")
+    print(f"  Locked errors:  {results['errors']}")
+    return {"throughput": operations / args.seconds, "errors": results["errors"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directory", default="/tmp", help="Where the scratch databases are created")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--profiles", nargs="+", choices=["default", "tuned"], default=["default", "tuned"])
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads, {args.seconds:.0f}s per profile, {args.write_ratio:.0%} writes")
+    results = {}
+    for name in args.profiles:
+        results[name] = run_profile(
+            "SQLite defaults" if name == "default" else "Production profile (WAL, pragmas, write queue)",
+            os.path.join(args.directory, f"sqlite_bench_{name}.db"),
+            tuned=name == "tuned",
+            args=args
+        )
+    if len(results) == 2 and results["default"]["throughput"]:
+        print(f"\nSpeedup: {results['tuned']['throughput'] / results['default']['throughput']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Query plan check for app/crud.py
+
+Seeds a scratch SQLite database, calls every public crud function and runs
+EXPLAIN QUERY PLAN on each SELECT, UPDATE and DELETE it issues. Exits with
+status 1 when a statement scans a whole table, or when a crud function has no
+entry in CHECKS (so new queries cannot skip the check).
+
+Examples:
+    python check_query_plans.py
+    python check_query_plans.py --rows 2000 --verbose
+"""
+import argparse
+import inspect
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.database import Base
+from app.models import (
+    User, UserRole, Company, JobSeekerProfile, Job, JobStatus, Application, ApplicationAnalysis,
+    ApplicationSkill, DocumentExtraction, JobNotificationMilestone, Notification, RefreshToken
+)
+from app.schemas import (
+    UserCreate, UserUpdate, CompanyCreate, CompanyUpdate, JobSeekerProfileCreate, JobSeekerProfileUpdate,
+    JobCreate, JobUpdate, JobSearch, ApplicationCreate, ApplicationUpdate
+)
+from app.migrations import upgrade_schema
+
+# "SCAN jobs" reads every row; "SEARCH jobs USING INDEX ..." does not
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?! VIRTUAL TABLE)")
+_CHECKED_STATEMENTS = ("SELECT", "UPDATE", "DELETE")
+
+ANALYSIS = {
+    "overall_score": 70, "cover_letter_score": 60, "completeness_score": 80, "relevance_score": 70,
+    "resume_score": 50, "ai_summary": "", "strengths": [], "concerns": [], "recommendation": "interview"
+}
+
+# crud function -> call against the seeded ids in `s`; run in order, delete_job last
+CHECKS = [
+    ("get_user", lambda db, s: crud.get_user(db, s["seeker"])),
+    ("get_user_by_telegram_id", lambda db, s: crud.get_user_by_telegram_id(db, s["seeker_telegram_id"])),
+    ("create_user", lambda db, s: crud.create_user(db, UserCreate(telegram_id=-1, role=UserRole.JOB_SEEKER))),
+    ("update_user", lambda db, s: crud.update_user(db, s["seeker"], UserUpdate(first_name="Plan"))),
+    ("update_user_by_object", lambda db, s: crud.update_user_by_object(
+        db, crud.get_user(db, s["seeker"]), UserUpdate(last_name="Check"))),
+    ("update_user_avatar", lambda db, s: crud.update_user_avatar(db, s["seeker"], "https://t.me/p.jpg", "avatars/a.jpg")),
+    ("create_refresh_token", lambda db, s: crud.create_refresh_token(
+        db, s["seeker"], "c" * 64, "f" * 32, datetime.utcnow() + timedelta(days=1))),
+    ("get_refresh_token", lambda db, s: crud.get_refresh_token(db, "c" * 64)),
+    ("mark_refresh_token_rotated", lambda db, s: crud.mark_refresh_token_rotated(db, s["refresh_token"])),
+    ("revoke_refresh_token_family", lambda db, s: crud.revoke_refresh_token_family(db, "f" * 32)),
+    ("revoke_user_refresh_tokens", lambda db, s: crud.revoke_user_refresh_tokens(db, s["seeker"])),
+    ("create_company", lambda db, s: crud.create_company(db, CompanyCreate(name="Plan"), s["new_employer"])),
+    ("get_company_by_owner", lambda db, s: crud.get_company_by_owner(db, s["employer"])),
+    ("update_company", lambda db, s: crud.update_company(db, s["company"], CompanyUpdate(website="https://x.y"))),
+    ("update_company_logo", lambda db, s: crud.update_company_logo(
+        db, crud.get_company_by_owner(db, s["employer"]), "company_logos/l.png")),
+    ("get_job_seeker_profile", lambda db, s: crud.get_job_seeker_profile(db, s["seeker"])),
+    ("create_job_seeker_profile", lambda db, s: crud.create_job_seeker_profile(
+        db, JobSeekerProfileCreate(bio="Plan"), s["new_seeker"])),
+    ("update_job_seeker_profile", lambda db, s: crud.update_job_seeker_profile(
+        db, s["seeker"], JobSeekerProfileUpdate(location="Addis Ababa"))),
+    ("update_job_seeker_cv", lambda db, s: crud.update_job_seeker_cv(
+        db, crud.get_job_seeker_profile(db, s["seeker"]), "cvs/c.pdf")),
+    ("create_job", lambda db, s: crud.create_job(db, JobCreate(title="Plan", description="Check"), s["employer"])),
+    ("get_job", lambda db, s: crud.get_job(db, s["job"])),
+    ("get_jobs", lambda db, s: crud.get_jobs(db, search=JobSearch(
+        query="python", location="Addis", is_remote=True, salary_min=100, salary_max=5000, tags=["python"]))),
+    ("get_jobs_by_poster", lambda db, s: crud.get_jobs_by_poster(db, s["employer"])),
+    ("update_job", lambda db, s: crud.update_job(db, s["job"], JobUpdate(title="Plan check"))),
+    ("create_application", lambda db, s: crud.create_application(
+        db, ApplicationCreate(job_id=s["job"], cover_letter="Plan"), s["new_seeker"])),
+    ("get_application", lambda db, s: crud.get_application(db, s["application"])),
+    ("get_applications_by_job", lambda db, s: crud.get_applications_by_job(db, s["job"], skills=["python", "sql"])),
+    ("get_applications_by_applicant", lambda db, s: crud.get_applications_by_applicant(db, s["seeker"])),
+    ("update_application", lambda db, s: crud.update_application(db, s["application"], ApplicationUpdate(notes="Plan"))),
+    ("get_application_count_by_job", lambda db, s: crud.get_application_count_by_job(db, s["job"])),
+    ("get_analysis_fingerprints", lambda db, s: crud.get_analysis_fingerprints(db, s["job"])),
+    ("upsert_application_analysis", lambda db, s: crud.upsert_application_analysis(
+        db, s["application"], s["job"], ANALYSIS, "plan", "0" * 64)),
+    ("get_job_score_distribution", lambda db, s: crud.get_job_score_distribution(db, s["job"])),
+    ("get_ranked_analyses", lambda db, s: crud.get_ranked_analyses(
+        db, s["job"], recommendations=["interview"], min_score=10, max_score=90)),
+    ("replace_application_skills", lambda db, s: crud.replace_application_skills(
+        db, s["application"], s["job"], {"python": "resume"})),
+    ("get_job_skill_facets", lambda db, s: crud.get_job_skill_facets(db, s["job"], skills=["python"])),
+    ("mark_application_indexed", lambda db, s: crud.mark_application_indexed(db, s["application"])),
+    ("get_unindexed_application_ids", lambda db, s: crud.get_unindexed_application_ids(db, datetime.utcnow())),
+    ("count_file_references", lambda db, s: crud.count_file_references(db, "cvs/c.pdf")),
+    ("get_document_extraction", lambda db, s: crud.get_document_extraction(db, "1" * 64)),
+    ("save_document_extraction", lambda db, s: crud.save_document_extraction(db, "1" * 64, "text")),
+    ("create_notification", lambda db, s: crud.create_notification(db, s["employer"], "Plan", "Check", "plan")),
+    ("get_user_notifications", lambda db, s: crud.get_user_notifications(db, s["employer"])),
+    ("mark_notification_as_read", lambda db, s: crud.mark_notification_as_read(db, s["notification"], s["employer"])),
+    ("get_unread_notification_count", lambda db, s: crud.get_unread_notification_count(db, s["employer"])),
+    ("delete_job", lambda db, s: crud.delete_job(db, s["job"])),
+]
+
+
+def seed(db, rows: int) -> dict:
+    """Fill every table with `rows`-proportional data; returns ids the checks use"""
+    employers = [User(telegram_id=i, role=UserRole.EMPLOYER) for i in range(1, rows // 10 + 2)]
+    seekers = [User(telegram_id=100000 + i, role=UserRole.JOB_SEEKER) for i in range(rows)]
+    db.add_all(employers + seekers)
+    db.flush()
+
+    companies = [Company(name=f"Company {user.id}", owner_id=user.id) for user in employers[:-1]]
+    profiles = [JobSeekerProfile(user_id=user.id, skills="python") for user in seekers[:-1]]
+    jobs = [
+        Job(title=f"Job {i}", description="python", poster_id=employers[i % (len(employers) - 1)].id,
+            status=JobStatus.ACTIVE if i % 4 else JobStatus.CLOSED)
+        for i in range(rows)
+    ]
+    db.add_all(companies + profiles + jobs)
+    db.flush()
+
+    applications = [
+        Application(job_id=jobs[i % len(jobs)].id, applicant_id=seekers[(i * 7) % (len(seekers) - 1)].id,
+                    cover_letter="python")
+        for i in range(rows * 3)
+    ]
+    # Keep the seed valid under the (job_id, applicant_id) unique index
+    applications = list({(a.job_id, a.applicant_id): a for a in applications}.values())
+    db.add_all(applications)
+    db.flush()
+
+    db.add_all([
+        ApplicationAnalysis(application_id=a.id, job_id=a.job_id, overall_score=a.id % 100, cover_letter_score=50,
+                            completeness_score=50, relevance_score=50, resume_score=50, recommendation="maybe",
+                            model_version="seed", input_fingerprint="0" * 64)
+        for a in applications
+    ])
+    db.add_all([
+        ApplicationSkill(application_id=a.id, job_id=a.job_id, skill=skill, source="resume")
+        for a in applications for skill in ("python", "sql")
+    ])
+    db.add_all([
+        Notification(user_id=employers[i % len(employers)].id, title="Seed", message="Seed", type="seed",
+                     is_read=bool(i % 2))
+        for i in range(rows)
+    ])
+    db.add_all([JobNotificationMilestone(job_id=job.id, milestone=1) for job in jobs])
+    db.add_all([
+        RefreshToken(user_id=user.id, token_hash=f"{user.id:064d}", family_id=f"{user.id:032d}",
+                     expires_at=datetime.utcnow() + timedelta(days=1))
+        for user in seekers
+    ])
+    db.add_all([DocumentExtraction(content_hash=f"{i:064x}", text="python") for i in range(rows)])
+    db.commit()
+
+    application = applications[0]
+    return {
+        "employer": jobs[0].poster_id,
+        "new_employer": employers[-1].id,
+        "company": companies[0].id,
+        "seeker": application.applicant_id,
+        "seeker_telegram_id": db.get(User, application.applicant_id).telegram_id,
+        "new_seeker": seekers[-1].id,
+        "job": application.job_id,
+        "application": application.id,
+        "refresh_token": db.query(RefreshToken.id).first()[0],
+        "notification": db.query(Notification.id).filter(Notification.user_id == jobs[0].poster_id).first()[0],
+    }
+
+
+def full_scans(connection, statement: str, parameters, tables: set) -> tuple:
+    """(scanned tables, plan lines) of one statement"""
+    plan = [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()]
+    scanned = []
+    for line in plan:
+        match = _FULL_SCAN.match(line)
+        # joinedload aliases tables as users_1, applications_1, ...
+        if match and re.sub(r"_\d+$", "", match.group(1)) in tables:
+            scanned.append(match.group(1))
+    return scanned, plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default="sqlite:////tmp/query_plans.db", help="Scratch SQLite database (recreated)")
+    parser.add_argument("--rows", type=int, default=500, help="Seeded rows per table (applications get ~3x)")
+    parser.add_argument("--verbose", action="store_true", help="Print every statement and its plan")
+    args = parser.parse_args()
+
+    if not args.database.startswith("sqlite"):
+        parser.error("EXPLAIN QUERY PLAN output is parsed as SQLite's; use a sqlite:// URL")
+
+    engine = create_engine(args.database)
+    # Check the schema the migrations build, not the models
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS application_search")
+        conn.exec_driver_sql("DROP TABLE IF EXISTS alembic_version")
+    upgrade_schema(args.database)
+    db = sessionmaker(bind=engine)()
+    print(f"Seeding {args.database} with {args.rows} rows per table...")
+    ids = seed(db, args.rows)
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(_CHECKED_STATEMENTS):
+            captured.append((statement, parameters))
+
+    tables = set(Base.metadata.tables)
+    public = {
+        name for name, function in inspect.getmembers(crud, inspect.isfunction)
+        if function.__module__ == crud.__name__ and not name.startswith("_")
+    }
+    failures = sorted(public - {name for name, _ in CHECKS})
+    for name in failures:
+        print(f"❌ {name}: no entry in CHECKS")
+
+    for name, check in CHECKS:
+        captured.clear()
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            check(db, ids)
+            db.flush()
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        problems = []
+        connection = db.connection()
+        for statement, parameters in captured:
+            scanned, plan = full_scans(connection, statement, parameters, tables)
+            if scanned:
+                problems.append((statement, scanned, plan))
+            if args.verbose:
+                print(f"   {' '.join(statement.split())}")
+                for line in plan:
+                    print(f"      {line}")
+        db.commit()
+
+        if problems:
+            failures.append(name)
+            print(f"❌ {name}")
+            for statement, scanned, plan in problems:
+                print(f"   full scan of {', '.join(scanned)}: {' '.join(statement.split())}")
+                for line in plan:
+                    print(f"      {line}")
+        else:
+            print(f"✅ {name} ({len(captured)} statements)")
+
+    db.close()
+    if failures:
+        print(f"\n❌ {len(failures)} of {len(public)} crud functions failed the query plan check")
+        sys.exit(1)
+    print(f"\n✅ All {len(public)} crud functions use indexes")
+
+
+if __name__ == "__main__":
+    main()
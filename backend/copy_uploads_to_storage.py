@@ -0,0 +1,67 @@
+"""
+Copy files saved to UPLOAD_DIR before the storage interface existed (company
+logos and CVs under uuid names) into the configured storage backend, under the
+same keys, so the rows pointing at them keep working without the
+STORAGE_LEGACY_FALLBACK directory.
+
+Existing keys are never overwritten; running it again only copies what is
+missing. Local files are kept unless --delete-local is given.
+
+Examples:
+    python copy_uploads_to_storage.py --dry-run
+    python copy_uploads_to_storage.py --delete-local
+"""
+import argparse
+import mimetypes
+import os
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config import settings
+from app.storage import LocalStorage, file_storage
+
+
+def copy_uploads(upload_dir: str, dry_run: bool, delete_local: bool, folders):
+    if isinstance(file_storage, LocalStorage) and file_storage.root == os.path.abspath(upload_dir):
+        print(f"⚠️  Storage backend is {upload_dir} itself, nothing to copy")
+        return
+
+    source = LocalStorage(upload_dir)
+    copied = present = failed = 0
+    print(f"{'Dry run: ' if dry_run else ''}copying {upload_dir} to {file_storage.name} storage...")
+    for folder in folders:
+        for stored in source.list_files(folder):
+            # Not file_exists(): that would find the file in the fallback, i.e. right here
+            if file_storage._exists(stored.key):
+                present += 1
+            elif dry_run:
+                copied += 1
+                print(f"  would copy {stored.key} ({stored.size} bytes)")
+                continue
+            else:
+                content = source.read_file(stored.key)
+                content_type = mimetypes.guess_type(stored.key)[0] or "application/octet-stream"
+                if content is None or not file_storage.store(stored.key, content, content_type):
+                    failed += 1
+                    print(f"❌ {stored.key} could not be copied")
+                    continue
+                copied += 1
+                print(f"  copied {stored.key}")
+            if delete_local and not dry_run:
+                source.delete_file(stored.key)
+
+    print(f"✅ {'Would copy' if dry_run else 'Copied'} {copied} files, {present} already present, {failed} failed")
+    if not dry_run and not failed:
+        print("Set STORAGE_LEGACY_FALLBACK=false once every API process runs with the copied files")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--upload-dir", default=settings.UPLOAD_DIR)
+    parser.add_argument("--folders", nargs="+", default=["company_logos/", "cvs/"])
+    parser.add_argument("--dry-run", action="store_true", help="Only list the files that would be copied")
+    parser.add_argument("--delete-local", action="store_true", help="Delete each local file once it is in storage")
+    args = parser.parse_args()
+    copy_uploads(args.upload_dir, args.dry_run, args.delete_local, args.folders)
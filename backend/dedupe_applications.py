@@ -0,0 +1,127 @@
+"""
+Report and merge duplicate applications: several rows for the same job and
+applicant, which databases created before migrations 0003 can contain
+(that revision stops until they are gone).
+
+Each group is merged into its first application (--keep latest: the last):
+- notes of every application are kept, oldest first
+- a pending status takes the most recent decision among the others
+- a missing cover letter or resume is taken from the others
+The other applications are deleted with their analyses, skills and search
+documents. The kept one is re-analyzed on the next ranking when its inputs
+changed, and re-indexed by the scoring worker.
+
+Only uses columns of the baseline schema, so it runs at any revision.
+
+Examples:
+    python dedupe_applications.py
+    python dedupe_applications.py --merge
+"""
+import argparse
+import os
+import sys
+from collections import defaultdict
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import bindparam, inspect, text
+from app.database import engine
+
+FILLED_FROM_DUPLICATES = ("cover_letter", "resume_url")
+
+
+def find_duplicates(conn) -> dict:
+    """(job_id, applicant_id) -> application rows, oldest first"""
+    rows = conn.execute(text("""
+        SELECT a.id, a.job_id, a.applicant_id, a.status, a.notes, a.cover_letter, a.resume_url, a.created_at
+        FROM applications a
+        JOIN (
+            SELECT job_id, applicant_id FROM applications
+            GROUP BY job_id, applicant_id HAVING COUNT(*) > 1
+        ) duplicates ON duplicates.job_id = a.job_id AND duplicates.applicant_id = a.applicant_id
+        ORDER BY a.job_id, a.applicant_id, a.id
+    """)).mappings().all()
+    groups = defaultdict(list)
+    for row in rows:
+        groups[(row["job_id"], row["applicant_id"])].append(row)
+    return groups
+
+
+def merged_values(kept, others) -> dict:
+    """Columns of the kept application that change"""
+    values = {}
+    notes = [row["notes"].strip() for row in [kept, *others] if row["notes"] and row["notes"].strip()]
+    merged_notes = "\n\n".join(dict.fromkeys(notes)) or None
+    if merged_notes != kept["notes"]:
+        values["notes"] = merged_notes
+
+    decided = [row["status"] for row in others if row["status"] and row["status"] != "PENDING"]
+    if kept["status"] in (None, "PENDING") and decided:
+        values["status"] = decided[-1]
+
+    for column in FILLED_FROM_DUPLICATES:
+        if not kept[column]:
+            filled = next((row[column] for row in reversed(others) if row[column]), None)
+            if filled:
+                values[column] = filled
+    return values
+
+
+def merge_group(conn, tables: set, kept, others, values: dict):
+    removed = [row["id"] for row in others]
+    removed_param = bindparam("ids", expanding=True)
+
+    if values:
+        assignments = ", ".join(f"{column} = :{column}" for column in values)
+        conn.execute(text(f"UPDATE applications SET {assignments} WHERE id = :id"), {**values, "id": kept["id"]})
+    if "application_analyses" in tables:
+        conn.execute(text("DELETE FROM application_analyses WHERE application_id IN :ids").bindparams(removed_param), {"ids": removed})
+    if "application_skills" in tables:
+        conn.execute(text("DELETE FROM application_skills WHERE application_id IN :ids").bindparams(removed_param), {"ids": removed})
+    if "application_search" in tables:
+        document_id = "application_id" if conn.dialect.name == "postgresql" else "rowid"
+        conn.execute(text(f"DELETE FROM application_search WHERE {document_id} IN :ids").bindparams(removed_param), {"ids": removed})
+    conn.execute(text("DELETE FROM applications WHERE id IN :ids").bindparams(removed_param), {"ids": removed})
+
+    application_columns = {column["name"] for column in inspect(conn).get_columns("applications")}
+    if "indexed_at" in application_columns and any(column in values for column in FILLED_FROM_DUPLICATES):
+        # Skills and search document come from the cover letter and resume
+        conn.execute(text("UPDATE applications SET indexed_at = NULL WHERE id = :id"), {"id": kept["id"]})
+
+
+def dedupe(merge: bool, keep: str):
+    with engine.connect() as conn:
+        groups = find_duplicates(conn)
+        tables = set(inspect(conn).get_table_names())
+
+    if not groups:
+        print("✅ No duplicate applications")
+        return
+
+    print(f"{len(groups)} (job, applicant) pairs have several applications:")
+    for (job_id, applicant_id), rows in groups.items():
+        kept = rows[0] if keep == "first" else rows[-1]
+        others = [row for row in rows if row["id"] != kept["id"]]
+        values = merged_values(kept, others)
+        described = ", ".join(
+            f"{row['id']} ({row['status'] or 'no status'}{', notes' if row['notes'] else ''})" for row in rows
+        )
+        print(f"  job {job_id}, applicant {applicant_id}: applications {described}")
+        print(f"    keep {kept['id']}{', set ' + ', '.join(values) if values else ''}; delete {', '.join(str(row['id']) for row in others)}")
+        if merge:
+            with engine.begin() as conn:
+                merge_group(conn, tables, kept, others, values)
+
+    if merge:
+        print(f"✅ Merged {len(groups)} pairs; run `alembic upgrade head`")
+    else:
+        print("Nothing changed; run with --merge to apply the above")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--merge", action="store_true", help="Merge each group into one application")
+    parser.add_argument("--keep", choices=["first", "latest"], default="first", help="Application each group is merged into")
+    args = parser.parse_args()
+    dedupe(args.merge, args.keep)
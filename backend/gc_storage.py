@@ -0,0 +1,49 @@
+"""
+Find stored files no record references (abandoned resume uploads, resumes of
+deleted jobs, replaced pictures) and delete them. Dry run unless --delete.
+"""
+import argparse
+import json
+import os
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config import settings
+from app.storage import file_storage
+from app.storage_gc import GC_FOLDERS, StorageGC
+
+
+def collect(delete: bool, grace_hours: float, batch_size: int, rate: float, folders, as_json: bool):
+    gc = StorageGC(grace_hours=grace_hours, batch_size=batch_size, deletes_per_second=rate)
+    print(f"{'Deleting' if delete else 'Dry run:'} orphaned files in {file_storage.name} storage...")
+    report = gc.run(dry_run=not delete, folders=folders)
+
+    if as_json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for folder, folder_report in report["by_folder"].items():
+        print(f"  {folder:<20} scanned {folder_report['scanned']:>7}  orphans {folder_report['orphans']:>6}"
+              f"  ({folder_report['orphan_bytes'] / 1024 / 1024:.1f} MB)")
+    print(f"Referenced: {report['referenced']}, kept as recent (< {grace_hours}h): {report['recent']}")
+    for key in report["sample"]:
+        print(f"  - {key}")
+    if delete:
+        print(f"✅ Deleted {report['deleted']} files, freed {report['freed_bytes'] / 1024 / 1024:.1f} MB")
+    else:
+        print(f"Would delete {report['orphans']} files ({report['orphan_bytes'] / 1024 / 1024:.1f} MB); "
+              f"run with --delete to remove them")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--delete", action="store_true", help="Delete orphans (default: report only)")
+    parser.add_argument("--grace-hours", type=float, default=settings.STORAGE_GC_GRACE_HOURS)
+    parser.add_argument("--batch-size", type=int, default=settings.STORAGE_GC_BATCH_SIZE)
+    parser.add_argument("--rate", type=float, default=settings.STORAGE_GC_DELETES_PER_SECOND, help="Max deletes per second")
+    parser.add_argument("--folder", action="append", help=f"Only these folders (default: {', '.join(GC_FOLDERS)})")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+    collect(args.delete, args.grace_hours, args.batch_size, args.rate, args.folder or GC_FOLDERS, args.json)
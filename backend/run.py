@@ -1,7 +1,10 @@
 import uvicorn
 from app.main import app
+from app.migrations import upgrade_schema
 
 if __name__ == "__main__":
+    # Development entry point: bring the database up to date first
+    upgrade_schema()
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
@@ -0,0 +1,24 @@
+"""
+Tests run against throwaway local storage and a SQLite file, configured
+before the app (and its storage and database singletons) is imported
+"""
+import os
+import sys
+import tempfile
+
+_workdir = tempfile.mkdtemp(prefix="telegram-jobs-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_workdir}/test.db")
+os.environ.setdefault("STORAGE_BACKEND", "local")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_workdir, "uploads"))
+os.environ.setdefault("AI_BACKEND", "fake")
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    from app.migrations import upgrade_schema
+    upgrade_schema()
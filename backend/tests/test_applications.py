@@ -0,0 +1,25 @@
+from fastapi.testclient import TestClient
+from app.auth import create_user_access_token
+from app.database import SessionLocal
+from app.main import app
+from app.models import Job, User, UserRole
+
+client = TestClient(app)
+
+
+def test_employer_search_routes_read_without_writing():
+    # Read sessions raise on any write, so a 200 shows these routes only read
+    db = SessionLocal()
+    try:
+        employer = User(telegram_id=2001, role=UserRole.EMPLOYER)
+        db.add(employer)
+        db.commit()
+        job = Job(title="Backend developer", description="Python", poster_id=employer.id)
+        db.add(job)
+        db.commit()
+        headers = {"Authorization": f"Bearer {create_user_access_token(employer)}"}
+
+        assert client.get("/api/applications/search", params={"q": "python"}, headers=headers).status_code == 200
+        assert client.get(f"/api/applications/job/{job.id}/skills", headers=headers).status_code == 200
+    finally:
+        db.close()
@@ -0,0 +1,25 @@
+from fastapi.testclient import TestClient
+from app.auth import create_user_access_token
+from app.crud import update_user
+from app.database import SessionLocal
+from app.main import app
+from app.models import User, UserRole
+from app.schemas import UserUpdate
+
+client = TestClient(app)
+
+
+def test_role_change_applies_to_issued_tokens():
+    db = SessionLocal()
+    try:
+        user = User(telegram_id=1001, role=UserRole.EMPLOYER)
+        db.add(user)
+        db.commit()
+        headers = {"Authorization": f"Bearer {create_user_access_token(user)}"}
+        assert client.get("/api/jobs/my-jobs/", headers=headers).status_code == 200
+
+        # The token still claims the employer role
+        update_user(db, user.id, UserUpdate(role=UserRole.JOB_SEEKER))
+        assert client.get("/api/jobs/my-jobs/", headers=headers).status_code == 403
+    finally:
+        db.close()
@@ -0,0 +1,11 @@
+from app.scoring_worker import ScoringWorker
+
+
+def test_enqueue_after_shutdown_releases_its_slot():
+    worker = ScoringWorker(max_workers=1, max_queued=1, budget_per_job=0)
+    worker.shutdown()
+
+    assert worker.enqueue(1) is False
+    assert worker.stats()["queued"] == 0
+    # The only slot was given back
+    assert worker._slots.acquire(blocking=False)
@@ -0,0 +1,40 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.storage import file_storage
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def resume_key():
+    return file_storage.upload_file(b"%PDF-1.4 private", "resume.pdf", folder="resumes")
+
+
+def test_private_file_needs_signature(resume_key):
+    assert client.get(f"/uploads/{resume_key}").status_code == 403
+
+
+@pytest.mark.parametrize("prefix", [
+    "cvs/..%2F",  # Encoded slash
+    "company_logos/%2e%2e/",  # Encoded dots
+    "cvs/%2e%2e%2f",
+    "avatars/.%2F..%2F",
+])
+def test_public_folder_traversal_is_rejected(resume_key, prefix):
+    name = resume_key.split("/", 1)[1]
+    response = client.get(f"/uploads/{prefix}resumes/{name}")
+    assert response.status_code == 404
+    assert b"private" not in response.content
+
+
+@pytest.mark.parametrize("path", ["/uploads/cvs//resume.pdf", "/uploads/%2Fetc/passwd", "/uploads/cvs/./x.pdf"])
+def test_malformed_keys_are_rejected(path):
+    assert client.get(path).status_code == 404
+
+
+def test_public_file_is_served():
+    key = file_storage.upload_file(b"%PDF-1.4 public", "cv.pdf", folder="cvs")
+    response = client.get(f"/uploads/{key}")
+    assert response.status_code == 200
+    assert response.content == b"%PDF-1.4 public"
@@ -10,8 +10,42 @@ export const api = axios.create({
   },
 })
 
+// Refresh in flight, shared by every request that needs it
+let refreshing: Promise<string> | null = null
+
+// Exchange the stored refresh token for a new token pair; resolves to the access token
+const refreshTokens = async (): Promise<string> => {
+  const refreshToken = localStorage.getItem('refresh_token')
+  if (!refreshToken) {
+    throw new Error('No refresh token')
+  }
+  // Plain axios: the refresh call must not go through the interceptors below
+  const response = await axios.post(`${API_BASE_URL}/auth/refresh`, { refresh_token: refreshToken })
+  const { access_token, refresh_token } = response.data
+  localStorage.setItem('auth_token', access_token)
+  localStorage.setItem('refresh_token', refresh_token)
+  return access_token
+}
+
+// Start a refresh unless one is in flight; concurrent 401s wait for the same one
+const refreshOnce = (): Promise<string> => {
+  if (!refreshing) {
+    refreshing = refreshTokens()
+    const done = () => { refreshing = null }
+    refreshing.then(done, done)
+  }
+  return refreshing
+}
+
+// Auth calls whose 401 means the credentials sent are bad, not that the access token expired
+const NO_REFRESH_URLS = ['/auth/telegram', '/auth/dev-login', '/auth/refresh']
+
 // Add auth token to requests
-api.interceptors.request.use((config) => {
+api.interceptors.request.use(async (config) => {
+  if (refreshing) {
+    // Wait for the new access token instead of sending the expired one
+    await refreshing.catch(() => undefined)
+  }
   const token = localStorage.getItem('auth_token')
   console.log('🔐 API Request:', config.url)
   console.log('🔑 Token exists:', !!token)
@@ -24,14 +58,34 @@ api.interceptors.request.use((config) => {
   return config
 })
 
-// Handle auth errors
+// Handle auth errors: refresh the access token once and retry, log in again if that fails
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
-    if (error.response?.status === 401) {
-      localStorage.removeItem('auth_token')
-      window.location.reload()
+  async (error) => {
+    const original = error.config
+    if (error.response?.status !== 401) {
+      return Promise.reject(error)
     }
+
+    if (original && !original._retried && !NO_REFRESH_URLS.includes(original.url)) {
+      original._retried = true
+      try {
+        const sentToken = original.headers?.Authorization?.toString().replace('Bearer ', '')
+        const currentToken = localStorage.getItem('auth_token')
+        // Another request may have refreshed since this one was sent
+        const token = currentToken && currentToken !== sentToken
+          ? currentToken
+          : await refreshOnce()
+        original.headers.Authorization = `Bearer ${token}`
+        return api(original)
+      } catch (refreshError) {
+        console.log('❌ Token refresh failed, logging in again:', refreshError)
+      }
+    }
+
+    localStorage.removeItem('auth_token')
+    localStorage.removeItem('refresh_token')
+    window.location.reload()
     return Promise.reject(error)
   }
 )
@@ -145,7 +199,11 @@ export interface Notification {
 // Auth API
 export const authApi = {
   login: (initData: string) => 
-    api.post('/auth/telegram', { init_data: initData }),
+    api.post('/auth/telegram', {
+      init_data: initData,
+      // Sent back while still valid, so a login doesn't create a new session
+      refresh_token: localStorage.getItem('refresh_token') || undefined,
+    }),
   
   loginDev: () => 
     api.post('/auth/dev-login'),
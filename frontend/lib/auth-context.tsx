@@ -49,8 +49,9 @@ export function AuthProvider({ children }: { children: React.ReactNode }) {
         try {
           console.log('📱 Attempting Telegram authentication...')
           const response = await authApi.login(webApp.initData)
-          const { access_token, user: userData } = response.data
+          const { access_token, refresh_token, user: userData } = response.data
           localStorage.setItem('auth_token', access_token)
+          localStorage.setItem('refresh_token', refresh_token)
           localStorage.setItem('user_data', JSON.stringify(userData))
           setUser(userData)
           setIsAuthenticated(true)
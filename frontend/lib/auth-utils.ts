@@ -29,9 +29,10 @@ export async function authenticateUser(): Promise<boolean> {
       try {
         console.log('🔄 Attempting Telegram authentication...')
         const response = await authApi.login(webApp.initData)
-        const { access_token, user } = response.data
+        const { access_token, refresh_token, user } = response.data
         
         localStorage.setItem('auth_token', access_token)
+        localStorage.setItem('refresh_token', refresh_token)
         localStorage.setItem('user_data', JSON.stringify(user))
         
         console.log('✅ Telegram authentication successful')